@@ -4,15 +4,27 @@ Ana sayfa: lokasyon seçimi
 Her lokasyon: /belediye, /havuzbasi, /yenisehir, /gurcukapi - tam özellikli sayfalar
 """
 
-import os, time, json, logging, threading, subprocess, uuid
+import os, re, math, time, json, logging, threading, uuid, tempfile, hashlib
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, send_from_directory, abort, redirect, url_for, session
-from flask_socketio import SocketIO, emit
+from flask import Flask, Request as FlaskRequest, render_template, request, jsonify, send_file, abort, redirect, url_for, session, g
+from werkzeug.security import safe_join
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
-from urllib.request import Request, urlopen
-import cv2, psutil
+from media_cache import MediaMetadataCache
+from playback_scheduler import PlaybackScheduler
+from content_journal import ContentJournal, JournalFlusher
+from upload_sessions import UploadSessionStore, UploadSessionError
+from blob_store import BlobStore
+from block_delta import compute_delta, encode_delta, MIN_BLOCK, MAX_BLOCK
+from transitions import transition_spec
+from crm_client import CRMClient, CRMUnavailable
+from system_metrics import MetricsSampler
+from metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE, LOCK_BUCKETS, TimedLock
+from lock_profiler import ProfiledLock, histogram_totals
 
 # ---------------------------------------------------------------------------
 # CONFIG
@@ -26,6 +38,28 @@ class Config:
         'image': {'png','jpg','jpeg','gif','bmp'},
         'video': {'mp4','avi','mov','mkv','wmv'}
     }
+    # Yükleme ayarları: istek boyutu sınırı ve arka plan işleme (süre ölçümü) thread sayısı
+    MAX_UPLOAD_MB = int(os.environ.get('MAX_UPLOAD_MB', '4096'))
+    INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', '2'))
+    # Devam ettirilebilir yüklemelerde parça boyutu ve yarım oturumların saklanma süresi
+    UPLOAD_CHUNK_MB = int(os.environ.get('UPLOAD_CHUNK_MB', '4'))
+    UPLOAD_SESSION_TTL_H = int(os.environ.get('UPLOAD_SESSION_TTL_H', '24'))
+    # Geçiş, duyurudan bu kadar sonra başlar; ekranlar öğeyi hazırlayıp aynı anda gösterir
+    PLAYBACK_LEAD_MS = int(os.environ.get('PLAYBACK_LEAD_MS', '500'))
+    # Sistem ölçümleri (CPU/RAM/disk/sıcaklık) örnekleme aralığı ve tutulan örnek sayısı
+    SYSTEM_METRICS_INTERVAL = float(os.environ.get('SYSTEM_METRICS_INTERVAL', '5'))
+    SYSTEM_METRICS_HISTORY = int(os.environ.get('SYSTEM_METRICS_HISTORY', '120'))
+    # /metrics için isteğe bağlı Bearer token (boşsa açık) ve senkronizasyon sürecinin ölçüm dosyası
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    SYNC_METRICS_FILE = os.environ.get('SYNC_METRICS_FILE', 'logs/sync_metrics.prom')
+    # Pi senkronizasyon uçları (manifesto, blob, blok farkı) için isteğe bağlı Bearer token (boşsa açık)
+    SYNC_TOKEN = os.environ.get('SYNC_TOKEN', '')
+    # Aynı anda hesaplanan blok farkı sayısı; doluysa istek 429 ile reddedilir
+    DELTA_WORKERS = int(os.environ.get('DELTA_WORKERS', '2'))
+    # Lokasyon kilidi profili: 0 kapalı, N = her N alımda bir çağrı yeri örneklenir (üretimde 32 önerilir)
+    LOCK_PROFILE_SAMPLE = int(os.environ.get('LOCK_PROFILE_SAMPLE', '0'))
+    # Yüklenen dosyaların aktarım sırasında yazıldığı geçici klasör (uploads ile aynı disk)
+    INCOMING_DIR = os.path.join(BASE_UPLOAD, '.incoming')
     
     # Lokasyon bazlı çalışma için
     CURRENT_LOCATION = os.environ.get('LED_LOCATION', 'belediye')  # Varsayılan: belediye
@@ -41,6 +75,11 @@ class Config:
     CRM_PASSWORD = os.environ.get('CRM_PASSWORD', '')
     CRM_VERIFY_URL = os.environ.get('CRM_VERIFY_URL', 'https://myps.erzurum.bel.tr/api/User/LedEkran')
     ENABLE_CRM_LOGIN = os.environ.get('ENABLE_CRM_LOGIN', 'true').lower() == 'true'
+    CRM_CONNECT_TIMEOUT = float(os.environ.get('CRM_CONNECT_TIMEOUT', '3'))  # saniye
+    CRM_TIMEOUT_SECONDS = float(os.environ.get('CRM_TIMEOUT_SECONDS', '10'))  # okuma zaman aşımı
+    CRM_CACHE_TTL = int(os.environ.get('CRM_CACHE_TTL', '300'))  # token/yetki önbelleği, saniye
+    CRM_BREAKER_THRESHOLD = int(os.environ.get('CRM_BREAKER_THRESHOLD', '5'))  # ardışık hata
+    CRM_BREAKER_RESET = int(os.environ.get('CRM_BREAKER_RESET', '30'))  # saniye
     
     # Her lokasyon için Raspberry Pi IP'leri
     LOCATION_IPS = {
@@ -63,17 +102,48 @@ LOCATION_NAMES = {
 # ---------------------------------------------------------------------------
 # FLASK & SOCKETIO SETUP
 # ---------------------------------------------------------------------------
+class UploadRequest(FlaskRequest):
+    """Multipart dosyalarını bellekte tutmadan doğrudan uploads/.incoming altına yazar.
+
+    Böylece yükleme tamamlandığında dosya kopyalanmaz, yerine taşınır (rename).
+    Sahiplenilmeyen geçici dosyalar istek sonunda silinir.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        os.makedirs(Config.INCOMING_DIR, exist_ok=True)
+        stream = tempfile.NamedTemporaryFile(dir=Config.INCOMING_DIR, prefix='upload-', suffix='.part', delete=False)
+        self.__dict__.setdefault('incoming_files', []).append(stream.name)
+        return stream
+
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.config['SECRET_KEY'] = 'led_panel_secret_key_2025'
 app.config['UPLOAD_FOLDER'] = Config.BASE_UPLOAD
-# Upload boyutu limiti kaldırıldı (sınırsız)
-app.config['MAX_CONTENT_LENGTH'] = None
+# Upload boyutu limiti (MAX_UPLOAD_MB, varsayılan 4 GB)
+app.config['MAX_CONTENT_LENGTH'] = Config.MAX_UPLOAD_MB * 1024 * 1024
+# Önde nginx/apache varsa medya dosyalarını X-Sendfile ile sıfır kopya gönder
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['SESSION_COOKIE_SECURE'] = False
 app.config['SESSION_PERMANENT'] = True
 
+class EmitSizeJSON:
+    """Socket.IO paket kodlayıcısı: paket bir kez serileştirilirken boyutu thread'e not edilir.
+
+    emit_to_location bayt sayacı için yükü ikinci kez json.dumps etmez.
+    """
+    local = threading.local()
+
+    @classmethod
+    def dumps(cls, *args, **kwargs):
+        encoded = json.dumps(*args, **kwargs)
+        cls.local.size = len(encoded)
+        return encoded
+
+    loads = staticmethod(json.loads)
+
 # SocketIO with threading mode (safer for Windows)
 socketio = SocketIO(app,
+                    json=EmitSizeJSON,
                     cors_allowed_origins="*",
                     async_mode='threading',
                     logger=False,
@@ -109,101 +179,321 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ---------------------------------------------------------------------------
+# METRICS (Prometheus, /metrics)
+# ---------------------------------------------------------------------------
+http_request_seconds = REGISTRY.histogram(
+    'ledpanel_http_request_duration_seconds', 'HTTP isteği işlenme süresi (yanıt oluşana kadar)',
+    ('method', 'route', 'status'))
+state_lock_wait_seconds = REGISTRY.histogram(
+    'ledpanel_state_lock_wait_seconds', 'Lokasyon kilidini alma bekleme süresi', ('location',), LOCK_BUCKETS)
+state_lock_hold_seconds = REGISTRY.histogram(
+    'ledpanel_state_lock_hold_seconds', 'Lokasyon kilidinin tutulma süresi', ('location',), LOCK_BUCKETS)
+video_probe_seconds = REGISTRY.histogram(
+    'ledpanel_video_probe_seconds', 'get_video_duration süresi (önbellek isabeti dahil)')
+content_save_seconds = REGISTRY.histogram(
+    'ledpanel_content_list_save_seconds', 'save_content_list süresi (günlüğe ekleme)', buckets=LOCK_BUCKETS)
+journal_flush_seconds = REGISTRY.histogram(
+    'ledpanel_content_journal_flush_seconds', 'İçerik günlüğünün diske yazılma (fsync) süresi')
+socketio_emits_total = REGISTRY.counter(
+    'ledpanel_socketio_emits_total', 'Lokasyon odalarına gönderilen Socket.IO mesajı (alıcı başına)', ('event', 'location'))
+socketio_emit_bytes_total = REGISTRY.counter(
+    'ledpanel_socketio_emit_bytes_total', 'Lokasyon odalarına gönderilen Socket.IO baytı (alıcı başına)', ('event', 'location'))
+schedule_drift_seconds = REGISTRY.histogram(
+    'ledpanel_playback_schedule_drift_seconds', 'Oynatma geçişinin planlanan son tarihe göre gecikmesi',
+    ('location',), LOCK_BUCKETS)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request_latency(response):
+    started = g.get('request_started')
+    if started is not None:
+        # Etiket URL kuralıdır (ör. /api/<location>/content); ham yol sınırsız seri üretir
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        http_request_seconds.observe(time.perf_counter() - started,
+                                     method=request.method, route=route, status=response.status_code)
+    return response
+
 # ---------------------------------------------------------------------------
 # GLOBAL STATE MANAGEMENT (per location)
 # ---------------------------------------------------------------------------
 state = {}
 
+# Lokasyon odası başına gönderilen Socket.IO mesaj/bayt sayaçları
+room_stats = {location: {'messages': 0, 'bytes': 0} for location in LOCATIONS}
+room_stats_lock = threading.Lock()
+
+# Ekran istemcilerinin bildirdiği geçiş gecikmeleri: lokasyon -> istemci -> son örnekler
+PLAYBACK_SAMPLE_HISTORY = 200
+# Lokasyon başına izlenen en fazla ekran; dolunca en uzun süredir görülmeyen çıkarılır
+PLAYBACK_MAX_CLIENTS = 32
+# Kabul edilen geçiş gecikmesi aralığı (ms); dışındaki değerler sınıra çekilir
+PLAYBACK_LATENCY_LIMIT_MS = 60000
+PLAYBACK_CLIENT_ID = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+playback_metrics = {location: {} for location in LOCATIONS}
+# Socket bağlantısı -> ilk bildirdiği istemci kimliği; bir bağlantı tek ekran adına ölçüm gönderir
+playback_sids = {}
+playback_metrics_lock = threading.Lock()
+
+def playback_metrics_summary(location):
+    """İstemci (pano) başına geçiş gecikmesi özeti (ms)"""
+    summary = {}
+    with playback_metrics_lock:
+        clients = {cid: dict(c, samples=list(c['samples'])) for cid, c in playback_metrics[location].items()}
+    for client_id, client in clients.items():
+        latencies = sorted(x['latency_ms'] for x in client['samples'])
+        count = len(latencies)
+        summary[client_id] = {
+            'user_agent': client['user_agent'],
+            'last_seen': client['last_seen'],
+            'clock': client.get('clock'),
+            'transitions': client['transitions'],
+            'preloaded_ratio': round(sum(1 for x in client['samples'] if x['preloaded']) / count, 3) if count else None,
+            'avg_ms': round(sum(latencies) / count, 1) if count else None,
+            'p95_ms': latencies[min(count - 1, int(count * 0.95))] if count else None,
+            'max_ms': latencies[-1] if count else None
+        }
+    return summary
+
+def emit_to_location(location, event, data):
+    """Olayı yalnızca lokasyonun odasındaki istemcilere gönder ve sayaçları güncelle"""
+    try:
+        recipients = sum(1 for _ in socketio.server.manager.get_participants('/', location))
+    except Exception:
+        recipients = 0
+    if recipients:
+        # Paket tüm alıcılar için bir kez kodlanır; boyutu kodlayıcı not eder (ASCII JSON, bayt = karakter)
+        EmitSizeJSON.local.size = 0
+        socketio.emit(event, data, to=location)
+        size = EmitSizeJSON.local.size
+        with room_stats_lock:
+            stats = room_stats[location]
+            stats['messages'] += recipients
+            stats['bytes'] += size * recipients
+        socketio_emits_total.inc(recipients, event=event, location=location)
+        socketio_emit_bytes_total.inc(size * recipients, event=event, location=location)
+
+def publish_content_delta(location, action, ops):
+    """İçerik değişikliğini sürümlü delta olarak yayınla (lokasyon kilidi altında çağrılır).
+
+    ops: {'op': 'add', 'item', 'index'}, {'op': 'remove', 'id'},
+    {'op': 'patch', 'id', 'fields'}, {'op': 'move', 'id', 'index'}.
+    İstemciler işlemleri uyguladıktan sonra 'order' alanını sıraya göre yeniler.
+    """
+    st = state[location]
+    st['version'] += 1
+    payload = {
+        'action': action,
+        'location': location,
+        'version': st['version'],
+        'base_version': st['version'] - 1,
+        'ops': ops
+    }
+    st['delta_log'].append(payload)
+    emit_to_location(location, 'content_updated', payload)
+
+def publish_content_snapshot(location, action):
+    """Tüm içerik listesini yeni bir sürümle yayınla; delta geçmişi sıfırlanır"""
+    st = state[location]
+    st['version'] += 1
+    st['delta_log'].clear()
+    emit_to_location(location, 'content_updated', content_snapshot(location, action))
+
+def content_snapshot(location, action='sync'):
+    st = state[location]
+    return {
+        'action': action,
+        'location': location,
+        'version': st['version'],
+        'content_list': st['content']
+    }
+
+def move_ops(old_ids, new_ids):
+    """Eski sıralamayı yenisine çeviren 'move' işlemlerini üret"""
+    work = list(old_ids)
+    ops = []
+    for i, content_id in enumerate(new_ids):
+        if work[i] != content_id:
+            work.remove(content_id)
+            work.insert(i, content_id)
+            ops.append({'op': 'move', 'id': content_id, 'index': i})
+    return ops
+
+# Video metadata önbelleği (dosya kimliğine göre, tüm lokasyonlar için ortak)
+media_cache = MediaMetadataCache(os.path.join(Config.BASE_UPLOAD, 'media_metadata.json'))
+# İçerik adresli depo: lokasyon klasörlerindeki dosyalar uploads/.blobs altındaki bloblara hardlink'tir
+blob_store = BlobStore(os.path.join(Config.BASE_UPLOAD, '.blobs'))
+upload_sessions = UploadSessionStore(
+    os.path.join(Config.INCOMING_DIR, 'sessions'),
+    chunk_size=Config.UPLOAD_CHUNK_MB * 1024 * 1024,
+    ttl=Config.UPLOAD_SESSION_TTL_H * 3600
+)
+
+# Geride kalan istemcilere yeniden oynatılabilecek delta sayısı
+CONTENT_DELTA_HISTORY = 100
+
+# content_list.json değişikliklerini toplu ve arka planda diske yazan ortak thread
+journal_flusher = JournalFlusher(on_flush=journal_flush_seconds.observe)
+
+def publish_system_info(sample):
+    """Yeni sistem ölçümünü izleyicisi olan lokasyon odalarına gönder"""
+    for location in LOCATIONS:
+        emit_to_location(location, 'system_info', sample)
+
+# Sistem ölçümleri arka planda örneklenir; istekler tampondaki son örneği alır
+metrics_sampler = MetricsSampler(
+    interval=Config.SYSTEM_METRICS_INTERVAL,
+    history=Config.SYSTEM_METRICS_HISTORY,
+    on_sample=publish_system_info
+)
+
+def create_state_lock(location):
+    """Lokasyon kilidi; LOCK_PROFILE_SAMPLE > 0 ise çağrı yeri profilli"""
+    if Config.LOCK_PROFILE_SAMPLE > 0:
+        return ProfiledLock(state_lock_wait_seconds, state_lock_hold_seconds,
+                            sample_every=Config.LOCK_PROFILE_SAMPLE, location=location)
+    return TimedLock(state_lock_wait_seconds, state_lock_hold_seconds, location=location)
+
 def init_location_state():
     """Her lokasyon için state başlatma"""
     for location in LOCATIONS:
         upload_dir = os.path.join(Config.BASE_UPLOAD, location)
         os.makedirs(upload_dir, exist_ok=True)
         
+        content_file = os.path.join(upload_dir, 'content_list.json')
         state[location] = {
             'content': [],
             'current_index': 0,
             'is_running': False,
-            'display_thread': None,
-            'lock': threading.Lock(),
+            'current_item': None,
+            # Sunucunun oynatma zaman çizelgesi: gösterilen öğe, başlangıç (epoch ms), süre, sıra no
+            'timeline': None,
+            'timeline_seq': 0,
+            # Yerel panel görüntüleyicinin parlaklığı (None = config.py varsayılanı)
+            'brightness': None,
+            'playlist': (),
+            # content_updated delta protokolü: sürüm ve son deltaların geçmişi
+            'version': int(time.time() * 1000),
+            'delta_log': deque(maxlen=CONTENT_DELTA_HISTORY),
+            'lock': create_state_lock(location),
             'upload_dir': upload_dir,
-            'content_file': os.path.join(upload_dir, 'content_list.json')
+            'content_file': content_file,
+            'journal': ContentJournal(content_file, flusher=journal_flusher)
         }
         load_content_list(location)
+        adopt_location_blobs(location)
+        rebuild_playlist(location)
+
+def adopt_location_blobs(location):
+    """Özeti olmayan (eski) içerikleri blob deposuna al ve sha256 alanını ekle.
+
+    Aynı dosya başka lokasyonda da varsa tek blob'a hardlink olur.
+    """
+    st = state[location]
+    ops = []
+    for item in st['content']:
+        if item.get('sha256'):
+            continue
+        filepath = os.path.join(st['upload_dir'], item['filename'])
+        if not os.path.exists(filepath):
+            continue
+        try:
+            item['sha256'] = blob_store.ingest(filepath)
+            ops.append({'op': 'patch', 'id': item['id'], 'fields': {'sha256': item['sha256']}})
+        except Exception as e:
+            logger.error(f"{location} blob deposuna alınamadı: {item['filename']} - {e}")
+    if ops:
+        save_content_list(location, ops)
+        logger.info(f"{LOCATION_NAMES[location]} {len(ops)} içerik blob deposuna alındı")
+
+def referenced_blobs():
+    """Tüm lokasyonların içerik listelerinde geçen blob özetleri"""
+    referenced = set()
+    for location in LOCATIONS:
+        with state[location]['lock']:
+            referenced.update(x['sha256'] for x in state[location]['content'] if x.get('sha256'))
+    return referenced
+
+def collect_blobs(sha256s):
+    """Son referansı düşen blobları sil (içerik silme/temizleme sonrası, kilit dışında)"""
+    sha256s = [x for x in sha256s if x]
+    if not sha256s:
+        return
+    try:
+        blob_store.collect(sha256s, referenced_blobs())
+    except Exception as e:
+        logger.error(f"Blob temizleme hatası: {e}")
 
 def load_content_list(location):
-    """Lokasyona özel içerik listesini yükle"""
+    """Lokasyona özel içerik listesini yükle (snapshot + günlük yeniden oynatma)"""
     st = state[location]
     try:
-        if os.path.exists(st['content_file']):
-            with open(st['content_file'], 'r', encoding='utf-8') as f:
-                st['content'] = json.load(f)
+        st['content'] = st['journal'].load()
         logger.info(f"{LOCATION_NAMES[location]} içerik listesi yüklendi: {len(st['content'])} öğe")
     except Exception as e:
         logger.error(f"{location} içerik listesi yükleme hatası: {e}")
         st['content'] = []
 
-def save_content_list(location):
-    """Lokasyona özel içerik listesini kaydet"""
-    st = state[location]
+def save_content_list(location, ops):
+    """Lokasyon içerik değişikliğini günlüğe ekle.
+
+    Disk yazımı (fsync + periyodik snapshot) arka plandaki journal_flusher
+    thread'inde yapılır; çağıran HTTP isteği disk G/Ç'si için beklemez.
+    """
     try:
-        with open(st['content_file'], 'w', encoding='utf-8') as f:
-            json.dump(st['content'], f, ensure_ascii=False, indent=2)
-        logger.debug(f"{location.title()} içerik listesi kaydedildi")
+        with content_save_seconds.time():
+            state[location]['journal'].append(ops)
+        logger.debug(f"{location.title()} içerik değişikliği günlüğe eklendi")
     except Exception as e:
         logger.error(f"{location} içerik listesi kaydetme hatası: {e}")
 
+# Derlenmiş oynatma listesi öğesi: içerik kopyası, mutlak dosya yolu, gösterim süresi
+PlaylistEntry = namedtuple('PlaylistEntry', ['item', 'filepath', 'duration'])
+
+def rebuild_playlist(location):
+    """Aktif içeriklerden değişmez oynatma listesini derle ve atomik olarak değiştir.
+
+    İçerik listesini değiştiren her işlem lokasyon kilidi altında çağırır;
+    gösterim döngüsü yalnızca st['playlist'] referansını kilitsiz okur.
+    """
+    st = state[location]
+    entries = []
+    for item in st['content']:
+        if not item.get('is_active', True):
+            continue
+        filepath = os.path.abspath(os.path.join(st['upload_dir'], item['filename']))
+        if not os.path.exists(filepath):
+            logger.warning(f"Dosya bulunamadı: {filepath}")
+            continue
+        # Süre hesapla - görüntü için kullanıcı/varsayılan, video için önbellekteki ölçüm
+        if item.get('type') == 'video':
+            meta = media_cache.get(filepath)
+            measured = int(meta['duration']) if meta and meta.get('duration') else 0
+            duration = measured if measured > 0 else int(item.get('duration', 15))
+            duration = max(1, duration)
+        else:
+            duration = int(item.get('duration', 7))
+        entries.append(PlaylistEntry(dict(item), filepath, duration))
+    st['playlist'] = tuple(entries)
+    # Gösterilen öğe listeden çıktıysa ya da liste boştan doluya geçtiyse hemen ilerle
+    if st['is_running']:
+        current = st['current_item']
+        if current is None or not any(e.item['id'] == current['id'] for e in st['playlist']):
+            display_scheduler.schedule(location, 0)
+    return st['playlist']
+
 def get_video_duration(path):
-    """Video süresini al - ffprobe, OpenCV ve moviepy ile"""
-    try:
-        # Önce ffprobe ile dene
-        cmd = [
-            'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1', path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        duration = float(result.stdout.strip())
-        logger.info(f"ffprobe ile video süresi alındı: {duration}s")
-        return duration
-    except FileNotFoundError:
-        logger.warning("ffprobe bulunamadı, MoviePy ile deneniyor...")
-    except Exception as e:
-        logger.warning(f"ffprobe hatası: {e}, MoviePy ile deneniyor...")
-    
+    """Video süresini al - önbellekten, yoksa ffprobe, MoviePy ve OpenCV ile"""
     try:
-        # MoviePy ile dene (ffmpeg tabanlı, genelde daha doğru)
-        from moviepy.editor import VideoFileClip
-        clip = VideoFileClip(path)
-        duration = float(clip.duration)
-        clip.close()
-        logger.info(f"MoviePy ile video süresi alındı: {duration}s")
-        return duration
+        with video_probe_seconds.time():
+            meta = media_cache.probe(path)
+        if meta and meta.get('duration'):
+            return meta['duration']
     except Exception as e:
-        logger.error(f"MoviePy ile video süresi alınırken hata: {e}")
-    
-    try:
-        # OpenCV ile dene
-        import cv2
-        cap = cv2.VideoCapture(path)
-        if not cap.isOpened():
-            logger.error(f"OpenCV ile video açılamadı: {path}")
-            return 15
-        
-        # FPS ve frame sayısını al
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        cap.release()
-        
-        if fps > 0 and frame_count > 0:
-            duration = frame_count / fps
-            logger.info(f"OpenCV ile video süresi alındı: {duration}s (FPS: {fps}, Frames: {frame_count})")
-            return duration
-        else:
-            logger.error(f"OpenCV ile geçerli FPS veya frame sayısı alınamadı")
-            return 15
-    except Exception as e:
-        logger.error(f"OpenCV ile video süresi alınırken hata: {e}")
-    
+        logger.error(f"Video süresi alınırken hata: {e}")
     return 15
 
 def allowed_file(filename):
@@ -244,74 +534,49 @@ def _remove_query_param(url: str, param: str) -> str:
 # ---------------------------------------------------------------------------
 # EXTERNAL: CRM TOKEN HELPER
 # ---------------------------------------------------------------------------
+crm_client = CRMClient(
+    Config.CRM_TOKEN_URL, Config.CRM_VERIFY_URL,
+    timeout=(Config.CRM_CONNECT_TIMEOUT, Config.CRM_TIMEOUT_SECONDS),
+    token_ttl=Config.CRM_CACHE_TTL, permission_ttl=Config.CRM_CACHE_TTL,
+    breaker_threshold=Config.CRM_BREAKER_THRESHOLD, breaker_reset=Config.CRM_BREAKER_RESET
+)
+
 def request_crm_token(username: str | None = None,
                       password: str | None = None,
-                      scope: str | None = None,
-                      timeout_seconds: int = 20):
+                      scope: str | None = None):
     """CRM token endpoint'ine x-www-form-urlencoded POST atar ve JSON döner.
 
-    Parametre verilmezse Config'deki değerler kullanılır.
-    Hata durumunda {'success': False, 'error': '...'} döner.
+    Parametre verilmezse Config'deki değerler kullanılır. Başarılı sonuçlar
+    CRM_CACHE_TTL boyunca önbellekten döner.
+    Hata durumunda {'success': False, 'error': '...'} döner; CRM'e
+    ulaşılamıyorsa ayrıca 'unavailable': True içerir.
     """
+    username = username or Config.CRM_USERNAME
+    password = password or Config.CRM_PASSWORD
+    # Zorunlu alan kontrolü
+    if not username or not password:
+        return {'success': False, 'error': 'CRM kullanıcı adı/şifre eksik'}
     try:
-        form_data = {
-            'scope': scope or Config.CRM_SCOPE,
-            'grant_type': 'password',
-            'username': username or Config.CRM_USERNAME,
-            'password': password or Config.CRM_PASSWORD,
-        }
-        # Zorunlu alan kontrolü
-        if not form_data['username'] or not form_data['password']:
-            return {'success': False, 'error': 'CRM kullanıcı adı/şifre eksik'}
-
-        encoded = urlencode(form_data).encode('utf-8')
-        req = Request(
-            url=Config.CRM_TOKEN_URL,
-            data=encoded,
-            headers={'Content-Type': 'application/x-www-form-urlencoded'}
-        )
-        with urlopen(req, timeout=timeout_seconds) as resp:
-            raw = resp.read().decode('utf-8', errors='ignore')
-        try:
-            data = json.loads(raw)
-        except Exception:
-            data = {'raw': raw}
-        return {'success': True, 'data': data}
+        return crm_client.request_token(username, password, scope or Config.CRM_SCOPE)
+    except CRMUnavailable as e:
+        logger.error(f"CRM token isteği hatası: {e}")
+        return {'success': False, 'error': str(e), 'unavailable': True}
     except Exception as e:
         logger.error(f"CRM token isteği hatası: {e}")
         return {'success': False, 'error': str(e)}
 
-def verify_crm_led_permission(access_token: str, timeout_seconds: int = 15) -> bool:
-    """Bearer token ile CRM doğrulama servisini çağırır; True dönerse yetkili kabul eder."""
+def verify_crm_led_permission(access_token: str):
+    """Bearer token ile CRM doğrulama servisini çağırır; True dönerse yetkili kabul eder.
+
+    CRM'e ulaşılamıyorsa None döner (yetkisiz ile karıştırılmaz).
+    """
     try:
         if not access_token:
             return False
-        req = Request(
-            url=Config.CRM_VERIFY_URL,
-            headers={
-                'Authorization': f'Bearer {access_token}',
-                'Accept': 'application/json'
-            }
-        )
-        with urlopen(req, timeout=timeout_seconds) as resp:
-            raw = resp.read().decode('utf-8', errors='ignore').strip()
-        logger.info(f"CRM verify raw response: {raw}")
-        # Cevap plain "true" olabilir ya da JSON boolean true
-        if raw.lower() == 'true':
-            return True
-        try:
-            data = json.loads(raw)
-            logger.info(f"CRM verify JSON parsed: {data}")
-            # data True ya da {"value": true} gibi durumlar
-            if data is True:
-                return True
-            if isinstance(data, dict):
-                for v in data.values():
-                    if isinstance(v, bool) and v is True:
-                        return True
-        except Exception:
-            pass
-        return False
+        return crm_client.verify_permission(access_token)
+    except CRMUnavailable as e:
+        logger.error(f"CRM verify hatası: {e}")
+        return None
     except Exception as _e:
         logger.error(f"CRM verify hatası: {_e}")
         return False
@@ -377,86 +642,122 @@ def ensure_client_session_id():
 # ---------------------------------------------------------------------------
 # DISPLAY LOOP (per location)
 # ---------------------------------------------------------------------------
-def display_loop(location):
-    """Lokasyona özel gösterim döngüsü"""
+def advance_display(location):
+    """Lokasyonda bir sonraki öğeye geç; bir sonraki geçişe kadarki süreyi döndür.
+
+    Tek zamanlayıcı thread'inden çağrılır. None dönerse lokasyon, oynatma
+    listesi değişene veya gösterim yeniden başlatılana kadar beklemeye alınır.
+    """
     st = state[location]
-    logger.info(f"{LOCATION_NAMES[location]} yayın döngüsü başlatıldı")
+    if not st['is_running']:
+        return None
     
-    while st['is_running']:
-        with st['lock']:
-            # Sadece aktif içerikleri sıraya al
-            active_content = [item for item in st['content'] if item.get('is_active', True)]
-            if not active_content:
-                socketio.sleep(1)
-                continue
-            
-            # Mevcut öğeyi al
-            current_item = active_content[st['current_index'] % len(active_content)]
-            filepath = os.path.join(st['upload_dir'], current_item['filename'])
-            
-            if not os.path.exists(filepath):
-                logger.warning(f"Dosya bulunamadı: {filepath}")
-                st['current_index'] = (st['current_index'] + 1) % len(active_content)
-                continue
-            
-            logger.info(f"{LOCATION_NAMES[location]} yayında: {current_item['filename']} ({current_item['type']})")
-            
-            # Süre hesapla - görüntü için kullanıcı/varsayılan, video için her oynatışta dosyadan ölç
-            if current_item['type'] == 'video':
-                measured = None
-                try:
-                    measured = int(get_video_duration(filepath))
-                except Exception:
-                    measured = None
-                duration = measured if measured and measured > 0 else int(current_item.get('duration', 15))
-                # küçük bir tampon ekle (ağ/gecikme payı)
-                duration = max(1, duration)
-            else:
-                duration = int(current_item.get('duration', 7))
-            
-            # Socket event gönder (current_item ile birlikte)
-            socketio.emit('display_status', {
-                'status': 'playing',
-                'location': location,
-                'current_item': current_item
-            })
-            
-            # Sonraki öğeye geç
-            st['current_index'] = (st['current_index'] + 1) % len(active_content)
-        
-        # Bekleme
-        socketio.sleep(duration)
+    # Derlenmiş listeyi kilitsiz oku; değişiklikler referans değişimiyle gelir
+    playlist = st['playlist']
+    if not playlist:
+        st['current_item'] = None
+        st['timeline'] = None
+        return None
+    
+    # Gösterilen öğeden sonrakini bul (yeniden sıralama/silme sonrası da doğru ilerler)
+    current = st['current_item']
+    index = st['current_index'] % len(playlist)
+    if current is not None:
+        # Gösterilen öğe listeden çıktıysa yerine kayan öğe sıradakidir
+        index = (st['current_index'] - 1) % len(playlist)
+        for i, e in enumerate(playlist):
+            if e.item['id'] == current['id']:
+                index = (i + 1) % len(playlist)
+                break
+    
+    entry = playlist[index]
+    current_item = entry.item
+    st['current_item'] = current_item
+    # Sonraki öğenin sırası
+    st['current_index'] = (index + 1) % len(playlist)
+    # Geçiş anı duyurudan PLAYBACK_LEAD_MS sonra; tüm ekranlar bu ana göre değiştirir
+    st['timeline_seq'] += 1
+    st['timeline'] = {
+        'seq': st['timeline_seq'],
+        'item_id': current_item['id'],
+        'started_at': int(time.time() * 1000) + Config.PLAYBACK_LEAD_MS,
+        'duration': entry.duration,
+        # Tarayıcı ve yerel görüntüleyici aynı geçişi started_at anından itibaren uygular
+        'transition': transition_spec()
+    }
+    
+    logger.info(f"{LOCATION_NAMES[location]} yayında: {current_item['filename']} ({current_item['type']})")
+    
+    # Socket event gönder (current_item ve zaman çizelgesi ile birlikte)
+    emit_to_location(location, 'display_status', display_status_payload(location))
+    
+    return entry.duration
+
+def display_status_payload(location):
+    """display_status olayı ve durum uç noktaları için ortak içerik"""
+    st = state[location]
+    return {
+        'status': 'playing' if st['is_running'] else 'stopped',
+        'location': location,
+        'current_item': st['current_item'] if st['is_running'] else None,
+        'timeline': st['timeline'] if st['is_running'] else None,
+        'brightness': st['brightness'],
+        'server_time': int(time.time() * 1000)
+    }
+
+# Tüm lokasyonlar için tek zamanlayıcı (monotonik son tarih heap'i)
+display_scheduler = PlaybackScheduler(
+    advance_display,
+    on_lateness=lambda location, lateness: schedule_drift_seconds.observe(lateness, location=location)
+)
+
+def measure_video_durations(location):
+    """Videoların süresini kilit dışında ölç: [(id, dosya adı, süre)].
+
+    Liste kilit altında kopyalanır; önbellekte olmayan dosyalar için ffprobe
+    alt süreci lokasyon kilidini tutmadan çalışır. Sonuç uygulanırken öğenin
+    hâlâ aynı id ve dosya adıyla listede olduğu kontrol edilmelidir.
+    """
+    st = state[location]
+    with st['lock']:
+        videos = [(x['id'], x['filename']) for x in st['content'] if x.get('type') == 'video']
+    measured = []
+    for item_id, filename in videos:
+        filepath = os.path.join(st['upload_dir'], filename)
+        if not os.path.exists(filepath):
+            continue
+        try:
+            measured.append((item_id, filename, get_video_duration(filepath)))
+        except Exception as e:
+            logger.error(f"Video süresi ölçülemedi: {filename} - {e}")
+    return measured
 
 def start_display_thread(location):
     """Lokasyona özel gösterim thread'i başlat"""
     st = state[location]
+    # Video sürelerini başlatmadan önce doğrula (ölçüm kilit dışında)
+    measured = measure_video_durations(location)
     with st['lock']:
-        # Video sürelerini başlatmadan önce doğrula/güncelle
         try:
-            updated_any_duration = False
-            for item in st['content']:
-                if item.get('type') == 'video':
-                    filepath = os.path.join(st['upload_dir'], item['filename'])
-                    if os.path.exists(filepath):
-                        try:
-                            actual_duration = int(get_video_duration(filepath))
-                            if actual_duration > 0 and abs(actual_duration - int(item.get('duration', 0))) > 1:
-                                item['duration'] = actual_duration
-                                updated_any_duration = True
-                        except Exception as _e:
-                            pass
-            if updated_any_duration:
-                save_content_list(location)
+            duration_ops = []
+            items = {x['id']: x for x in st['content']}
+            for item_id, filename, video_duration in measured:
+                item = items.get(item_id)
+                if item is None or item['filename'] != filename:
+                    continue
+                actual_duration = int(video_duration)
+                if actual_duration > 0 and abs(actual_duration - int(item.get('duration', 0))) > 1:
+                    item['duration'] = actual_duration
+                    duration_ops.append({'op': 'patch', 'id': item['id'], 'fields': {'duration': actual_duration}})
+            if duration_ops:
+                rebuild_playlist(location)
+                save_content_list(location, duration_ops)
                 # Güncellenen süreleri istemcilere duyur
-                socketio.emit('content_updated', {
-                    'action': 'duration_fix',
-                    'location': location,
-                    'content_list': st['content']
-                })
+                publish_content_delta(location, 'duration_fix', duration_ops)
         except Exception:
             pass
 
-        if st['display_thread'] is not None:
+        if st['is_running']:
             logger.warning(f"{location} gösterim zaten çalışıyor")
             return False
         
@@ -466,29 +767,179 @@ def start_display_thread(location):
         
         st['is_running'] = True
         st['current_index'] = 0
-        st['display_thread'] = socketio.start_background_task(display_loop, location)
-        logger.info(f"{LOCATION_NAMES[location]} yayın thread'i başlatıldı")
+        st['current_item'] = None
+        st['timeline'] = None
+        display_scheduler.start()
+        display_scheduler.schedule(location, 0)
+        logger.info(f"{LOCATION_NAMES[location]} yayını zamanlayıcıya eklendi")
         return True
 
 def stop_display_thread(location):
     """Lokasyona özel gösterim thread'i durdur"""
     st = state[location]
     with st['lock']:
-        if st['display_thread'] is None:
+        if not st['is_running']:
             return False
         
         st['is_running'] = False
-        st['display_thread'] = None
-        logger.info(f"{LOCATION_NAMES[location]} yayın thread'i durduruldu")
+        st['current_item'] = None
+        st['timeline'] = None
+        display_scheduler.cancel(location)
+        logger.info(f"{LOCATION_NAMES[location]} yayını durduruldu")
         
         # Durdurma eventi gönder
-        socketio.emit('display_status', {
-            'status': 'stopped',
-            'location': location,
-            'current_item': None
-        })
+        emit_to_location(location, 'display_status', display_status_payload(location))
         return True
 
+# ---------------------------------------------------------------------------
+# UPLOAD INGESTION (arka planda süre ölçümü ve yayınlama)
+# ---------------------------------------------------------------------------
+ingest_pool = ThreadPoolExecutor(max_workers=Config.INGEST_WORKERS, thread_name_prefix='ingest')
+
+@app.teardown_request
+def cleanup_incoming_files(exc):
+    """İstekte sahiplenilmeyen (ör. yarım kalan) geçici yükleme dosyalarını sil"""
+    for path in request.__dict__.get('incoming_files', ()):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            logger.error(f"Geçici yükleme dosyası silinemedi: {path} - {e}")
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    """MAX_UPLOAD_MB sınırını aşan yüklemeler"""
+    return jsonify({'success': False, 'error': f'Dosya boyutu sınırı aşıldı (en fazla {Config.MAX_UPLOAD_MB} MB)'}), 413
+
+def store_uploaded_file(file, filepath):
+    """Yüklenen dosyayı kilit dışında hedefine yerleştir.
+
+    Dosya zaten uploads/.incoming altına akıtıldıysa yalnızca taşınır,
+    değilse önce geçici dosyaya yazılıp sonra atomik olarak taşınır.
+    """
+    stream_path = getattr(file.stream, 'name', None)
+    if isinstance(stream_path, str) and os.path.dirname(os.path.abspath(stream_path)) == os.path.abspath(Config.INCOMING_DIR):
+        file.stream.close()
+        tmp_path = stream_path
+    else:
+        os.makedirs(Config.INCOMING_DIR, exist_ok=True)
+        tmp_path = os.path.join(Config.INCOMING_DIR, f"upload-{uuid.uuid4().hex}.part")
+        file.save(tmp_path)
+    os.replace(tmp_path, filepath)
+    try:
+        os.chmod(filepath, 0o644)
+    except Exception:
+        pass
+
+def emit_upload_progress(location, upload_id, filename, stage, **extra):
+    """Yükleme işleme aşamasını lokasyon odasına bildir (received/probing/done/error)"""
+    emit_to_location(location, 'upload_progress', dict({
+        'location': location,
+        'upload_id': upload_id,
+        'filename': filename,
+        'stage': stage
+    }, **extra))
+
+def submit_ingestion(location, filepath, filename, file_type, duration=None, upload_id=None, sha256=None):
+    """Yerine konmuş dosyayı işleme kuyruğuna ekle; upload_id döndürür"""
+    upload_id = upload_id or uuid.uuid4().hex
+    emit_upload_progress(location, upload_id, filename, 'received')
+    ingest_pool.submit(ingest_upload, location, upload_id, filepath, filename, file_type, duration, sha256)
+    return upload_id
+
+def ingest_upload(location, upload_id, filepath, filename, file_type, duration, sha256=None):
+    """Dosyayı doğrula, gerekirse süresini ölç ve hazır olunca içerik listesine ekle"""
+    st = state[location]
+    try:
+        if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+            raise ValueError('Dosya boş veya bulunamadı')
+        
+        # İçerik adresli depoya al; aynı dosya daha önce yüklendiyse disk paylaşılır
+        sha256 = blob_store.ingest(filepath, sha256)
+        
+        # Video metadata'sını yüklemede bir kez ölç ve önbelleğe al (kilit dışında)
+        if file_type == 'video':
+            emit_upload_progress(location, upload_id, filename, 'probing')
+            media_cache.probe(filepath)
+        
+        # Süre bilgisini al (form verisi veya varsayılan)
+        requested_duration = duration if duration and duration > 0 else None
+        if not duration or duration <= 0:
+            # Varsayılan süreler
+            if file_type == 'video':
+                # Video süresini dosyadan al
+                try:
+                    video_duration = get_video_duration(filepath)
+                    logger.info(f"Video dosyası {filename} için süre hesaplandı: {video_duration}s")
+                    duration = int(video_duration) if video_duration > 0 else 15
+                    logger.info(f"Video süresi {duration}s olarak ayarlandı")
+                except Exception as e:
+                    logger.error(f"Video süresi alınırken hata: {e}")
+                    duration = 15
+            else:
+                duration = 7
+        
+        # Kilit yalnızca listeye ekleme ve yayınlama için tutulur
+        replaced_blobs = []
+        with st['lock']:
+            same_name = [x for x in st['content'] if x['filename'] == filename]
+            if same_name:
+                # Aynı isimle yeniden yükleme: diskteki dosya değişti, mevcut öğe yerinde güncellenir
+                fields = {'sha256': sha256}
+                if file_type == 'video' or requested_duration:
+                    fields['duration'] = duration
+                replaced_blobs = [x.get('sha256') for x in same_name if x.get('sha256') != sha256]
+                ops = []
+                for x in same_name:
+                    x.update(fields)
+                    ops.append({'op': 'patch', 'id': x['id'], 'fields': dict(fields)})
+                new_item = dict(same_name[0])
+            else:
+                new_id = int(time.time() * 1000)
+                existing_ids = {x['id'] for x in st['content']}
+                while new_id in existing_ids:  # Benzersiz ID
+                    new_id += 1
+                new_item = {
+                    'id': new_id,
+                    'filename': filename,
+                    'type': file_type,
+                    'order': len(st['content']),
+                    'duration': duration,
+                    'is_active': True,
+                    'sha256': sha256
+                }
+                st['content'].append(new_item)
+                new_item = dict(new_item)
+                ops = [{'op': 'add', 'item': dict(new_item), 'index': new_item['order']}]
+            
+            rebuild_playlist(location)
+            save_content_list(location, ops)
+            
+            # Socket event
+            publish_content_delta(location, 'upload', ops)
+        
+        if same_name:
+            # Üzerine yazılan dosyanın blob'u artık referanssızsa sil
+            collect_blobs(replaced_blobs)
+            logger.info(f"{LOCATION_NAMES[location]} içerik güncellendi: {filename} (süre: {new_item['duration']}s)")
+        else:
+            logger.info(f"{LOCATION_NAMES[location]} yeni içerik: {filename} (süre: {duration}s)")
+        emit_upload_progress(location, upload_id, filename, 'done', item=new_item)
+    except Exception as e:
+        logger.error(f"{LOCATION_NAMES[location]} yükleme işlenemedi: {filename} - {e}")
+        # Listede karşılığı olmayan dosyayı diskte bırakma
+        with st['lock']:
+            referenced = any(x['filename'] == filename for x in st['content'])
+        if not referenced:
+            try:
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+                media_cache.discard(filepath)
+            except Exception:
+                pass
+            collect_blobs([sha256])
+        emit_upload_progress(location, upload_id, filename, 'error', error=str(e))
+
 # ---------------------------------------------------------------------------
 # AUTHENTICATION ROUTES
 # ---------------------------------------------------------------------------
@@ -500,6 +951,8 @@ def login():
         password = request.form.get('password')
         # 1) CRM token al
         crm_result = request_crm_token(username=username, password=password, scope=Config.CRM_SCOPE)
+        if crm_result.get('unavailable'):
+            return render_template('login.html', error='CRM servisine ulaşılamıyor, lütfen daha sonra tekrar deneyin')
         if not crm_result.get('success'):
             return render_template('login.html', error='Geçersiz kullanıcı adı veya şifre')
 
@@ -508,7 +961,10 @@ def login():
         if isinstance(token_payload, dict):
             access_token = token_payload.get('access_token') or token_payload.get('token') or None
         # 2) Token ile LEDEkran yetkisini doğrula
-        if not verify_crm_led_permission(access_token):
+        allowed = verify_crm_led_permission(access_token)
+        if allowed is None:
+            return render_template('login.html', error='CRM servisine ulaşılamıyor, lütfen daha sonra tekrar deneyin')
+        if not allowed:
             return render_template('login.html', error='Yetkiniz bulunmuyor')
 
         # 3) Başarılı giriş
@@ -585,9 +1041,69 @@ def api_get_content(location):
     
     return jsonify({
         'success': True,
+        'version': state[location]['version'],
         'content': state[location]['content']
     })
 
+def build_manifest(location):
+    """Senkronizasyon manifestosu: dosya başına sha256/boyut/metadata ve tüm liste için ETag.
+
+    Sonuç içerik sürümüne göre önbelleğe alınır; liste değişmedikçe yeniden hesaplanmaz.
+    """
+    st = state[location]
+    with st['lock']:
+        cached = st.get('manifest')
+        if cached and cached['version'] == st['version']:
+            return cached
+        version = st['version']
+        items = [dict(x) for x in st['content']]
+    
+    files = []
+    for item in items:
+        filepath = os.path.join(st['upload_dir'], item['filename'])
+        try:
+            size = os.path.getsize(filepath)
+        except OSError:
+            size = None
+        files.append({
+            'id': item['id'],
+            'filename': item['filename'],
+            'sha256': item.get('sha256'),
+            'size': size,
+            'type': item['type'],
+            'order': item.get('order', 0),
+            'duration': item.get('duration'),
+            'is_active': item.get('is_active', True)
+        })
+    # ETag yalnızca dosya listesinden türetilir; sunucu yeniden başlasa da değişmez
+    etag = hashlib.sha256(json.dumps(files, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:32]
+    manifest = {'location': location, 'version': version, 'etag': etag, 'files': files}
+    with st['lock']:
+        if st['version'] == version:
+            st['manifest'] = manifest
+    return manifest
+
+def sync_authorized():
+    """Senkronizasyon ucu isteği: SYNC_TOKEN tanımlıysa Bearer token gerekir"""
+    return not Config.SYNC_TOKEN or request.headers.get('Authorization') == f'Bearer {Config.SYNC_TOKEN}'
+
+@app.route('/api/<location>/manifest')
+def api_get_manifest(location):
+    """Pi senkronizasyonu için manifesto (If-None-Match destekli, 304 döner)"""
+    if location not in LOCATIONS:
+        abort(404)
+    if not sync_authorized():
+        abort(401)
+    
+    manifest = build_manifest(location)
+    if request.if_none_match.contains(manifest['etag']):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(dict(manifest, success=True))
+    response.set_etag(manifest['etag'])
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/api/<location>/content/upload', methods=['POST'])
 @login_required
 def api_upload_content(location):
@@ -604,75 +1120,170 @@ def api_upload_content(location):
         return jsonify({'success': False, 'error': 'Dosya seçilmedi'}), 400
     
     st = state[location]
-    uploaded_items = []
+    accepted = []
+    duration = request.form.get('duration', type=int)
     
-    with st['lock']:
-        for file in files:
-            if file.filename == '':
-                continue
-                
-            is_valid, file_type = allowed_file(file.filename)
-            if not is_valid:
-                logger.warning(f"Desteklenmeyen dosya formatı: {file.filename}")
-                continue
-            
-            # Dosyayı kaydet
-            filepath = os.path.join(st['upload_dir'], file.filename)
-            file.save(filepath)
-            
-            # Süre bilgisini al (form verisi veya varsayılan)
-            duration = request.form.get('duration', type=int)
-            if not duration or duration <= 0:
-                # Varsayılan süreler
-                if file_type == 'image':
-                    duration = 7
-                elif file_type == 'video':
-                    # Video süresini dosyadan al
-                    try:
-                        video_duration = get_video_duration(filepath)
-                        logger.info(f"Video dosyası {file.filename} için süre hesaplandı: {video_duration}s")
-                        duration = int(video_duration) if video_duration > 0 else 15
-                        logger.info(f"Video süresi {duration}s olarak ayarlandı")
-                    except Exception as e:
-                        logger.error(f"Video süresi alınırken hata: {e}")
-                        duration = 15
-                else:
-                    duration = 7
-            
-            # İçerik listesine ekle
-            new_item = {
-                'id': int(time.time() * 1000) + len(uploaded_items),  # Benzersiz ID için offset ekle
-                'filename': file.filename,
-                'type': file_type,
-                'order': len(st['content']),
-                'duration': duration,
-                'is_active': True
-            }
-            
-            st['content'].append(new_item)
-            uploaded_items.append(new_item)
-            
-            logger.info(f"{LOCATION_NAMES[location]} yeni içerik: {file.filename} (süre: {duration}s)")
+    # Dosyalar kilit dışında yerine konur; süre ölçümü ve listeye ekleme arka planda yapılır
+    for file in files:
+        if file.filename == '':
+            continue
         
-        if uploaded_items:
-            save_content_list(location)
-            
-            # Socket event
-            socketio.emit('content_updated', {
-                'action': 'upload',
-                'location': location,
-                'content_list': st['content']
-            })
+        filename = os.path.basename(file.filename)
+        is_valid, file_type = allowed_file(filename)
+        if not is_valid:
+            logger.warning(f"Desteklenmeyen dosya formatı: {file.filename}")
+            continue
+        
+        # Dosyayı kaydet
+        filepath = os.path.join(st['upload_dir'], filename)
+        try:
+            store_uploaded_file(file, filepath)
+        except Exception as e:
+            logger.error(f"Dosya kaydedilemedi: {filename} - {e}")
+            continue
+        
+        upload_id = submit_ingestion(location, filepath, filename, file_type, duration)
+        accepted.append({'upload_id': upload_id, 'filename': filename, 'type': file_type})
     
-    if uploaded_items:
+    if accepted:
         return jsonify({
             'success': True, 
-            'content': uploaded_items, 
-            'message': f'{len(uploaded_items)} dosya başarıyla yüklendi'
-        })
+            'uploads': accepted, 
+            'message': f'{len(accepted)} dosya alındı, işleniyor'
+        }), 202
     else:
         return jsonify({'success': False, 'error': 'Hiçbir geçerli dosya yüklenemedi'}), 400
 
+@app.route('/api/<location>/uploads', methods=['POST'])
+@login_required
+def api_create_upload_session(location):
+    """Parçalı (devam ettirilebilir) yükleme oturumu aç"""
+    if location not in LOCATIONS:
+        abort(404)
+    
+    data = request.get_json(silent=True) or {}
+    filename = os.path.basename(str(data.get('filename') or ''))
+    is_valid, file_type = allowed_file(filename)
+    if not is_valid:
+        return jsonify({'success': False, 'error': 'Desteklenmeyen dosya formatı'}), 400
+    
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Dosya boyutu gerekli'}), 400
+    if size <= 0:
+        return jsonify({'success': False, 'error': 'Dosya boş'}), 400
+    if size > Config.MAX_UPLOAD_MB * 1024 * 1024:
+        return jsonify({'success': False, 'error': f'Dosya boyutu sınırı aşıldı (en fazla {Config.MAX_UPLOAD_MB} MB)'}), 413
+    
+    duration = data.get('duration')
+    try:
+        session_info = upload_sessions.create(
+            location, filename, file_type, size,
+            sha256=data.get('sha256'),
+            duration=int(duration) if duration else None
+        )
+    except Exception as e:
+        logger.error(f"Yükleme oturumu açılamadı: {filename} - {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify(dict(session_info, success=True)), 201
+
+def upload_session_in(location, upload_id):
+    """Oturum var ve bu lokasyona ait mi (başka lokasyonun URL'sinden erişilemez)"""
+    try:
+        return upload_sessions.status(upload_id)['location'] == location
+    except KeyError:
+        return False
+
+@app.route('/api/<location>/uploads/<upload_id>', methods=['GET'])
+@login_required
+def api_upload_session_status(location, upload_id):
+    """Oturumda alınmış bayt aralıklarını döndür (devam ederken eksikler hesaplanır)"""
+    if location not in LOCATIONS:
+        abort(404)
+    try:
+        session_info = upload_sessions.status(upload_id)
+    except KeyError:
+        return jsonify({'success': False, 'error': 'Yükleme oturumu bulunamadı'}), 404
+    if session_info['location'] != location:
+        return jsonify({'success': False, 'error': 'Yükleme oturumu bulunamadı'}), 404
+    return jsonify(dict(session_info, success=True))
+
+@app.route('/api/<location>/uploads/<upload_id>', methods=['PUT'])
+@login_required
+def api_upload_chunk(location, upload_id):
+    """Bir parçayı ?offset= konumuna yaz; X-Chunk-CRC32 başlığı varsa doğrulanır"""
+    if location not in LOCATIONS:
+        abort(404)
+    
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'success': False, 'error': 'offset gerekli'}), 400
+    crc_header = request.headers.get('X-Chunk-CRC32')
+    try:
+        crc32 = int(crc_header, 16) if crc_header else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Geçersiz X-Chunk-CRC32'}), 400
+    
+    if not upload_session_in(location, upload_id):
+        return jsonify({'success': False, 'error': 'Yükleme oturumu bulunamadı'}), 404
+    try:
+        session_info = upload_sessions.write_chunk(upload_id, offset, request.stream, request.content_length, crc32)
+    except KeyError:
+        return jsonify({'success': False, 'error': 'Yükleme oturumu bulunamadı'}), 404
+    except UploadSessionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Parça yazılamadı: {upload_id} @ {offset} - {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({'success': True, 'received_bytes': session_info['received_bytes'], 'size': session_info['size']})
+
+@app.route('/api/<location>/uploads/<upload_id>/finalize', methods=['POST'])
+@login_required
+def api_finalize_upload(location, upload_id):
+    """Parçaları doğrula, dosyayı yerine taşı ve içerik olarak işleme kuyruğuna ekle"""
+    if location not in LOCATIONS:
+        abort(404)
+    
+    # Lokasyon, dosyayı baştan hash'leyen (ve hatada oturumu silen) finalize'dan önce kontrol edilir
+    if not upload_session_in(location, upload_id):
+        return jsonify({'success': False, 'error': 'Yükleme oturumu bulunamadı'}), 404
+    try:
+        data_file, meta = upload_sessions.finalize(upload_id)
+    except KeyError:
+        return jsonify({'success': False, 'error': 'Yükleme oturumu bulunamadı'}), 404
+    except UploadSessionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    
+    filepath = os.path.join(state[location]['upload_dir'], meta['filename'])
+    try:
+        os.replace(data_file, filepath)
+        os.chmod(filepath, 0o644)
+    except Exception as e:
+        logger.error(f"Yüklenen dosya taşınamadı: {meta['filename']} - {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    upload_sessions.discard(upload_id)
+    
+    submit_ingestion(location, filepath, meta['filename'], meta['type'], meta['duration'], upload_id=upload_id, sha256=meta['sha256'])
+    return jsonify({
+        'success': True,
+        'uploads': [{'upload_id': upload_id, 'filename': meta['filename'], 'type': meta['type'], 'sha256': meta['sha256']}],
+        'message': f"{meta['filename']} alındı, işleniyor"
+    }), 202
+
+@app.route('/api/<location>/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def api_abort_upload(location, upload_id):
+    """Yarım kalan yükleme oturumunu iptal et"""
+    if location not in LOCATIONS:
+        abort(404)
+    if not upload_session_in(location, upload_id):
+        return jsonify({'success': False, 'error': 'Yükleme oturumu bulunamadı'}), 404
+    upload_sessions.discard(upload_id)
+    return jsonify({'success': True})
+
 @app.route('/api/<location>/content/<int:content_id>', methods=['DELETE'])
 @login_required
 def api_delete_content(location, content_id):
@@ -687,27 +1298,30 @@ def api_delete_content(location, content_id):
         if not item:
             return jsonify({'success': False, 'error': 'İçerik bulunamadı'}), 404
         
-        # Dosyayı sil
-        filepath = os.path.join(st['upload_dir'], item['filename'])
-        if os.path.exists(filepath):
-            os.remove(filepath)
-        
         # Listeden çıkar
         st['content'].remove(item)
         
+        # Dosyayı sil (aynı dosyayı kullanan başka öğe yoksa)
+        filepath = os.path.join(st['upload_dir'], item['filename'])
+        if not any(x['filename'] == item['filename'] for x in st['content']):
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            media_cache.discard(filepath)
+        
         # Sıraları yeniden düzenle
         for i, x in enumerate(st['content']):
             x['order'] = i
         
-        save_content_list(location)
+        ops = [{'op': 'remove', 'id': content_id}]
+        rebuild_playlist(location)
+        save_content_list(location, ops)
         logger.info(f"{LOCATION_NAMES[location]} içerik silindi: {item['filename']}")
         
         # Socket event
-        socketio.emit('content_updated', {
-            'action': 'delete',
-            'location': location,
-            'content_list': st['content']
-        })
+        publish_content_delta(location, 'delete', ops)
+    
+    # Son referans düştüyse blob'u sil
+    collect_blobs([item.get('sha256')])
     
     return jsonify({'success': True, 'message': 'İçerik silindi'})
 
@@ -721,6 +1335,8 @@ def api_clear_content(location):
     st = state[location]
     
     with st['lock']:
+        removed_blobs = [item.get('sha256') for item in st['content']]
+        
         # Tüm dosyaları sil
         for item in st['content']:
             filepath = os.path.join(st['upload_dir'], item['filename'])
@@ -730,26 +1346,94 @@ def api_clear_content(location):
                     logger.info(f"Dosya silindi: {item['filename']}")
                 except Exception as e:
                     logger.error(f"Dosya silinirken hata: {item['filename']} - {e}")
+            media_cache.discard(filepath)
         
         # İçerik listesini temizle
         st['content'].clear()
-        save_content_list(location)
-        
-        # Gösterimi durdur
-        if st['is_running']:
-            stop_display_thread(location)
+        rebuild_playlist(location)
+        save_content_list(location, [{'op': 'reset', 'content': []}])
         
         logger.info(f"{LOCATION_NAMES[location]} tüm içerikler temizlendi")
         
         # Socket event
-        socketio.emit('content_updated', {
-            'action': 'clear',
-            'location': location,
-            'content_list': []
-        })
+        publish_content_snapshot(location, 'clear')
+    
+    # Gösterimi durdur (stop_display_thread kilidi kendisi alır; içeride çağrılırsa kilitlenir)
+    stop_display_thread(location)
+    
+    # Son referansı düşen blobları sil
+    collect_blobs(removed_blobs)
     
     return jsonify({'success': True, 'message': 'Tüm içerikler temizlendi'})
 
+@app.route('/api/<location>/content/<int:content_id>/share', methods=['POST'])
+@login_required
+def api_share_content(location, content_id):
+    """İçeriği diğer lokasyonlara ekle; dosya kopyalanmaz, aynı blob'a hardlink yapılır"""
+    if location not in LOCATIONS:
+        abort(404)
+    
+    data = request.get_json(silent=True) or {}
+    targets = [x for x in (data.get('locations') or []) if x in LOCATIONS and x != location]
+    if not targets:
+        return jsonify({'success': False, 'error': 'Hedef lokasyon seçilmedi'}), 400
+    
+    with state[location]['lock']:
+        item = next((dict(x) for x in state[location]['content'] if x['id'] == content_id), None)
+    if not item:
+        return jsonify({'success': False, 'error': 'İçerik bulunamadı'}), 404
+    if not item.get('sha256') or not blob_store.exists(item['sha256']):
+        return jsonify({'success': False, 'error': 'İçeriğin blob kaydı yok'}), 409
+    
+    shared = []
+    for target in targets:
+        st = state[target]
+        with st['lock']:
+            existing = next((x for x in st['content'] if x.get('sha256') == item['sha256']), None)
+            if existing:
+                shared.append({'location': target, 'id': existing['id'], 'filename': existing['filename']})
+                continue
+            
+            # Aynı isimde farklı bir dosya varsa isim çakışmasını önle
+            filename = item['filename']
+            used = {x['filename'] for x in st['content']}
+            base, ext = os.path.splitext(filename)
+            n = 1
+            while filename in used:
+                filename = f"{base} ({n}){ext}"
+                n += 1
+            
+            try:
+                blob_store.link_into(item['sha256'], os.path.join(st['upload_dir'], filename))
+            except Exception as e:
+                logger.error(f"{target} lokasyonuna paylaşılamadı: {filename} - {e}")
+                continue
+            
+            new_id = int(time.time() * 1000)
+            existing_ids = {x['id'] for x in st['content']}
+            while new_id in existing_ids:  # Benzersiz ID
+                new_id += 1
+            new_item = {
+                'id': new_id,
+                'filename': filename,
+                'type': item['type'],
+                'order': len(st['content']),
+                'duration': item['duration'],
+                'is_active': True,
+                'sha256': item['sha256']
+            }
+            st['content'].append(new_item)
+            
+            ops = [{'op': 'add', 'item': dict(new_item), 'index': new_item['order']}]
+            rebuild_playlist(target)
+            save_content_list(target, ops)
+            publish_content_delta(target, 'upload', ops)
+        
+        logger.info(f"{LOCATION_NAMES[target]} paylaşılan içerik eklendi: {filename}")
+        shared.append({'location': target, 'id': new_id, 'filename': filename})
+    
+    return jsonify({'success': True, 'shared': shared})
+
 @app.route('/api/<location>/content/<int:content_id>/duration', methods=['PUT'])
 @login_required
 def api_update_duration(location, content_id):
@@ -773,15 +1457,13 @@ def api_update_duration(location, content_id):
             return jsonify({'success': False, 'error': 'İçerik bulunamadı'}), 404
         
         item['duration'] = duration
-        save_content_list(location)
+        ops = [{'op': 'patch', 'id': content_id, 'fields': {'duration': duration}}]
+        rebuild_playlist(location)
+        save_content_list(location, ops)
         logger.info(f"{LOCATION_NAMES[location]} içerik süresi güncellendi: {item['filename']} -> {duration}s")
         
         # Socket event
-        socketio.emit('content_updated', {
-            'action': 'duration_update',
-            'location': location,
-            'content_list': st['content']
-        })
+        publish_content_delta(location, 'duration_update', ops)
     
     return jsonify({'success': True, 'message': 'Süre güncellendi'})
 
@@ -794,32 +1476,33 @@ def api_fix_video_durations(location):
     
     st = state[location]
     fixed_count = 0
+    duration_ops = []
+    
+    # Ölçüm kilit dışında; sonuçlar yalnızca öğe hâlâ aynıysa uygulanır
+    measured = measure_video_durations(location)
     
     with st['lock']:
-        for item in st['content']:
-            if item['type'] == 'video':
-                filepath = os.path.join(st['upload_dir'], item['filename'])
-                if os.path.exists(filepath):
-                    try:
-                        video_duration = get_video_duration(filepath)
-                        new_duration = int(video_duration) if video_duration > 0 else 15
-                        old_duration = item['duration']
-                        item['duration'] = new_duration
-                        fixed_count += 1
-                        logger.info(f"Video süresi düzeltildi: {item['filename']} {old_duration}s -> {new_duration}s")
-                    except Exception as e:
-                        logger.error(f"Video süresi düzeltilirken hata: {item['filename']} - {e}")
+        items = {x['id']: x for x in st['content']}
+        for item_id, filename, video_duration in measured:
+            item = items.get(item_id)
+            if item is None or item['filename'] != filename:
+                continue
+            new_duration = int(video_duration) if video_duration > 0 else 15
+            old_duration = item['duration']
+            item['duration'] = new_duration
+            fixed_count += 1
+            if new_duration != old_duration:
+                duration_ops.append({'op': 'patch', 'id': item['id'], 'fields': {'duration': new_duration}})
+            logger.info(f"Video süresi düzeltildi: {item['filename']} {old_duration}s -> {new_duration}s")
         
         if fixed_count > 0:
-            save_content_list(location)
             logger.info(f"{LOCATION_NAMES[location]} {fixed_count} video süresi düzeltildi")
+        if duration_ops:
+            rebuild_playlist(location)
+            save_content_list(location, duration_ops)
             
             # Socket event
-            socketio.emit('content_updated', {
-                'action': 'duration_fix',
-                'location': location,
-                'content_list': st['content']
-            })
+            publish_content_delta(location, 'duration_fix', duration_ops)
     
     return jsonify({
         'success': True, 
@@ -841,10 +1524,56 @@ def api_debug_state(location):
         'is_running': st['is_running'],
         'current_index': st['current_index'],
         'content_count': len(st['content']),
-        'current_item': st['content'][st['current_index']] if st['content'] and st['is_running'] else None,
+        'current_item': st['current_item'],
+        'timeline': st['timeline'],
+        'scheduler': {
+            'scheduled': display_scheduler.is_scheduled(location),
+            'jitter': display_scheduler.stats(location)
+        },
+        'room_stats': room_stats[location],
+        'blob_store': blob_store.stats(),
+        'crm': crm_client.stats(),
+        'playback_metrics': playback_metrics_summary(location),
         'all_content': st['content']
     })
 
+@app.route('/api/<location>/debug/locks', methods=['GET', 'DELETE'])
+@login_required
+def api_debug_locks(location):
+    """Debug: Lokasyon kilidinde en çok bekleten / en uzun tutan çağrı yerleri.
+
+    ?sort=hold|wait|contended|max_hold|max_wait, ?limit=N; DELETE sayaçları sıfırlar.
+    """
+    if location not in LOCATIONS:
+        abort(404)
+
+    lock = state[location]['lock']
+    if not isinstance(lock, ProfiledLock):
+        # Profil kapalı: yalnızca histogramlardaki toplamlar
+        wait_count, wait_sum = histogram_totals(lock.wait)
+        hold_count, hold_sum = histogram_totals(lock.hold)
+        return jsonify({
+            'success': True,
+            'location': location,
+            'enabled': False,
+            'message': 'Çağrı yeri profili için LOCK_PROFILE_SAMPLE ayarlayın',
+            'acquisitions': wait_count,
+            'wait_mean_ms': round(wait_sum * 1000 / wait_count, 4) if wait_count else 0.0,
+            'hold_mean_ms': round(hold_sum * 1000 / hold_count, 4) if hold_count else 0.0
+        })
+
+    if request.method == 'DELETE':
+        if not lock.reset():
+            return jsonify({'success': False, 'error': 'Kilit boşalmadı, sayaçlar sıfırlanamadı'}), 409
+        return jsonify({'success': True, 'location': location, 'enabled': True})
+
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), 100))
+        report = lock.report(limit=limit, sort=request.args.get('sort', 'hold'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify(dict(report, success=True, location=location, enabled=True))
+
 @app.route('/api/<location>/content/order', methods=['POST'])
 @login_required
 def api_update_order(location):
@@ -859,6 +1588,8 @@ def api_update_order(location):
     st = state[location]
     
     with st['lock']:
+        old_ids = [x['id'] for x in st['content']]
+        
         # Yeni sıralamayı uygula
         for item_data in data['order']:
             content_id = int(item_data['id'])
@@ -875,15 +1606,14 @@ def api_update_order(location):
         for i, item in enumerate(st['content']):
             item['order'] = i
         
-        save_content_list(location)
+        ops = move_ops(old_ids, [x['id'] for x in st['content']])
+        rebuild_playlist(location)
+        save_content_list(location, ops)
         logger.info(f"{LOCATION_NAMES[location]} içerik sırası güncellendi")
         
         # Socket event
-        socketio.emit('content_updated', {
-            'action': 'reorder',
-            'location': location,
-            'content_list': st['content']
-        })
+        if ops:
+            publish_content_delta(location, 'reorder', ops)
     
     return jsonify({'success': True, 'message': 'Sıra güncellendi'})
 
@@ -903,14 +1633,12 @@ def api_update_active(location, content_id):
         if not item:
             return jsonify({'success': False, 'error': 'İçerik bulunamadı'}), 404
         item['is_active'] = is_active
-        save_content_list(location)
+        ops = [{'op': 'patch', 'id': content_id, 'fields': {'is_active': is_active}}]
+        rebuild_playlist(location)
+        save_content_list(location, ops)
         logger.info(f"{LOCATION_NAMES[location]} içerik aktiflik güncellendi: {item['filename']} -> {is_active}")
         # Socket event
-        socketio.emit('content_updated', {
-            'action': 'active_update',
-            'location': location,
-            'content_list': st['content']
-        })
+        publish_content_delta(location, 'active_update', ops)
     return jsonify({'success': True, 'message': 'Durum güncellendi'})
 
 # ---------------------------------------------------------------------------
@@ -931,7 +1659,7 @@ def api_crm_token():
     scope = request.form.get('scope') or payload.get('scope')
 
     result = request_crm_token(username=username, password=password, scope=scope)
-    status = 200 if result.get('success') else 502
+    status = 200 if result.get('success') else (503 if result.get('unavailable') else 502)
     return jsonify(result), status
 
 @app.route('/api/<location>/display/start', methods=['POST'])
@@ -960,6 +1688,36 @@ def api_stop_display(location):
     else:
         return jsonify({'success': False, 'error': 'Gösterim durdurulamadı'}), 400
 
+@app.route('/api/<location>/display/brightness', methods=['POST'])
+@login_required
+def api_display_brightness(location):
+    """Panel parlaklığını (0-100) canlı değiştir; görüntüleyici kareleri yeniden çözmez"""
+    if location not in LOCATIONS:
+        abort(404)
+    
+    data = request.get_json()
+    brightness = data.get('brightness') if data else None
+    if not isinstance(brightness, int) or not 0 <= brightness <= 100:
+        return jsonify({'success': False, 'error': 'Parlaklık 0-100 arasında olmalıdır'}), 400
+    
+    state[location]['brightness'] = brightness
+    logger.info(f"{LOCATION_NAMES[location]} parlaklık: %{brightness}")
+    emit_to_location(location, 'panel_brightness', {'location': location, 'brightness': brightness})
+    return jsonify({'success': True, 'brightness': brightness})
+
+@app.route('/api/<location>/display/skip', methods=['POST'])
+@login_required
+def api_skip_display(location):
+    """Sonraki içeriğe hemen geç"""
+    if location not in LOCATIONS:
+        abort(404)
+    
+    if not state[location]['is_running']:
+        return jsonify({'success': False, 'error': 'Gösterim çalışmıyor'}), 400
+    
+    display_scheduler.schedule(location, 0)
+    return jsonify({'success': True, 'message': 'Sonraki içeriğe geçildi'})
+
 @app.route('/api/<location>/display/status')
 @login_required
 def api_display_status(location):
@@ -967,76 +1725,169 @@ def api_display_status(location):
     if location not in LOCATIONS:
         abort(404)
     
-    st = state[location]
-    current_item = None
-    
-    if st['is_running'] and st['content']:
-        # current_index zaten sonraki öğeyi gösteriyor, bu yüzden bir önceki öğeyi al
-        # Eğer current_index 0 ise, son öğeyi al
-        if st['current_index'] == 0:
-            current_item = st['content'][-1]
-        else:
-            current_item = st['content'][st['current_index'] - 1]
+    # Zamanlayıcının gerçekten gösterdiği öğe (pasifler atlanmış haliyle)
+    return jsonify(dict(display_status_payload(location), success=True))
+
+@app.route('/api/<location>/display/metrics')
+@login_required
+def api_display_metrics(location):
+    """Ekran istemcilerinin geçiş gecikmesi istatistikleri"""
+    if location not in LOCATIONS:
+        abort(404)
     
     return jsonify({
         'success': True,
-        'status': 'playing' if st['is_running'] else 'stopped',
         'location': location,
-        'current_item': current_item
+        'clients': playback_metrics_summary(location)
     })
 
 @app.route('/api/system/info')
 @login_required
 def api_system_info():
-    """Sistem bilgileri - SD kart ve hafıza durumu"""
+    """Sistem bilgileri - SD kart ve hafıza durumu.
+
+    Arka plan örnekleyicisinin son ölçümü ve kısa geçmişi döner;
+    ?history=N geçmişteki örnek sayısını belirler (varsayılan 60).
+    """
     try:
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-        
-        # Hafıza hesaplamaları (GB cinsinden)
-        total_gb = round(disk.total / (1024**3), 2)
-        used_gb = round(disk.used / (1024**3), 2)
-        free_gb = round(disk.free / (1024**3), 2)
-        used_percent = round(disk.percent, 1)
-        
-        # RAM bilgileri (GB cinsinden)
-        ram_total_gb = round(memory.total / (1024**3), 2)
-        ram_used_gb = round((memory.total - memory.available) / (1024**3), 2)
-        ram_free_gb = round(memory.available / (1024**3), 2)
-        
-        return jsonify({
-            'success': True,
-            'cpu': round(cpu_percent, 1),
-            'memory': {
-                'percent': round(memory.percent, 1),
-                'total_gb': ram_total_gb,
-                'used_gb': ram_used_gb,
-                'free_gb': ram_free_gb
-            },
-            'disk': {
-                'percent': used_percent,
-                'total_gb': total_gb,
-                'used_gb': used_gb,
-                'free_gb': free_gb,
-                'sd_card_size': f"{total_gb} GB SD Kart"
-            },
-            'timestamp': datetime.now().strftime('%H:%M:%S')
-        })
+        metrics_sampler.start()
+        limit = request.args.get('history', 60, type=int)
+        return jsonify(dict(metrics_sampler.latest(), success=True, history=metrics_sampler.history(limit)))
     except Exception as e:
         logger.error(f"Sistem bilgisi hatası: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus ölçümleri; METRICS_TOKEN tanımlıysa Bearer token gerekir.
+
+    Senkronizasyon süreci (sync_system.py) aynı cihazda çalışıyorsa
+    SYNC_METRICS_FILE içeriği de eklenir.
+    """
+    if Config.METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {Config.METRICS_TOKEN}':
+        abort(401)
+    body = REGISTRY.render()
+    try:
+        with open(Config.SYNC_METRICS_FILE, 'r', encoding='utf-8') as f:
+            body += f.read()
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error(f"Senkronizasyon ölçümleri okunamadı: {e}")
+    return app.response_class(body, mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
 # ---------------------------------------------------------------------------
 # STATIC FILE ROUTES
 # ---------------------------------------------------------------------------
+# Sürümlü (?v=<sha256>) medya URL'leri değişmez; tarayıcı bir yıl boyunca yeniden sormaz
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+
+def media_etag(location, filename, filepath):
+    """Dosyanın güçlü ETag'i: içerik kaydındaki sha256, yoksa inode/boyut/mtime.
+
+    sha256 yalnızca diskteki dosya hâlâ o blob ise (aynı inode ya da kopyada aynı
+    boyut/mtime) kullanılır. Aynı isimle yeniden yüklemede yeni baytlar, özet
+    ingest_upload'da güncellenene kadar eski sha ile sunulmaz.
+    """
+    st_ = os.stat(filepath)
+    for item in reversed(state[location]['content']):
+        if item['filename'] == filename and item.get('sha256'):
+            try:
+                blob = os.stat(blob_store.path(item['sha256']))
+            except (OSError, ValueError):
+                break
+            if (blob.st_ino, blob.st_dev) == (st_.st_ino, st_.st_dev) or \
+                    (blob.st_size, blob.st_mtime_ns) == (st_.st_size, st_.st_mtime_ns):
+                return item['sha256']
+            break
+    return f"{st_.st_ino:x}-{st_.st_size:x}-{st_.st_mtime_ns:x}"
+
 @app.route('/uploads/<location>/<filename>')
 def uploaded_file(location, filename):
-    """Lokasyona özel dosya servisi"""
+    """Lokasyona özel dosya servisi (ETag, 304, 206 Range, sürümlü URL'de kalıcı önbellek)"""
+    if location not in LOCATIONS:
+        abort(404)
+    
+    filepath = safe_join(state[location]['upload_dir'], filename)
+    if not filepath or not os.path.isfile(filepath):
+        abort(404)
+    
+    etag = media_etag(location, filename, filepath)
+    # conditional=True: If-None-Match -> 304, Range -> 206 (video atlama/tamponlama)
+    response = send_file(filepath, conditional=True, etag=etag, max_age=0)
+    response.headers['Accept-Ranges'] = 'bytes'
+    version = request.args.get('v')
+    if version and len(version) >= 8 and etag.startswith(version):
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE
+    else:
+        # Sürümsüz URL: her seferinde ETag ile doğrula (değişmediyse 304, gövde yok)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Fark hesabı dosyanın tamamını tarar; eşzamanlı hesap sayısı sınırlıdır
+delta_slots = threading.BoundedSemaphore(max(1, Config.DELTA_WORKERS))
+
+@app.route('/uploads/<location>/<filename>/delta', methods=['POST'])
+def uploaded_file_delta(location, filename):
+    """rsync tarzı fark: istemcinin blok imzasına göre yalnızca değişen baytları gönder"""
     if location not in LOCATIONS:
         abort(404)
+    if not sync_authorized():
+        abort(401)
+    
+    filepath = os.path.join(state[location]['upload_dir'], os.path.basename(filename))
+    if not os.path.isfile(filepath):
+        abort(404)
+    
+    signature = request.get_json(silent=True) or {}
+    try:
+        block_size = int(signature.get('block_size'))
+        weak = [int(x) for x in signature.get('weak', [])]
+        strong = [str(x) for x in signature.get('strong', [])]
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Geçersiz imza'}), 400
+    if not (MIN_BLOCK <= block_size <= MAX_BLOCK) or len(weak) != len(strong):
+        return jsonify({'success': False, 'error': 'Geçersiz imza'}), 400
+    # İstemcinin eski kopyası yeni dosyadan çok büyükse fark anlamsızdır; tam indirme yapılmalı
+    size = os.path.getsize(filepath)
+    max_blocks = 2 * -(-size // block_size) + 64
+    if len(weak) > max_blocks:
+        return jsonify({'success': False, 'error': 'İmza dosya boyutuna göre çok büyük'}), 413
+    
+    if not delta_slots.acquire(blocking=False):
+        response = jsonify({'success': False, 'error': 'Sunucu meşgul, tam indirme yapın veya sonra deneyin'})
+        response.headers['Retry-After'] = '30'
+        return response, 429
+    try:
+        t = time.perf_counter()
+        ops = compute_delta(filepath, {'block_size': block_size, 'weak': weak, 'strong': strong})
+        literal = sum(op[2] - op[1] for op in ops if op[0] == 'data')
+        logger.info(f"{location}/{filename} delta: {literal} / {size} bayt ham veri "
+                    f"({(time.perf_counter() - t) * 1000:.0f} ms)")
+    except Exception as e:
+        logger.error(f"Delta hesaplanamadı: {filename} - {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        delta_slots.release()
     
-    return send_from_directory(state[location]['upload_dir'], filename)
+    response = app.response_class(encode_delta(filepath, ops), mimetype='application/octet-stream')
+    response.headers['X-Delta-Literal-Bytes'] = str(literal)
+    return response
+
+@app.route('/blobs/<sha256>')
+def blob_file(sha256):
+    """İçerik adresli dosya servisi (senkronizasyon istemcileri için)"""
+    if not sync_authorized():
+        abort(401)
+    try:
+        blob = blob_store.path(sha256)
+    except ValueError:
+        abort(404)
+    if not os.path.exists(blob):
+        abort(404)
+    response = send_file(blob, mimetype='application/octet-stream', conditional=True, etag=sha256, max_age=0)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE
+    return response
 
 # ---------------------------------------------------------------------------
 # SOCKETIO EVENTS
@@ -1053,6 +1904,8 @@ def handle_connect():
 def handle_disconnect():
     """Client bağlantısı koptu"""
     try:
+        with playback_metrics_lock:
+            playback_sids.pop(request.sid, None)
         logger.info(f"Client ayrıldı: {request.sid}")
     except Exception as e:
         logger.error(f"Disconnect error: {e}")
@@ -1063,32 +1916,139 @@ def handle_join_location(data):
     try:
         location = data.get('location')
         if location in LOCATIONS:
-            # İlk bağlantıda mevcut durumu gönder
-            st = state[location]
-            emit('content_updated', {
-                'action': 'sync',
-                'location': location,
-                'content_list': st['content']
-            })
+            # Lokasyon odasına katıl (önceki lokasyon odalarından çık)
+            for other in LOCATIONS:
+                if other != location:
+                    leave_room(other)
+            join_room(location)
             
-            # Gösterim durumunu gönder
-            current_item = None
-            if st['is_running'] and st['content']:
-                # current_index zaten sonraki öğeyi gösteriyor, bu yüzden bir önceki öğeyi al
-                if st['current_index'] == 0:
-                    current_item = st['content'][-1]
-                else:
-                    current_item = st['content'][st['current_index'] - 1]
+            # İlk bağlantıda mevcut durumu gönder
+            emit('content_updated', content_snapshot(location))
             
-            emit('display_status', {
-                'status': 'playing' if st['is_running'] else 'stopped',
-                'location': location,
-                'current_item': current_item
-            })
+            # Gösterim durumunu (zaman çizelgesiyle) gönder
+            emit('display_status', display_status_payload(location))
+
+            # Odaya sistem ölçümleri yayınlanır; örnekleyici ilk izleyiciyle başlar
+            metrics_sampler.start()
     except Exception as e:
         logger.error(f"Join location error: {e}")
         emit('error', {'message': 'Bağlantı hatası'})
 
+@socketio.on('get_system_info')
+def handle_get_system_info(data=None):
+    """Son sistem ölçümünü isteyen istemciye gönder"""
+    try:
+        metrics_sampler.start()
+        emit('system_info', metrics_sampler.latest())
+    except Exception as e:
+        logger.error(f"Sistem bilgisi hatası: {e}")
+        emit('system_info', {'error': str(e)})
+
+@socketio.on('clock_sync')
+def handle_clock_sync(data):
+    """Saat farkı el sıkışması: istemcinin gönderim zamanını sunucu saatiyle geri döndür (ack).
+
+    İstemci gidiş-dönüş süresinden (RTT) kendi saatiyle sunucu saati arasındaki
+    farkı hesaplar ve zaman çizelgesindeki started_at anlarını buna göre çevirir.
+    """
+    client_time = data.get('client_time') if isinstance(data, dict) else None
+    return {'client_time': client_time, 'server_time': time.time() * 1000}
+
+@socketio.on('content_resync')
+def handle_content_resync(data):
+    """Geride kalan istemciyi verdiği sürümden itibaren güncelle.
+
+    Eksik deltalar geçmişte duruyorsa yalnızca onlar, yoksa tam liste gönderilir.
+    """
+    try:
+        location = data.get('location')
+        if location not in LOCATIONS:
+            return
+        st = state[location]
+        with st['lock']:
+            version = data.get('version')
+            log = list(st['delta_log'])
+            if version == st['version']:
+                return
+            if isinstance(version, int) and log and log[0]['base_version'] <= version < st['version']:
+                for payload in log:
+                    if payload['version'] > version:
+                        emit('content_updated', payload)
+                return
+            emit('content_updated', content_snapshot(location))
+    except Exception as e:
+        logger.error(f"Content resync error: {e}")
+        emit('error', {'message': 'Senkronizasyon hatası'})
+
+def finite_number(value):
+    """Sonlu sayıysa float, değilse None (NaN/Infinity JSON'a yazılamaz)"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+@socketio.on('playback_metrics')
+def handle_playback_metrics(data):
+    """Ekranın geçiş gecikmesi örneklerini kaydet.
+
+    Olay kimlik doğrulamasızdır: istemci kimliği biçim olarak doğrulanır, bir
+    bağlantı yalnızca ilk bildirdiği kimlikle yazabilir ve lokasyon başına
+    PLAYBACK_MAX_CLIENTS ekran tutulur. Sonlu olmayan gecikmeler atılır.
+    """
+    try:
+        location = data.get('location')
+        if location not in LOCATIONS:
+            return
+        client_id = data.get('client_id')
+        if not isinstance(client_id, str) or not PLAYBACK_CLIENT_ID.match(client_id):
+            client_id = request.sid[:32]
+        samples = []
+        for sample in (data.get('samples') or [])[:100]:
+            try:
+                latency = float(sample['latency_ms'])
+                if not math.isfinite(latency):
+                    continue
+                item_id = sample.get('item_id')
+                samples.append({
+                    'item_id': int(item_id) if item_id is not None else None,
+                    'latency_ms': max(-PLAYBACK_LATENCY_LIMIT_MS, min(PLAYBACK_LATENCY_LIMIT_MS, latency)),
+                    'preloaded': bool(sample.get('preloaded'))
+                })
+            except (KeyError, TypeError, ValueError, AttributeError, OverflowError):
+                continue
+        clock = data.get('clock')
+        if isinstance(clock, dict):
+            clock = {'offset_ms': finite_number(clock.get('offset_ms')),
+                     'rtt_ms': finite_number(clock.get('rtt_ms'))}
+        else:
+            clock = None
+        with playback_metrics_lock:
+            bound = playback_sids.setdefault(request.sid, (location, client_id))
+            if bound != (location, client_id):
+                return
+            clients = playback_metrics[location]
+            if client_id not in clients and len(clients) >= PLAYBACK_MAX_CLIENTS:
+                oldest = min(clients, key=lambda cid: clients[cid]['seen'])
+                del clients[oldest]
+            client = clients.setdefault(client_id, {
+                'samples': deque(maxlen=PLAYBACK_SAMPLE_HISTORY),
+                'transitions': 0,
+                'user_agent': None,
+                'last_seen': None,
+                'seen': 0.0,
+                'clock': None
+            })
+            client['samples'].extend(samples)
+            client['transitions'] += len(samples)
+            client['user_agent'] = (request.headers.get('User-Agent') or '')[:200]
+            if clock is not None:
+                client['clock'] = clock
+            client['seen'] = time.monotonic()
+            client['last_seen'] = datetime.now().isoformat(timespec='seconds')
+    except Exception as e:
+        logger.error(f"Playback metrics error: {e}")
+
 # ---------------------------------------------------------------------------
 # APPLICATION STARTUP
 # ---------------------------------------------------------------------------
@@ -1137,6 +2097,9 @@ if __name__ == '__main__':
         # Tüm lokasyonların thread'lerini durdur
         for location in LOCATIONS:
             stop_display_thread(location)
+        # Bekleyen içerik değişikliklerini diske yaz
+        journal_flusher.flush_all()
+        metrics_sampler.shutdown()
     except Exception as e:
         logger.error(f"Uygulama hatası: {e}")
         raise
@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+"""
+LED Panel Performans Ölçüm Takımı
+app_final uygulamasını geçici bir çalışma klasöründe, ağa çıkmadan ölçer:
+Flask test istemcisi ve yerel Socket.IO istemcileriyle 10 - 10 000 öğelik
+sentetik içerik listeleri ve sahte video dosyaları üzerinde
+
+    uploads   çok parçalı (multipart) ve parçalı oturumlu yükleme hızı
+    snapshot  join/resync ile gönderilen tam listenin boyutu ve JSON maliyeti
+    mutations süre/aktiflik/sıra değişikliği gecikmesi (eşzamanlı istemcilerle)
+    fanout    content_updated'in N izleyiciye ulaşma süresi ve baytı
+    jitter    oynatma zamanlayıcısının sapması (boşta ve değişiklik yükü altında)
+    probe     get_video_duration (ilk ölçüm ve önbellek isabeti)
+
+ölçülür. Video ölçümü varsayılan olarak sahtedir (ffprobe çağrılmaz);
+--real-ffprobe gerçek ölçücüyü kullanır. Sonuçlar sürümler arası
+karşılaştırma için JSON olarak yazılır; --compare önceki bir sonuç
+dosyasına göre %10'dan büyük değişimleri listeler.
+
+Kullanım:
+    python3 benchmark.py [--quick] [--sizes 10,100,1000,10000] [--concurrency 1,4,16]
+                         [--requests 30] [--clients 1,10,25] [--upload-mb 32]
+                         [--jitter-seconds 5] [--real-ffprobe] [--modules]
+                         [--output benchmark_results/<zaman>.json] [--compare eski.json]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import hashlib
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+LOCATION = 'belediye'
+
+# --compare: bu alanlar karşılaştırılır; True = yüksek değer daha iyi
+COMPARED_FIELDS = {
+    'p95_ms': False, 'mean_ms': False, 'bytes_per_mutation': False,
+    'throughput_rps': True, 'mb_per_s': True,
+}
+
+
+def percentiles(samples):
+    """Saniye cinsinden örneklerin ms özeti"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    count = len(ordered)
+
+    def pick(q):
+        return round(ordered[min(count - 1, int(count * q))] * 1000, 3)
+
+    return {
+        'count': count,
+        'mean_ms': round(sum(ordered) / count * 1000, 3),
+        'p50_ms': pick(0.50),
+        'p95_ms': pick(0.95),
+        'p99_ms': pick(0.99),
+        'max_ms': round(ordered[-1] * 1000, 3)
+    }
+
+
+def stub_probe(path):
+    """ffprobe yerine sabit metadata (yalnızca önbellek ve kilit maliyeti ölçülür)"""
+    return {'duration': 10.0, 'fps': 10.0, 'width': 64, 'height': 32, 'codec': 'mpeg4'}
+
+
+def make_fake_video(path, seconds=1, fps=10):
+    """Küçük, gerçekten çözülebilir bir mp4 yaz; kodlayıcı yoksa rastgele bayt"""
+    import cv2
+    import numpy as np
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (64, 32))
+    if writer.isOpened():
+        rng = np.random.default_rng(0)
+        for _ in range(seconds * fps):
+            writer.write(rng.integers(0, 256, (32, 64, 3), dtype=np.uint8))
+        writer.release()
+        if os.path.getsize(path) > 0:
+            return True
+    with open(path, 'wb') as f:
+        f.write(os.urandom(64 * 1024))
+    print("[WARN] mp4 kodlayıcısı yok, sahte video rastgele baytlardan oluşturuldu")
+    return False
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(predicate, timeout=30.0, interval=0.005):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return False
+
+
+def lock_totals(A):
+    """Lokasyon kilidinin (TimedLock) toplam bekleme/tutma süresi ve sayısı"""
+    lock = A.state[LOCATION]['lock']
+    totals = {}
+    for name, bound in (('wait', lock.wait), ('hold', lock.hold)):
+        series = list(bound.series)
+        totals[name] = (series[-1], sum(series[:-1]))
+    return totals
+
+
+def lock_means(before, after):
+    result = {}
+    for name in ('wait', 'hold'):
+        total = after[name][0] - before[name][0]
+        count = after[name][1] - before[name][1]
+        result[f'lock_{name}_mean_ms'] = round(total / count * 1000, 4) if count else None
+    return result
+
+
+def seed_location(A, size, video_src):
+    """Lokasyonu size öğelik sentetik listeyle doldur (her dört öğeden biri video)"""
+    A.stop_display_thread(LOCATION)
+    st = A.state[LOCATION]
+    upload_dir = st['upload_dir']
+    for name in os.listdir(upload_dir):
+        if name.startswith('bench_'):
+            os.remove(os.path.join(upload_dir, name))
+    items = []
+    for i in range(size):
+        is_video = i % 4 == 0
+        filename = f"bench_{i:05d}.{'mp4' if is_video else 'jpg'}"
+        path = os.path.join(upload_dir, filename)
+        if is_video:
+            os.link(video_src, path)
+        else:
+            with open(path, 'wb') as f:
+                f.write(b'\xff\xd8\xff\xe0bench')
+        items.append({
+            'id': 1_000_000 + i,
+            'filename': filename,
+            'type': 'video' if is_video else 'image',
+            'order': i,
+            'duration': 15 if is_video else 7,
+            'is_active': True,
+            # Sahte özet: adopt_location_blobs ve blob deposu devreye girmez
+            'sha256': f'{i:064x}'
+        })
+    with st['lock']:
+        st['content'] = items
+        st['journal'].content = [dict(x) for x in items]
+        A.rebuild_playlist(LOCATION)
+    st['journal'].compact()
+
+
+def bench_uploads(A, size_mb, repeats=3):
+    """Aynı veriyle multipart ve parçalı oturumlu yükleme; istek ve işlenme süresi"""
+    st = A.state[LOCATION]
+    client = A.app.test_client()
+    data = os.urandom(size_mb * 1024 * 1024)
+    digest = hashlib.sha256(data).hexdigest()
+    chunk = A.Config.UPLOAD_CHUNK_MB * 1024 * 1024
+    results = {}
+
+    def ingested(filename):
+        return lambda: any(x['filename'] == filename for x in st['content'])
+
+    for mode in ('multipart', 'chunked'):
+        request_times, ingest_times = [], []
+        for i in range(repeats):
+            filename = f'upload_{mode}_{i}.mp4'
+            t = time.perf_counter()
+            if mode == 'multipart':
+                r = client.post(f'/api/{LOCATION}/content/upload',
+                                data={'file': (io.BytesIO(data), filename)}, content_type='multipart/form-data')
+                ok = r.status_code == 202
+            else:
+                r = client.post(f'/api/{LOCATION}/uploads', json={'filename': filename, 'size': len(data), 'sha256': digest})
+                upload_id = r.get_json().get('upload_id')
+                ok = r.status_code == 201
+                for offset in range(0, len(data), chunk):
+                    if not ok:
+                        break
+                    r = client.put(f'/api/{LOCATION}/uploads/{upload_id}?offset={offset}',
+                                   data=data[offset:offset + chunk], content_type='application/octet-stream')
+                    ok = r.status_code == 200
+                if ok:
+                    ok = client.post(f'/api/{LOCATION}/uploads/{upload_id}/finalize').status_code == 202
+            requested = time.perf_counter() - t
+            if not ok:
+                print(f"[ERROR] {mode} yükleme başarısız: HTTP {r.status_code}")
+                continue
+            if not wait_for(ingested(filename)):
+                print(f"[ERROR] {filename} işlenmedi")
+                continue
+            request_times.append(requested)
+            ingest_times.append(time.perf_counter() - t - requested)
+        if request_times:
+            best = min(request_times)
+            results[mode] = {
+                'size_mb': size_mb,
+                'mb_per_s': round(size_mb / best, 1),
+                'request': percentiles(request_times),
+                'ingest': percentiles(ingest_times)
+            }
+            print(f"[OK] {mode:<10} {size_mb} MB: {size_mb / best:7.1f} MB/s, işlenme {min(ingest_times) * 1000:.0f} ms")
+    return results
+
+
+def bench_snapshot(A, repeats=20):
+    """Tam içerik listesi olayının (join/resync) boyutu ve JSON kodlama süresi"""
+    times = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        raw = json.dumps(A.content_snapshot(LOCATION), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        times.append(time.perf_counter() - t)
+    return dict(percentiles(times), bytes=len(raw))
+
+
+def bench_mutations(A, size, levels, requests):
+    """Eşzamanlı değişiklik istekleri: süre, aktiflik ve sıra değişikliği"""
+    st = A.state[LOCATION]
+    ids = [x['id'] for x in st['content']]
+    results = {}
+    for threads in levels:
+        samples = {'duration': [], 'active': [], 'order': []}
+        errors = []
+
+        def worker(seed):
+            rnd = random.Random(seed)
+            client = A.app.test_client()
+            for k in range(requests):
+                kind = ('duration', 'active', 'order')[k % 3]
+                content_id = rnd.choice(ids)
+                t = time.perf_counter()
+                if kind == 'duration':
+                    r = client.put(f'/api/{LOCATION}/content/{content_id}/duration', json={'duration': rnd.randint(1, 60)})
+                elif kind == 'active':
+                    r = client.put(f'/api/{LOCATION}/content/{content_id}/active', json={'is_active': rnd.random() < 0.9})
+                else:
+                    r = client.post(f'/api/{LOCATION}/content/order',
+                                    json={'order': [{'id': content_id, 'order': rnd.randrange(size)}]})
+                samples[kind].append(time.perf_counter() - t)
+                if r.status_code != 200:
+                    errors.append(r.status_code)
+
+        before = lock_totals(A)
+        pool = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+        t = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        wall = time.perf_counter() - t
+        A.journal_flusher.flush_all()
+        total = sum(len(v) for v in samples.values())
+        everything = [x for v in samples.values() for x in v]
+        results[str(threads)] = dict({
+            'requests': total,
+            'errors': len(errors),
+            'throughput_rps': round(total / wall, 1),
+            'latency': percentiles(everything),
+            'by_endpoint': {kind: percentiles(v) for kind, v in samples.items()}
+        }, **lock_means(before, lock_totals(A)))
+        summary = results[str(threads)]
+        print(f"[OK] {size:>6} öğe, {threads:>2} eşzamanlı: {summary['throughput_rps']:8.1f} istek/s, "
+              f"p95 {summary['latency']['p95_ms']:.2f} ms, kilit bekleme {summary['lock_wait_mean_ms']} ms")
+    # Sıra değişiklikleri ve pasif yapılan öğeler sonraki ölçümleri etkilemesin
+    with st['lock']:
+        for i, item in enumerate(sorted(st['content'], key=lambda x: x['id'])):
+            item['order'] = i
+            item['is_active'] = True
+        st['content'].sort(key=lambda x: x['order'])
+        A.rebuild_playlist(LOCATION)
+    return results
+
+
+def bench_fanout(A, url, counts, mutations):
+    """Bir değişikliğin N izleyicinin hepsine ulaşma süresi ve izleyici başına bayt"""
+    import socketio
+
+    st = A.state[LOCATION]
+    ids = [x['id'] for x in st['content']]
+    client = A.app.test_client()
+    results = {}
+    for count in counts:
+        cond = threading.Condition()
+        received = {}  # version -> [teslim sayısı, son teslim anı]
+
+        def on_update(data):
+            with cond:
+                entry = received.setdefault(data.get('version'), [0, 0.0])
+                entry[0] += 1
+                entry[1] = time.perf_counter()
+                cond.notify_all()
+
+        viewers = []
+        try:
+            for _ in range(count):
+                viewer = socketio.Client(reconnection=False)
+                viewer.on('content_updated', on_update)
+                viewer.connect(url, wait_timeout=10)
+                viewer.emit('join_location', {'location': LOCATION})
+                viewers.append(viewer)
+            with cond:
+                joined = cond.wait_for(lambda: received.get(st['version'], [0])[0] >= count, timeout=30)
+                received.clear()
+            if not joined:
+                print(f"[WARN] {count} izleyicinin hepsi odaya katılamadı")
+            with A.room_stats_lock:
+                before = dict(A.room_stats[LOCATION])
+            request_times, delivery_times, lost = [], [], 0
+            rnd = random.Random(count)
+            for _ in range(mutations):
+                t = time.perf_counter()
+                client.put(f'/api/{LOCATION}/content/{rnd.choice(ids)}/duration', json={'duration': rnd.randint(1, 60)})
+                request_times.append(time.perf_counter() - t)
+                version = st['version']
+                with cond:
+                    if cond.wait_for(lambda: received.get(version, [0])[0] >= count, timeout=10):
+                        delivery_times.append(received[version][1] - t)
+                    else:
+                        lost += 1
+            with A.room_stats_lock:
+                after = dict(A.room_stats[LOCATION])
+            transport = viewers[0].transport() if viewers else None
+        finally:
+            for viewer in viewers:
+                try:
+                    viewer.disconnect()
+                except Exception:
+                    pass
+        results[str(count)] = {
+            'transport': transport,
+            'request': percentiles(request_times),
+            'delivery': percentiles(delivery_times),
+            'lost': lost,
+            'messages_per_mutation': round((after['messages'] - before['messages']) / mutations, 2),
+            'bytes_per_mutation': round((after['bytes'] - before['bytes']) / mutations, 1)
+        }
+        delivery = results[str(count)]['delivery']
+        print(f"[OK] {count:>3} izleyici ({transport}): tümüne ulaşma p95 {delivery.get('p95_ms')} ms, "
+              f"değişiklik başına {results[str(count)]['bytes_per_mutation']:.0f} bayt")
+    return results
+
+
+def bench_jitter(A, seconds, loaded):
+    """1 sn'lik görsellerle oynatma; her geçişin planlanan son tarihe göre gecikmesi"""
+    st = A.state[LOCATION]
+    with st['lock']:
+        for item in st['content']:
+            item['duration'] = 1
+            # Video süresi dosyadan ölçülür (1 sn'ye indirilemez); ölçüm süresince yayından çıkar
+            item['is_active'] = item['type'] != 'video'
+        A.rebuild_playlist(LOCATION)
+    ids = [x['id'] for x in st['content']]
+    samples = []
+    scheduler = A.display_scheduler
+    original = scheduler.on_lateness
+
+    def collect(location, lateness):
+        if location == LOCATION:
+            samples.append(lateness)
+        original(location, lateness)
+
+    stop = threading.Event()
+
+    def load():
+        client = A.app.test_client()
+        rnd = random.Random(7)
+        while not stop.is_set():
+            client.put(f'/api/{LOCATION}/content/{rnd.choice(ids)}/duration', json={'duration': 1})
+
+    scheduler.on_lateness = collect
+    loader = threading.Thread(target=load, daemon=True) if loaded else None
+    try:
+        if loader:
+            loader.start()
+        A.start_display_thread(LOCATION)
+        time.sleep(seconds)
+    finally:
+        A.stop_display_thread(LOCATION)
+        stop.set()
+        if loader:
+            loader.join()
+        scheduler.on_lateness = original
+        with st['lock']:
+            for item in st['content']:
+                item['is_active'] = True
+            A.rebuild_playlist(LOCATION)
+    # İlk geçiş başlatma anında planlanır, ölçüme katılmaz
+    return percentiles(samples[1:])
+
+
+def bench_probe(A, video_src, count=20):
+    """get_video_duration: ilk ölçüm (önbellek boş) ve önbellekten okuma"""
+    probe_dir = os.path.join(A.Config.BASE_UPLOAD, 'probe_bench')
+    os.makedirs(probe_dir, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(probe_dir, f'probe_{i}.mp4')
+        shutil.copyfile(video_src, path)
+        paths.append(path)
+    results = {}
+    for phase in ('cold', 'warm'):
+        times = []
+        for path in paths:
+            t = time.perf_counter()
+            A.get_video_duration(path)
+            times.append(time.perf_counter() - t)
+        results[phase] = percentiles(times)
+    print(f"[OK] get_video_duration: ilk ölçüm p50 {results['cold']['p50_ms']} ms, önbellek p50 {results['warm']['p50_ms']} ms")
+    return results
+
+
+def run_module_benchmarks():
+    """Modüllerin kendi --benchmark ölçümleri (isteğe bağlı, --modules)"""
+    results = {}
+    for name in ('block_delta', 'color_pipeline', 'transitions', 'panel_renderer'):
+        print(f"[INFO] {name} --benchmark")
+        try:
+            module = __import__(name)
+            results[name] = module._benchmark()
+        except Exception as e:
+            print(f"[WARN] {name} ölçülemedi: {e}")
+            results[name] = {'error': str(e)}
+    return results
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def _flatten(data, prefix=''):
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from _flatten(value, f'{prefix}/{key}' if prefix else str(key))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        yield prefix, data
+
+
+def compare(old_path, new):
+    """Önceki sonuç dosyasına göre %10'dan büyük değişimleri yazdır"""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = dict(_flatten(json.load(f).get('results', {})))
+    regressions = 0
+    print(f"\n=== Karşılaştırma: {old_path} ===")
+    for path, value in _flatten(new):
+        field = path.rsplit('/', 1)[-1]
+        if field not in COMPARED_FIELDS or not old.get(path):
+            continue
+        change = (value - old[path]) / old[path]
+        if abs(change) < 0.10:
+            continue
+        worse = change < 0 if COMPARED_FIELDS[field] else change > 0
+        regressions += worse
+        print(f"{'[WARN]' if worse else '[OK]  '} {path}: {old[path]} -> {value} ({change * 100:+.0f}%)")
+    print(f"[INFO] {regressions} gerileme")
+    return regressions
+
+
+def parse_list(value):
+    return [int(x) for x in value.split(',') if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LED Panel performans ölçümleri (çevrimdışı)')
+    parser.add_argument('--quick', action='store_true', help='Küçük boyutlarla hızlı tur')
+    parser.add_argument('--sizes', type=parse_list, default=None, help='İçerik listesi boyutları (10,100,1000,10000)')
+    parser.add_argument('--concurrency', type=parse_list, default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=30, help='Eşzamanlı istemci başına istek')
+    parser.add_argument('--clients', type=parse_list, default=None, help='Socket.IO izleyici sayıları (1,10,25)')
+    parser.add_argument('--mutations', type=int, default=20, help='Yayılım ölçümünde değişiklik sayısı')
+    parser.add_argument('--upload-mb', type=int, default=None)
+    parser.add_argument('--jitter-seconds', type=float, default=None)
+    parser.add_argument('--real-ffprobe', action='store_true', help='Video süresini gerçekten ölç (ffprobe/OpenCV)')
+    parser.add_argument('--modules', action='store_true', help='Modüllerin kendi --benchmark ölçümlerini de çalıştır')
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--compare', default=None, help='Karşılaştırılacak önceki sonuç dosyası')
+    args = parser.parse_args()
+    sizes = args.sizes or ([10, 100] if args.quick else [10, 100, 1000, 10000])
+    clients = args.clients or ([1, 5] if args.quick else [1, 10, 25])
+    upload_mb = args.upload_mb or (8 if args.quick else 32)
+    jitter_seconds = args.jitter_seconds or (2.0 if args.quick else 5.0)
+    output = os.path.abspath(args.output or os.path.join(
+        'benchmark_results', f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"))
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    # Uygulama göreli yolları (uploads, logs) kullanır; gerçek içerikler etkilenmesin
+    work = tempfile.mkdtemp(prefix='ledpanel-bench-')
+    os.chdir(work)
+    os.makedirs('logs', exist_ok=True)
+    os.environ['STANDALONE_MODE'] = 'false'
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    sys.path.insert(0, REPO)
+    print(f"[INFO] Çalışma klasörü: {work}")
+
+    import logging
+    import app_final as A
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    A.app.config['LOGIN_DISABLED'] = True
+    A.create_directories()
+    A.init_location_state()
+    if not args.real_ffprobe:
+        A.media_cache.prober = stub_probe
+    port = free_port()
+    threading.Thread(target=lambda: A.socketio.run(A.app, host='127.0.0.1', port=port, allow_unsafe_werkzeug=True,
+                                                   log_output=False, use_reloader=False),
+                     name='bench-server', daemon=True).start()
+    url = f'http://127.0.0.1:{port}'
+    if not wait_for(lambda: socket.socket().connect_ex(('127.0.0.1', port)) == 0, timeout=10):
+        print("[ERROR] Socket.IO sunucusu başlamadı")
+        sys.exit(1)
+
+    video_src = os.path.join(work, 'sample.mp4')
+    real_video = make_fake_video(video_src)
+    report = {
+        'meta': dict(environment_info(), args={
+            'sizes': sizes, 'concurrency': args.concurrency, 'requests': args.requests, 'clients': clients,
+            'mutations': args.mutations, 'upload_mb': upload_mb, 'jitter_seconds': jitter_seconds,
+            'real_ffprobe': args.real_ffprobe, 'real_video': real_video
+        }),
+        'results': {}
+    }
+    results = report['results']
+    try:
+        print(f"\n=== Yükleme ({upload_mb} MB) ===")
+        results['uploads'] = bench_uploads(A, upload_mb)
+
+        results['sizes'] = {}
+        for size in sizes:
+            print(f"\n=== {size} öğe ===")
+            t = time.perf_counter()
+            seed_location(A, size, video_src)
+            print(f"[INFO] Liste hazırlandı ({time.perf_counter() - t:.1f} s)")
+            entry = results['sizes'][str(size)] = {}
+            entry['snapshot'] = bench_snapshot(A)
+            print(f"[OK] Tam liste: {entry['snapshot']['bytes'] / 1024:.1f} KB, kodlama p50 {entry['snapshot']['p50_ms']} ms")
+            entry['mutations'] = bench_mutations(A, size, args.concurrency, args.requests)
+            entry['fanout'] = bench_fanout(A, url, clients, args.mutations)
+            entry['jitter'] = {}
+            for mode, loaded in (('idle', False), ('loaded', True)):
+                entry['jitter'][mode] = bench_jitter(A, jitter_seconds, loaded)
+                print(f"[OK] Zamanlama sapması ({mode}): p95 {entry['jitter'][mode].get('p95_ms')} ms, "
+                      f"en fazla {entry['jitter'][mode].get('max_ms')} ms")
+
+        print("\n=== Video süresi ölçümü ===")
+        results['probe'] = bench_probe(A, video_src)
+
+        if args.modules:
+            print("\n=== Modül ölçümleri ===")
+            results['modules'] = run_module_benchmarks()
+    finally:
+        A.stop_display_thread(LOCATION)
+        A.journal_flusher.flush_all()
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n[OK] Sonuçlar yazıldı: {output}")
+        shutil.rmtree(work, ignore_errors=True)
+
+    if compare_path:
+        compare(compare_path, results)
+
+
+if __name__ == '__main__':
+    main()
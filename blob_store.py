@@ -0,0 +1,128 @@
+"""
+LED Panel İçerik Adresli Medya Deposu
+Dosyalar SHA-256 özetine göre uploads/.blobs/<ab>/<özet> altında bir kez
+saklanır; lokasyon klasörlerindeki dosyalar bu bloblara hardlink'tir.
+Aynı dosya birden çok lokasyona ek disk ve aktarım maliyeti olmadan eklenir.
+Blob'a bağlı lokasyon dosyası ve içerik kaydı kalmayınca blob silinir (GC).
+"""
+
+import os
+import shutil
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def hash_file(path, block_size=1024 * 1024):
+    """Dosyanın SHA-256 özetini (hex) hesapla"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _is_sha256(value):
+    return isinstance(value, str) and len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+
+class BlobStore:
+    """SHA-256 -> blob dosyası; referans sayımı hardlink sayısı (st_nlink) ile yapılır.
+
+    Hardlink desteklemeyen dosya sistemlerinde kopyaya düşülür; bu durumda
+    referanslar yalnızca içerik listelerinden sayılır.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+
+    def path(self, sha256):
+        if not _is_sha256(sha256):
+            raise ValueError(f'Geçersiz SHA-256: {sha256}')
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def exists(self, sha256):
+        try:
+            return os.path.exists(self.path(sha256))
+        except ValueError:
+            return False
+
+    @staticmethod
+    def _link_or_copy(src, dst):
+        """src'yi dst'ye hardlink olarak atomik yerleştir; olmazsa kopyala"""
+        tmp = f"{dst}.{threading.get_ident()}.tmp"
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+
+    def ingest(self, filepath, sha256=None):
+        """Dosyayı depoya al ve özetini döndür.
+
+        Aynı içerik zaten varsa filepath mevcut blob'a hardlink ile değiştirilir
+        (tekrarlı kopya diskte yer kaplamaz).
+        """
+        sha256 = sha256 or hash_file(filepath)
+        blob = self.path(sha256)
+        with self.lock:
+            if os.path.exists(blob):
+                if not os.path.samefile(blob, filepath):
+                    self._link_or_copy(blob, filepath)
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                self._link_or_copy(filepath, blob)
+        return sha256
+
+    def link_into(self, sha256, dest):
+        """Blob'u hedef yola yerleştir (lokasyona paylaşım / senkronizasyon)"""
+        blob = self.path(sha256)
+        with self.lock:
+            if not os.path.exists(blob):
+                raise FileNotFoundError(blob)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            if os.path.exists(dest) and os.path.samefile(blob, dest):
+                return dest
+            self._link_or_copy(blob, dest)
+        return dest
+
+    def collect(self, sha256s, referenced):
+        """Artık başvurulmayan blobları sil; silinen özetleri döndür.
+
+        referenced: içerik listelerinde hâlâ geçen özetler kümesi.
+        Hardlink sayısı >1 ise bir lokasyon dosyası blob'u kullanmaya devam ediyordur.
+        """
+        removed = []
+        with self.lock:
+            for sha256 in set(sha256s):
+                if not _is_sha256(sha256) or sha256 in referenced:
+                    continue
+                blob = self.path(sha256)
+                try:
+                    if os.stat(blob).st_nlink > 1:
+                        continue
+                    os.remove(blob)
+                    removed.append(sha256)
+                    logger.info(f"Kullanılmayan blob silindi: {sha256}")
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    logger.error(f"Blob silinemedi: {sha256} - {e}")
+        return removed
+
+    def stats(self):
+        """Depodaki blob sayısı ve toplam boyut"""
+        count = size = 0
+        if os.path.isdir(self.root):
+            for prefix in os.listdir(self.root):
+                folder = os.path.join(self.root, prefix)
+                if not os.path.isdir(folder):
+                    continue
+                for name in os.listdir(folder):
+                    if _is_sha256(name):
+                        count += 1
+                        size += os.path.getsize(os.path.join(folder, name))
+        return {'blobs': count, 'bytes': size}
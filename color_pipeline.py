@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+LED Panel Renk Hattı
+Panele gönderilen her kareye parlaklık, gamma ve RGB_SEQUENCE uygulanır.
+Tek bir 256 girişlik arama tablosu (LUT) parlaklık değişince yeniden
+hesaplanır; kareler yeniden çözülmeden bir sonraki gönderimde yeni parlaklıkla
+çıkar. Kanal sırası kopya yerine çıkış tamponunun kanal görünümleriyle
+(strided view) uygulanır: her çıkış kanalı kaynağın ilgili kanalından doğrudan
+LUT ile doldurulur.
+
+Sürücü (rgbmatrix) CIE1931 parlaklık düzeltmesini tam PWM derinliğinde
+yapmaya devam eder. PWM_BITS düşükken en koyu tonlar sıfır görev oranına
+düşer; LUT sıfır olmayan girişleri o derinlikte görünen en küçük değere
+yükseltir (koyu içerik dimlenince kaybolmaz).
+
+Ölçüm: python3 color_pipeline.py --benchmark
+"""
+
+import sys
+import time
+import threading
+
+import cv2
+import numpy as np
+
+from config import LEDPanelConfig
+
+CHANNELS = 'RGB'
+
+
+def channel_order(sequence):
+    """RGB_SEQUENCE -> her çıkış kanalı için kaynak (RGB) kanal indisi"""
+    sequence = (sequence or CHANNELS).upper()
+    if sorted(sequence) != sorted(CHANNELS):
+        raise ValueError(f'Geçersiz RGB_SEQUENCE: {sequence}')
+    return tuple(CHANNELS.index(c) for c in sequence)
+
+
+def cie1931(value, pwm_bits):
+    """Sürücünün 8 bit değeri PWM görev oranına çevirmesi (CIE1931 yaklaşımı)"""
+    lightness = value * 100.0 / 255.0
+    if lightness <= 8:
+        luminance = lightness / 902.3
+    else:
+        luminance = ((lightness + 16) / 116.0) ** 3
+    return int(luminance * ((1 << pwm_bits) - 1))
+
+
+def visible_floor(pwm_bits):
+    """Bu PWM derinliğinde sıfır olmayan görev oranı veren en küçük 8 bit değer"""
+    for value in range(1, 256):
+        if cie1931(value, pwm_bits) > 0:
+            return value
+    return 255
+
+
+def build_lut(brightness, gamma=1.0, pwm_bits=LEDPanelConfig.PWM_BITS):
+    """Parlaklık (0-100) ve ek gamma için 256 girişlik uint8 tablo"""
+    x = np.arange(256, dtype=np.float64) / 255.0
+    lut = np.round(255.0 * np.power(x, gamma) * (max(0, min(100, brightness)) / 100.0))
+    if brightness > 0:
+        lut[1:] = np.maximum(lut[1:], visible_floor(pwm_bits))
+    return lut.astype(np.uint8)
+
+
+class ColorPipeline:
+    """Panel karelerini LUT ve kanal sırasıyla önceden ayrılmış çıkış tamponuna yazar"""
+
+    def __init__(self, width, height, cfg=LEDPanelConfig):
+        self.pwm_bits = cfg.PWM_BITS
+        self.gamma = getattr(cfg, 'GAMMA', 1.0)
+        self.order = channel_order(cfg.RGB_SEQUENCE)
+        self.identity = self.order == (0, 1, 2)
+        self.out = np.empty((height, width, 3), dtype=np.uint8)
+        # Çıkış kanallarının görünümleri bir kez oluşturulur (kopya değil)
+        self._out_channels = [self.out[..., k] for k in range(3)]
+        self.lock = threading.Lock()
+        self.brightness = None
+        self.version = 0
+        self.set_brightness(cfg.BRIGHTNESS)
+
+    def set_brightness(self, brightness):
+        """LUT'u yeniden hesapla; version artar, sabit kareler yeniden gönderilir"""
+        brightness = max(0, min(100, int(brightness)))
+        lut = build_lut(brightness, self.gamma, self.pwm_bits)
+        with self.lock:
+            self.lut = lut
+            self.brightness = brightness
+            self.version += 1
+
+    def apply(self, frame):
+        """RGB panel karesini dönüştür; sonuç self.out (her çağrıda aynı tampon)"""
+        lut = self.lut
+        if self.identity:
+            cv2.LUT(frame, lut, dst=self.out)
+        else:
+            for k, source in enumerate(self.order):
+                np.take(lut, frame[..., source], out=self._out_channels[k], mode='clip')
+        return self.out
+
+
+def _benchmark(iterations=2000):
+    """Yapılandırılan ve yaygın panel boyutlarında kare başına dönüşüm maliyeti (µs)"""
+    base_w, base_h = LEDPanelConfig.PANEL_COLS, LEDPanelConfig.PANEL_ROWS
+    sizes = []
+    for chain, parallel in ((LEDPanelConfig.CHAIN_LENGTH, LEDPanelConfig.PARALLEL), (2, 1), (4, 2), (8, 3)):
+        size = (base_w * chain, base_h * parallel)
+        if size not in sizes:
+            sizes.append(size)
+
+    class _Cfg(LEDPanelConfig):
+        pass
+
+    results = []
+    print(f"PWM_BITS={LEDPanelConfig.PWM_BITS}, görünür en küçük değer={visible_floor(LEDPanelConfig.PWM_BITS)}")
+    print(f"{'Panel':<12}{'Sıra':<6}{'µs/kare':>10}{'fps tavanı':>12}")
+    for width, height in sizes:
+        frame = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+        for sequence in ('RGB', 'GRB', 'BGR'):
+            _Cfg.RGB_SEQUENCE = sequence
+            pipeline = ColorPipeline(width, height, _Cfg)
+            pipeline.apply(frame)
+            t = time.perf_counter()
+            for _ in range(iterations):
+                pipeline.apply(frame)
+            per_frame = (time.perf_counter() - t) / iterations * 1e6
+            # Doğrulama: fancy-index ile kopyalı hesaplama aynı sonucu vermeli
+            expected = pipeline.lut[frame][..., list(pipeline.order)]
+            assert np.array_equal(pipeline.out, expected), sequence
+            results.append({'panel': f'{width}x{height}', 'rgb_sequence': sequence,
+                            'us_per_frame': round(per_frame, 2)})
+            print(f"{f'{width}x{height}':<12}{sequence:<6}{per_frame:>10.1f}{1e6 / per_frame:>12.0f}")
+    pipeline = ColorPipeline(base_w, base_h)
+    t = time.perf_counter()
+    for brightness in range(100):
+        pipeline.set_brightness(brightness)
+    print(f"Parlaklık değişimi (LUT yeniden hesaplama): {(time.perf_counter() - t) / 100 * 1e6:.0f} µs")
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 2 and sys.argv[1] == '--benchmark':
+        _benchmark()
+    else:
+        print("Kullanım: python3 color_pipeline.py --benchmark")
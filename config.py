@@ -60,6 +60,9 @@ class LEDPanelConfig:
     # RGB sıralama (panel tipine göre değişebilir)
     RGB_SEQUENCE = 'RGB'  # 'RGB', 'RBG', 'GRB', 'GBR', 'BRG', 'BGR'
     
+    # Sürücünün CIE1931 düzeltmesine ek gamma (1.0 = ek düzeltme yok)
+    GAMMA = 1.0
+    
     # Görüntü işleme ayarları
     IMAGE_SCALE_MODE = 'fast'  # 'fast', 'quality'
     IMAGE_INTERPOLATION = 'lanczos'  # 'nearest', 'bilinear', 'bicubic', 'lanczos'
@@ -73,6 +76,7 @@ class DisplayConfig:
     # Geçiş efektleri
     TRANSITION_DURATION = 0.5  # Geçiş süresi (saniye)
     ENABLE_TRANSITIONS = True
+    TRANSITION_EFFECT = 'crossfade'  # 'crossfade', 'wipe', 'slide'
     
     # Döngü ayarları
     LOOP_CONTENT = True
@@ -0,0 +1,258 @@
+"""
+LED Panel İçerik Günlüğü (write-ahead journal)
+content_list.json her değişiklikte baştan yazılmaz; değişiklikler delta
+işlemleri olarak content_list.journal dosyasına eklenir ve fsync edilir.
+Günlük belli bir boyuta ulaşınca içerik listesi geçici dosyaya yazılıp atomik
+olarak yeniden adlandırılır (snapshot) ve günlük sıfırlanır.
+Yazma işlemleri arka plandaki tek bir thread tarafından toplu yapılır.
+"""
+
+import os
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def apply_content_ops(content, ops):
+    """Delta işlemlerini içerik listesine yerinde uygula (static/content_delta.js ile aynı anlam).
+
+    {'op': 'add', 'item', 'index'}, {'op': 'remove', 'id'},
+    {'op': 'patch', 'id', 'fields'}, {'op': 'move', 'id', 'index'},
+    {'op': 'reset', 'content'}; sonunda 'order' alanları sıraya göre yenilenir.
+    """
+    def index_of(content_id):
+        for i, x in enumerate(content):
+            if x['id'] == content_id:
+                return i
+        return -1
+
+    for op in ops:
+        kind = op.get('op')
+        if kind == 'add':
+            if index_of(op['item']['id']) == -1:
+                at = op.get('index')
+                at = len(content) if at is None else min(at, len(content))
+                content.insert(at, dict(op['item']))
+        elif kind == 'remove':
+            i = index_of(op['id'])
+            if i != -1:
+                content.pop(i)
+        elif kind == 'patch':
+            i = index_of(op['id'])
+            if i != -1:
+                content[i].update(op['fields'])
+        elif kind == 'move':
+            i = index_of(op['id'])
+            if i != -1:
+                moved = content.pop(i)
+                content.insert(min(op['index'], len(content)), moved)
+        elif kind == 'reset':
+            content[:] = [dict(x) for x in op['content']]
+    for i, x in enumerate(content):
+        x['order'] = i
+    return content
+
+
+def _fsync_dir(path):
+    """Yeniden adlandırmanın kalıcı olması için dizini fsync et (Windows'ta desteklenmez)"""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except Exception:
+        pass
+
+
+class ContentJournal:
+    """Tek bir content_list.json için snapshot + ekleme günlüğü"""
+
+    def __init__(self, snapshot_file, flusher=None, compact_every=200):
+        self.snapshot_file = snapshot_file
+        self.journal_file = os.path.splitext(snapshot_file)[0] + '.journal'
+        self.flusher = flusher
+        self.compact_every = compact_every
+        self.lock = threading.Lock()
+        self.io_lock = threading.RLock()  # flush/compact sırasını korur
+        self.pending = []        # henüz diske yazılmamış kayıtlar
+        self.content = []        # diske yazılmış hâlin kopyası (snapshot için)
+        self.records = 0         # son snapshot'tan beri günlükteki kayıt sayısı
+        self.seq = 0
+
+    @staticmethod
+    def _digest(data):
+        return hashlib.sha1(data).hexdigest()
+
+    def load(self):
+        """Snapshot'ı oku, ona ait günlüğü yeniden oynat ve içerik listesini döndür"""
+        content = []
+        digest = None
+        try:
+            if os.path.exists(self.snapshot_file):
+                with open(self.snapshot_file, 'rb') as f:
+                    raw = f.read()
+                digest = self._digest(raw)
+                content = json.loads(raw.decode('utf-8')) if raw.strip() else []
+        except Exception as e:
+            # Bozuk dosyayı kaybetmemek için kenara al
+            broken = f"{self.snapshot_file}.corrupt-{int(time.time())}"
+            logger.error(f"İçerik listesi okunamadı ({e}), {broken} olarak saklandı")
+            try:
+                os.replace(self.snapshot_file, broken)
+            except Exception:
+                pass
+            content, digest = [], None
+
+        replayed = 0
+        try:
+            if os.path.exists(self.journal_file):
+                with open(self.journal_file, 'r', encoding='utf-8') as f:
+                    header = None
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # Elektrik kesintisinde yarım kalmış son satır
+                            logger.warning(f"Günlükte yarım kayıt atlandı: {self.journal_file}")
+                            break
+                        if header is None:
+                            header = record
+                            if header.get('snapshot') != digest:
+                                # Snapshot dışarıdan (ör. senkronizasyon) değişmiş; günlük eskidir
+                                logger.warning(f"Günlük snapshot ile eşleşmiyor, yok sayıldı: {self.journal_file}")
+                                break
+                            continue
+                        apply_content_ops(content, record.get('ops', []))
+                        self.seq = max(self.seq, record.get('seq', 0))
+                        replayed += 1
+        except Exception as e:
+            logger.error(f"Günlük okunamadı: {self.journal_file} - {e}")
+
+        with self.lock:
+            self.content = [dict(x) for x in content]
+        # Yeniden oynatılan kayıtları snapshot'a katla; her açılış temiz bir günlükle başlar
+        self.compact()
+        if replayed:
+            logger.info(f"Günlükten {replayed} kayıt yeniden oynatıldı: {self.journal_file}")
+        return content
+
+    def append(self, ops):
+        """Değişikliği kuyruğa ekle; disk yazımı arka planda yapılır"""
+        if not ops:
+            return
+        with self.lock:
+            self.seq += 1
+            self.pending.append({'seq': self.seq, 'ts': round(time.time(), 3), 'ops': ops})
+        if self.flusher is not None:
+            self.flusher.mark_dirty(self)
+        else:
+            self.flush()
+
+    def flush(self):
+        """Bekleyen kayıtları tek yazma + fsync ile günlüğe ekle"""
+        with self.io_lock:
+            self._flush()
+
+    def _flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return
+        data = ''.join(json.dumps(r, ensure_ascii=False, separators=(',', ':')) + '\n' for r in batch)
+        try:
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            logger.error(f"Günlük yazma hatası: {self.journal_file} - {e}")
+            with self.lock:
+                self.pending[:0] = batch
+            return
+        with self.lock:
+            for r in batch:
+                apply_content_ops(self.content, r['ops'])
+            self.records += len(batch)
+            need_compact = self.records >= self.compact_every
+        if need_compact:
+            self._compact()
+
+    def compact(self):
+        """İçerik listesini atomik olarak snapshot'a yaz ve günlüğü sıfırla"""
+        with self.io_lock:
+            self._compact()
+
+    def _compact(self):
+        with self.lock:
+            snapshot = [dict(x) for x in self.content]
+        raw = json.dumps(snapshot, ensure_ascii=False, indent=2).encode('utf-8')
+        tmp_file = f"{self.snapshot_file}.tmp"
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+            _fsync_dir(self.snapshot_file)
+
+            header = json.dumps({'snapshot': self._digest(raw), 'ts': round(time.time(), 3)}) + '\n'
+            tmp_journal = f"{self.journal_file}.tmp"
+            with open(tmp_journal, 'w', encoding='utf-8') as f:
+                f.write(header)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_journal, self.journal_file)
+            _fsync_dir(self.journal_file)
+            with self.lock:
+                self.records = 0
+            logger.debug(f"İçerik snapshot'ı yazıldı: {self.snapshot_file}")
+        except Exception as e:
+            logger.error(f"İçerik snapshot yazma hatası: {self.snapshot_file} - {e}")
+
+
+class JournalFlusher:
+    """Kirli günlükleri kısa bir toplama penceresinden sonra tek thread'de diske yazar.
+
+    on_flush(saniye) verilirse her günlüğün diske yazılma süresiyle çağrılır.
+    """
+
+    def __init__(self, batch_delay=0.05, on_flush=None):
+        self.batch_delay = batch_delay
+        self.on_flush = on_flush
+        self.cond = threading.Condition()
+        self.dirty = set()
+        self.thread = None
+        atexit.register(self.flush_all)
+
+    def mark_dirty(self, journal):
+        with self.cond:
+            self.dirty.add(journal)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='content-journal', daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def flush_all(self):
+        """Bekleyen tüm kayıtları hemen yaz (kapanışta da çağrılır)"""
+        with self.cond:
+            journals, self.dirty = self.dirty, set()
+        for journal in journals:
+            started = time.perf_counter()
+            journal.flush()
+            if self.on_flush:
+                self.on_flush(time.perf_counter() - started)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.dirty:
+                    self.cond.wait()
+            # Yakın zamanda gelecek diğer değişiklikleri aynı fsync'e topla
+            time.sleep(self.batch_delay)
+            self.flush_all()
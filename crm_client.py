@@ -0,0 +1,251 @@
+"""
+LED Panel CRM İstemcisi
+CRM token ve LED yetki servislerine keep-alive bağlantı havuzlu tek bir
+requests.Session ile gidilir. Sonuçlar süreli önbellekte (TTL) tutulur:
+token'lar kimlik bilgilerinin süreç içi HMAC'i ile, yetki sonuçları token
+özetiyle anahtarlanır. Aynı anahtar için eşzamanlı istekler tek CRM
+çağrısına indirgenir. CRM art arda hata verirse devre kesici açılır ve
+istekler CRM'i beklemeden hemen reddedilir; süre dolunca tek bir deneme
+isteğiyle yeniden kapanır.
+"""
+
+import os
+import json
+import hmac
+import time
+import hashlib
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class CRMUnavailable(Exception):
+    """CRM'e ulaşılamıyor (ağ hatası, 5xx veya açık devre kesici)"""
+
+
+class CircuitBreaker:
+    """threshold ardışık hatada açılır; reset_seconds sonra tek deneme isteğine izin verir"""
+
+    def __init__(self, threshold=5, reset_seconds=30):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_seconds or self.trial:
+                return False
+            self.trial = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info("CRM devre kesici kapandı")
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.error(f"CRM devre kesici açıldı ({self.failures} ardışık hata)")
+                self.opened_at = time.monotonic()
+
+
+class _Flight:
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """Süreli önbellek; aynı anahtar için eşzamanlı yüklemeler tek çağrıya indirgenir"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}   # anahtar -> (değer, son_geçerlilik)
+        self.inflight = {}  # anahtar -> _Flight
+        self.hits = self.misses = self.coalesced = 0
+
+    def get_or_load(self, key, loader):
+        """loader() -> (değer, ttl_saniye); ttl <= 0 ise sonuç önbelleğe alınmaz"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            flight = self.inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        ttl = 0
+        try:
+            value, ttl = loader()
+            flight.value = value
+            return value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+                if flight.error is None and ttl > 0:
+                    self._store(key, flight.value, ttl)
+            flight.event.set()
+
+    def _store(self, key, value, ttl):
+        now = time.monotonic()
+        if len(self.entries) >= self.max_entries:
+            for k in [k for k, (_, expires) in self.entries.items() if expires <= now]:
+                del self.entries[k]
+            while len(self.entries) >= self.max_entries:
+                del self.entries[next(iter(self.entries))]
+        self.entries[key] = (value, now + ttl)
+
+    def stats(self):
+        with self.lock:
+            return {'size': len(self.entries), 'hits': self.hits,
+                    'misses': self.misses, 'coalesced': self.coalesced}
+
+
+def parse_permission(raw):
+    """Yetki cevabı düz "true", JSON true veya true değerli alan içeren nesne olabilir"""
+    if raw.lower() == 'true':
+        return True
+    try:
+        data = json.loads(raw)
+    except Exception:
+        return False
+    if data is True:
+        return True
+    if isinstance(data, dict):
+        return any(v is True for v in data.values())
+    return False
+
+
+class CRMClient:
+    def __init__(self, token_url, verify_url, timeout=(3, 10), token_ttl=300, permission_ttl=300,
+                 pool_size=8, breaker_threshold=5, breaker_reset=30):
+        self.token_url = token_url
+        self.verify_url = verify_url
+        self.timeout = timeout
+        self.token_ttl = token_ttl
+        self.permission_ttl = permission_ttl
+        # Keep-alive bağlantılar login istekleri arasında yeniden kullanılır
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        # Kimlik bilgisi anahtarları yalnızca bu süreçte anlamlıdır; parola saklanmaz
+        self.secret = os.urandom(32)
+        self.tokens = TTLCache()
+        self.permissions = TTLCache()
+
+    def _call(self, method, url, **kwargs):
+        if not self.breaker.allow():
+            raise CRMUnavailable('CRM geçici olarak devre dışı')
+        # Sonuç her durumda kaydedilir; yarı açık deneme bayrağı takılı kalırsa devre kesici hiç kapanmaz
+        succeeded = False
+        try:
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                raise CRMUnavailable(str(e))
+            if response.status_code >= 500:
+                raise CRMUnavailable(f'HTTP {response.status_code}')
+            succeeded = True
+            return response
+        finally:
+            if succeeded:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def request_token(self, username, password, scope):
+        """{'success': True, 'data': {...}} veya {'success': False, 'error': ...}; CRM yoksa CRMUnavailable"""
+        key = hmac.new(self.secret, f"{scope}\0{username}\0{password}".encode('utf-8'), hashlib.sha256).hexdigest()
+
+        def load():
+            response = self._call('POST', self.token_url, data={
+                'scope': scope,
+                'grant_type': 'password',
+                'username': username,
+                'password': password,
+            })
+            if response.status_code != 200:
+                # Hatalı kimlik bilgisi önbelleğe alınmaz
+                return {'success': False, 'error': f'HTTP {response.status_code}'}, 0
+            try:
+                data = response.json()
+            except ValueError:
+                data = {'raw': response.text}
+            ttl = self.token_ttl
+            expires_in = data.get('expires_in') if isinstance(data, dict) else None
+            if isinstance(expires_in, (int, float)):
+                ttl = min(ttl, expires_in - 30)
+            return {'success': True, 'data': data}, ttl
+
+        return self.tokens.get_or_load(key, load)
+
+    def verify_permission(self, access_token):
+        """Token'ın LED ekran yetkisi var mı; CRM yoksa CRMUnavailable"""
+        key = hashlib.sha256(access_token.encode('utf-8')).hexdigest()
+
+        def load():
+            response = self._call('GET', self.verify_url, headers={
+                'Authorization': f'Bearer {access_token}',
+                'Accept': 'application/json'
+            })
+            if response.status_code != 200:
+                return False, 0
+            raw = response.text.strip()
+            logger.info(f"CRM verify raw response: {raw}")
+            allowed = parse_permission(raw)
+            # Olumsuz sonuç kısa tutulur: yetki verildiğinde hemen yansısın
+            return allowed, self.permission_ttl if allowed else min(30, self.permission_ttl)
+
+        return self.permissions.get_or_load(key, load)
+
+    def stats(self):
+        return {
+            'breaker': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'tokens': self.tokens.stats(),
+            'permissions': self.permissions.stats()
+        }
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+LED Panel İndirme Yöneticisi
+Senkronizasyon indirmeleri tek bir bağlantı havuzlu requests.Session ile,
+sınırlı sayıda eşzamanlı aktarımla yapılır. Dosyalar önce .part dosyasına
+yazılır; kopan indirme HTTP Range ile kaldığı yerden sürer. Boyut ve SHA-256
+doğrulandıktan sonra atomik olarak yerine taşınır. Bant genişliği sınırı
+ekranın kendi video akışını aç bırakmamak içindir.
+"""
+
+import os
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from block_delta import compute_signature, apply_delta
+
+
+class TokenBucket:
+    """Tüm indirmelerin paylaştığı bayt/saniye sınırı (0 = sınırsız)"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _ThrottledReader:
+    """read() çağrılarını bant sınırından geçirir ve alınan baytları sayar"""
+
+    def __init__(self, raw, bucket):
+        self.raw = raw
+        self.bucket = bucket
+        self.count = 0
+
+    def read(self, n):
+        data = self.raw.read(n)
+        self.count += len(data)
+        self.bucket.consume(len(data))
+        return data
+
+
+class DownloadError(Exception):
+    """Doğrulama veya aktarım hatası"""
+
+
+class DownloadManager:
+    def __init__(self, max_workers=3, bandwidth_kbps=0, chunk_size=256 * 1024,
+                 timeout=(10, 60), retries=5):
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retries = retries
+        self.bucket = TokenBucket(bandwidth_kbps * 1024)
+        # Keep-alive bağlantıları indirmeler arasında tekrar kullanılır
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download')
+        # Ağdan alınan toplam bayt (tam ve fark indirmeleri, yeniden denemeler dahil)
+        self.bytes_received = 0
+        self.stats_lock = threading.Lock()
+
+    def _count(self, amount):
+        with self.stats_lock:
+            self.bytes_received += amount
+
+    @staticmethod
+    def _hash_existing(path):
+        sha = hashlib.sha256()
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    sha.update(block)
+        return sha
+
+    def _attempt(self, url, part_path, size):
+        """Tek deneme: .part dosyasını tamamla ve tüm dosyanın SHA-256 nesnesini döndür"""
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if size is not None and offset > size:
+            os.remove(part_path)
+            offset = 0
+        sha = self._hash_existing(part_path) if offset else hashlib.sha256()
+        if size is not None and offset == size:
+            return sha
+
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 416:
+                # Sunucuya göre dosya zaten tamam (boyut bilinmiyorsa)
+                return sha
+            if response.status_code == 200 and offset:
+                # Sunucu Range desteklemiyor; baştan yaz
+                offset = 0
+                sha = hashlib.sha256()
+            elif response.status_code not in (200, 206):
+                error = DownloadError(f'HTTP {response.status_code}')
+                # 404 gibi kalıcı hatalar yeniden denenmez
+                error.permanent = 400 <= response.status_code < 500 and response.status_code not in (408, 429)
+                raise error
+
+            with open(part_path, 'ab' if offset else 'wb') as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if not chunk:
+                        continue
+                    self.bucket.consume(len(chunk))
+                    self._count(len(chunk))
+                    f.write(chunk)
+                    sha.update(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+        return sha
+
+    def download(self, url, dest, size=None, sha256=None):
+        """url'yi dest'e indir; doğrulanmadan dest'e dokunulmaz"""
+        os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+        part_path = f"{dest}.part"
+        delay = 1
+        for attempt in range(1, self.retries + 1):
+            try:
+                sha = self._attempt(url, part_path, size)
+                actual_size = os.path.getsize(part_path)
+                if size is not None and actual_size != size:
+                    raise DownloadError(f'Boyut uyuşmuyor ({actual_size} != {size})')
+                if sha256 and sha.hexdigest() != sha256:
+                    # Bozuk parçadan devam etmenin anlamı yok; baştan indir
+                    os.remove(part_path)
+                    raise DownloadError('SHA-256 uyuşmuyor')
+                os.replace(part_path, dest)
+                return dest
+            except (requests.RequestException, DownloadError, OSError) as e:
+                if attempt == self.retries or getattr(e, 'permanent', False):
+                    raise DownloadError(f'{os.path.basename(dest)} indirilemedi: {e}')
+                print(f"[WARN] {os.path.basename(dest)} indirme denemesi {attempt} başarısız ({e}), {delay}s sonra devam")
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def download_delta(self, url, basis, dest, size=None, sha256=None):
+        """Eski dosyayı (basis) temel alıp yalnızca değişen blokları indir.
+
+        Alınan bayt sayısını döndürür; sonuç doğrulanmadan dest'e dokunulmaz.
+        """
+        signature = compute_signature(basis)
+        part_path = f"{dest}.part"
+        try:
+            with self.session.post(url, json=signature, stream=True, timeout=self.timeout) as response:
+                if response.status_code != 200:
+                    raise DownloadError(f'HTTP {response.status_code}')
+                response.raw.decode_content = True
+                stream = _ThrottledReader(response.raw, self.bucket)
+                try:
+                    digest = apply_delta(basis, signature['block_size'], stream, part_path)
+                finally:
+                    self._count(stream.count)
+            if size is not None and os.path.getsize(part_path) != size:
+                raise DownloadError('Boyut uyuşmuyor')
+            if sha256 and digest != sha256:
+                raise DownloadError('SHA-256 uyuşmuyor')
+            os.replace(part_path, dest)
+            return stream.count
+        except Exception:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+    def map(self, fn, items):
+        """fn'yi öğeler üzerinde sınırlı havuzda çalıştır; sonuçları sırayla döndür"""
+        return list(self.pool.map(fn, items))
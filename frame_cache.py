@@ -0,0 +1,185 @@
+"""
+LED Panel Kare Önbelleği
+Her medya dosyası bir kez panel çözünürlüğüne (PANEL_COLS*CHAIN_LENGTH x
+PANEL_ROWS*PARALLEL) ölçeklenip ham RGB kareler halinde saklanır. Oynatıcı
+dosyayı mmap ile açar ve kareleri doğrudan sink'e verir; Pi'de çözme ve
+ölçekleme maliyeti oynatma sırasında ortadan kalkar.
+
+Anahtar: içerik SHA-256 özeti + panel ayarlarının özeti. Panel geometrisi,
+enterpolasyon veya kare hızı değişince eski kareler kullanılmaz ve GC ile silinir.
+
+Dosya biçimi: 32 baytlık başlık (MAGIC, genişlik, yükseklik, kare sayısı, fps)
+ardından kare sayısı x yükseklik x genişlik x 3 bayt.
+"""
+
+import os
+import mmap
+import struct
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from config import LEDPanelConfig, DisplayConfig
+from panel_renderer import FrameScaler, RendererError, panel_geometry, read_image, video_fps
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'LEDF1'
+HEADER = struct.Struct('<5s3xIIIf8x')  # 32 bayt
+FORMAT_VERSION = 1
+
+CachedFrames = namedtuple('CachedFrames', ['frames', 'fps'])
+
+
+def _is_sha256(value):
+    return isinstance(value, str) and len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+
+class FrameCache:
+    """SHA-256 -> panel çözünürlüğünde önceden işlenmiş kare dosyası"""
+
+    def __init__(self, root, cfg=LEDPanelConfig, frame_rate=DisplayConfig.FRAME_RATE):
+        self.root = root
+        self.cfg = cfg
+        self.width, self.height = panel_geometry(cfg)
+        self.frame_rate = frame_rate
+        signature = f"{self.width}x{self.height}:{cfg.IMAGE_INTERPOLATION}:{frame_rate}:{FORMAT_VERSION}"
+        self.config_key = hashlib.sha1(signature.encode('utf-8')).hexdigest()[:8]
+        self.lock = threading.Lock()
+        self.building = set()
+
+    def path(self, sha256):
+        if not _is_sha256(sha256):
+            raise ValueError(f'Geçersiz SHA-256: {sha256}')
+        return os.path.join(self.root, f"{sha256}-{self.config_key}.frames")
+
+    def exists(self, sha256):
+        try:
+            return os.path.exists(self.path(sha256))
+        except ValueError:
+            return False
+
+    def open(self, sha256):
+        """Kareleri mmap ile aç; yoksa veya bozuksa None.
+
+        Dönen dizi dosyaya bağlı bir görünümdür (kopya yok); dizi serbest
+        kalınca eşleme de kapanır.
+        """
+        try:
+            with open(self.path(sha256), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, width, height, count, fps = HEADER.unpack_from(mapped, 0)
+            frame_bytes = width * height * 3
+            if magic != MAGIC or (width, height) != (self.width, self.height) or count == 0 or \
+                    len(mapped) != HEADER.size + count * frame_bytes:
+                raise ValueError('Geçersiz kare dosyası')
+        except (ValueError, struct.error) as e:
+            mapped.close()
+            logger.error(f"Kare önbelleği okunamadı: {sha256} - {e}")
+            return None
+        frames = np.frombuffer(mapped, dtype=np.uint8, offset=HEADER.size).reshape(count, height, width, 3)
+        return CachedFrames(frames, fps)
+
+    def build(self, source, sha256, kind):
+        """Kaynağı panel karelerine dönüştür (varsa atla); dosya yolunu döndür"""
+        dest = self.path(sha256)
+        if os.path.exists(dest):
+            return dest
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{dest}.{threading.get_ident()}.tmp"
+        scaler = FrameScaler(self.width, self.height, self.cfg)
+        try:
+            with open(tmp, 'wb') as out:
+                out.write(HEADER.pack(MAGIC, self.width, self.height, 0, 0.0))
+                if kind == 'video':
+                    count, fps = self._write_video(source, scaler, out)
+                else:
+                    out.write(scaler.load_frame(read_image(source)).data)
+                    count, fps = 1, 0.0
+                # Kare sayısı sona yazılır; yarım dosya hiçbir zaman geçerli görünmez
+                out.seek(0)
+                out.write(HEADER.pack(MAGIC, self.width, self.height, count, fps))
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp, dest)
+            logger.info(f"Kare önbelleği hazır: {os.path.basename(source)} ({count} kare)")
+            return dest
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _write_video(self, source, scaler, out):
+        """Videoyu min(kaynak fps, FRAME_RATE) hızında örnekleyerek yaz"""
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            raise RendererError(f'Video açılamadı: {source}')
+        try:
+            src_fps = video_fps(cap, self.frame_rate)
+            fps = min(src_fps, self.frame_rate)
+            buf = None
+            index = count = 0
+            while cap.grab():
+                # Kaynak karenin zamanı bir sonraki çıkış karesine ulaştıysa yaz
+                if index / src_fps + 1e-6 >= count / fps:
+                    ok, buf = cap.retrieve(buf)
+                    if ok:
+                        out.write(scaler.load_frame(buf).data)
+                        count += 1
+                index += 1
+            if count == 0:
+                raise RendererError(f'Video çözülemedi: {source}')
+            return count, fps
+        finally:
+            cap.release()
+
+    def build_async(self, source, sha256, kind):
+        """Oynatma sırasında eksik kareleri arka planda hazırla (aynı özet için bir kez)"""
+        with self.lock:
+            if sha256 in self.building or self.exists(sha256):
+                return
+            self.building.add(sha256)
+
+        def run():
+            try:
+                self.build(source, sha256, kind)
+            except Exception as e:
+                logger.error(f"Kare önbelleği oluşturulamadı: {source} - {e}")
+            finally:
+                with self.lock:
+                    self.building.discard(sha256)
+
+        threading.Thread(target=run, name='frame-cache', daemon=True).start()
+
+    def collect(self, referenced):
+        """Başvurulmayan veya eski panel ayarlarına ait kare dosyalarını sil"""
+        removed = []
+        if not os.path.isdir(self.root):
+            return removed
+        for name in os.listdir(self.root):
+            if not name.endswith('.frames'):
+                continue
+            sha256, _, key = name[:-len('.frames')].partition('-')
+            if sha256 in referenced and key == self.config_key:
+                continue
+            try:
+                os.remove(os.path.join(self.root, name))
+                removed.append(name)
+            except OSError as e:
+                logger.error(f"Kare dosyası silinemedi: {name} - {e}")
+        return removed
+
+    def stats(self):
+        count = size = 0
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                if name.endswith('.frames'):
+                    count += 1
+                    size += os.path.getsize(os.path.join(self.root, name))
+        return {'files': count, 'bytes': size, 'config_key': self.config_key}
@@ -0,0 +1,219 @@
+"""
+LED Panel Kilit Profili
+Lokasyon kilidi (state[location]['lock']) için isteğe bağlı profilleme.
+ProfiledLock, TimedLock'un bekleme/tutma histogramlarına ek olarak
+çekişme sayısını ve kilidi hangi kod satırının aldığını (çağrı yeri) tutar;
+/api/<location>/debug/locks en çok bekleten ve en uzun tutan yerleri listeler.
+
+Toplam alım, çekişme, bekleme ve tutma süreleri her alımda kesin olarak
+sayılır. Çağrı yeri ortalama N alımda bir, rastgele örneklenir
+(sys._getframe); sabit adım, sırayla gelen istek kalıplarında hep aynı
+yerleri atlardı. Çağrı yeri başına sayılar örnek sayısıdır, tahmini gerçek
+sayı için N ile çarpılır. Bütün sayaçlar kilidin kendisi tutulurken
+güncellendiği için ek bir kilit gerekmez.
+"""
+
+import os
+import re
+import sys
+import time
+import heapq
+import random
+from time import perf_counter
+
+from metrics import TimedLock
+
+SLOWEST_HOLDS = 20
+_LIBRARY_PATH = re.compile(r'[\\/](site|dist)-packages[\\/]|[\\/]python3\.\d+[\\/]')
+
+
+def call_site(frame):
+    """Kilidi alan satır ve onu çağıran fonksiyon: (dosya, satır, fonksiyon, çağıran)
+
+    Çağıran bir kütüphane çerçevesiyse (ör. login_required sarmalayıcısı) boş bırakılır.
+    """
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if frame is None:
+        return ('?', 0, '?', None)
+    code = frame.f_code
+    parent = frame.f_back
+    caller = None
+    if parent is not None and not _LIBRARY_PATH.search(parent.f_code.co_filename):
+        caller = parent.f_code.co_name
+    return (os.path.basename(code.co_filename), frame.f_lineno, code.co_name, caller)
+
+
+def format_site(site):
+    filename, lineno, function, caller = site
+    text = f'{function} ({filename}:{lineno})'
+    return f'{text} <- {caller}' if caller else text
+
+
+class _SiteStats:
+    __slots__ = ('acquisitions', 'contended', 'wait_total', 'wait_max',
+                 'hold_total', 'hold_max', 'blocked_others')
+
+    def __init__(self):
+        self.acquisitions = self.contended = self.blocked_others = 0
+        self.wait_total = self.wait_max = self.hold_total = self.hold_max = 0.0
+
+
+class ProfiledLock(TimedLock):
+    """TimedLock + çekişme sayısı ve örneklenmiş çağrı yeri istatistikleri.
+
+    sample_every=1 her alımda çağrı yerini kaydeder; üretimde 16-64 gibi
+    bir değer önerilir.
+    """
+
+    def __init__(self, wait_histogram, hold_histogram, sample_every=1, **labels):
+        super().__init__(wait_histogram, hold_histogram, **labels)
+        self.sample_every = max(1, int(sample_every))
+        self.sample_rate = 1.0 / self.sample_every
+        self._reset()
+
+    def _reset(self):
+        self.since = time.time()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_total = self.wait_max = 0.0
+        self.hold_total = self.hold_max = 0.0
+        self.sites = {}
+        self.slowest = []  # min-heap: (tutma, bitiş zamanı, çağrı yeri)
+        self.holder = None
+
+    def acquire(self, blocking=True, timeout=-1):
+        started = perf_counter()
+        blocker = None
+        if self._lock.acquire(False):
+            contended = False
+        else:
+            if not blocking:
+                return False
+            # Kilidi o an tutan (örneklendiyse) çağrı yeri; bekleyene kimin beklettiğini söyler
+            blocker = self.holder
+            if not self._lock.acquire(True, timeout):
+                return False
+            contended = True
+        self._acquired_at = now = perf_counter()
+        waited = now - started
+        self.wait.observe(waited)
+
+        self.acquisitions += 1
+        self.wait_total += waited
+        if waited > self.wait_max:
+            self.wait_max = waited
+        if contended:
+            self.contended += 1
+
+        if self.sample_every > 1 and random.random() >= self.sample_rate:
+            self.holder = None
+            return True
+        site = call_site(sys._getframe(1))
+        stats = self.sites.get(site)
+        if stats is None:
+            stats = self.sites[site] = _SiteStats()
+        stats.acquisitions += 1
+        stats.wait_total += waited
+        if waited > stats.wait_max:
+            stats.wait_max = waited
+        if contended:
+            stats.contended += 1
+            blocker_stats = self.sites.get(blocker) if blocker else None
+            if blocker_stats is not None:
+                blocker_stats.blocked_others += 1
+        self.holder = site
+        return True
+
+    def release(self):
+        held = perf_counter() - self._acquired_at
+        self.hold_total += held
+        if held > self.hold_max:
+            self.hold_max = held
+        site = self.holder
+        if site is not None:
+            self.holder = None
+            stats = self.sites[site]
+            stats.hold_total += held
+            if held > stats.hold_max:
+                stats.hold_max = held
+            if len(self.slowest) < SLOWEST_HOLDS:
+                heapq.heappush(self.slowest, (held, time.time(), site))
+            elif held > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (held, time.time(), site))
+        self._lock.release()
+        self.hold.observe(held)
+
+    __enter__ = acquire
+
+    def reset(self):
+        """Sayaçları sıfırla; kilit boşalana kadar (en çok 5 sn) bekler"""
+        if not self._lock.acquire(True, 5):
+            return False
+        try:
+            self._reset()
+        finally:
+            self._lock.release()
+        return True
+
+    def report(self, limit=10, sort='hold'):
+        """En kötü çağrı yerleri; sort: hold | wait | contended | max_hold | max_wait"""
+        key = {
+            'hold': lambda s: s.hold_total,
+            'wait': lambda s: s.wait_total,
+            'contended': lambda s: s.contended,
+            'max_hold': lambda s: s.hold_max,
+            'max_wait': lambda s: s.wait_max,
+        }.get(sort)
+        if key is None:
+            raise ValueError(f'Geçersiz sıralama: {sort}')
+
+        # list(dict.items()) tek adımda kopyalanır; sayaçlar okunurken değişebilir (yaklaşık anlık görüntü)
+        sites = sorted(list(self.sites.items()), key=lambda kv: key(kv[1]), reverse=True)
+        acquisitions = self.acquisitions
+        holder = self.holder
+        locked = self._lock.locked()
+        return {
+            'since': self.since,
+            'sample_every': self.sample_every,
+            'acquisitions': acquisitions,
+            'contended': self.contended,
+            'contention_ratio': round(self.contended / acquisitions, 4) if acquisitions else 0.0,
+            'wait': _totals(self.wait_total, self.wait_max, acquisitions),
+            'hold': _totals(self.hold_total, self.hold_max, acquisitions),
+            'held': locked,
+            'holder': format_site(holder) if locked and holder else None,
+            'held_for_ms': round((perf_counter() - self._acquired_at) * 1000, 3) if locked else None,
+            'sites': [_site_entry(site, stats, self.sample_every) for site, stats in sites[:limit]],
+            'slowest_holds': [{
+                'site': format_site(site),
+                'hold_ms': round(held * 1000, 3),
+                'at': at
+            } for held, at, site in sorted(list(self.slowest), reverse=True)[:limit]]
+        }
+
+
+def _totals(total, maximum, count):
+    return {
+        'total_ms': round(total * 1000, 3),
+        'mean_ms': round(total * 1000 / count, 4) if count else 0.0,
+        'max_ms': round(maximum * 1000, 3)
+    }
+
+
+def _site_entry(site, stats, sample_every):
+    return {
+        'site': format_site(site),
+        'sampled': stats.acquisitions,
+        'estimated_acquisitions': stats.acquisitions * sample_every,
+        'contended': stats.contended,
+        'blocked_others': stats.blocked_others,
+        'wait': _totals(stats.wait_total, stats.wait_max, stats.acquisitions),
+        'hold': _totals(stats.hold_total, stats.hold_max, stats.acquisitions)
+    }
+
+
+def histogram_totals(bound):
+    """Profilsiz TimedLock için histogram serisinden (sayı, toplam saniye)"""
+    series = list(bound.series)
+    return sum(series[:-1]), series[-1]
@@ -0,0 +1,193 @@
+"""
+LED Panel Medya Metadata Önbelleği
+Video süre/fps/çözünürlük/codec bilgilerini diskte saklar; her oynatımda
+ffprobe/MoviePy/OpenCV çalıştırmak yerine sözlükten okunur.
+Anahtar: (yol, boyut, mtime, inode) - dosya değişirse kayıt geçersizleşir.
+"""
+
+import os
+import json
+import logging
+import threading
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_rate(value):
+    """'30000/1001' gibi ffprobe frame rate değerini float'a çevir"""
+    try:
+        if not value:
+            return None
+        if '/' in value:
+            num, den = value.split('/', 1)
+            den = float(den)
+            return round(float(num) / den, 3) if den else None
+        return float(value)
+    except Exception:
+        return None
+
+
+def probe_media_file(path):
+    """Video metadata'sını ölç - sırasıyla ffprobe, MoviePy ve OpenCV ile.
+
+    {'duration', 'fps', 'width', 'height', 'codec'} döner; ölçülemeyen
+    alanlar None kalır.
+    """
+    meta = {'duration': None, 'fps': None, 'width': None, 'height': None, 'codec': None}
+
+    try:
+        # Önce ffprobe ile dene (tek çağrıda format + ilk video stream)
+        cmd = [
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', 'format=duration:stream=codec_name,width,height,avg_frame_rate,r_frame_rate',
+            '-of', 'json', path
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        data = json.loads(result.stdout or '{}')
+        stream = (data.get('streams') or [{}])[0]
+        duration = (data.get('format') or {}).get('duration')
+        meta['duration'] = float(duration) if duration else None
+        meta['fps'] = _parse_rate(stream.get('avg_frame_rate')) or _parse_rate(stream.get('r_frame_rate'))
+        meta['width'] = stream.get('width')
+        meta['height'] = stream.get('height')
+        meta['codec'] = stream.get('codec_name')
+        if meta['duration']:
+            logger.info(f"ffprobe ile video bilgisi alındı: {meta}")
+            return meta
+    except FileNotFoundError:
+        logger.warning("ffprobe bulunamadı, MoviePy ile deneniyor...")
+    except Exception as e:
+        logger.warning(f"ffprobe hatası: {e}, MoviePy ile deneniyor...")
+
+    try:
+        # MoviePy ile dene (ffmpeg tabanlı, genelde daha doğru)
+        from moviepy.editor import VideoFileClip
+        clip = VideoFileClip(path)
+        meta['duration'] = float(clip.duration)
+        meta['fps'] = meta['fps'] or (float(clip.fps) if clip.fps else None)
+        if clip.size and not meta['width']:
+            meta['width'], meta['height'] = int(clip.size[0]), int(clip.size[1])
+        clip.close()
+        logger.info(f"MoviePy ile video süresi alındı: {meta['duration']}s")
+        return meta
+    except Exception as e:
+        logger.error(f"MoviePy ile video süresi alınırken hata: {e}")
+
+    try:
+        # OpenCV ile dene
+        import cv2
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            logger.error(f"OpenCV ile video açılamadı: {path}")
+            return meta
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        cap.release()
+
+        if width and height and not meta['width']:
+            meta['width'], meta['height'] = width, height
+        if fourcc and not meta['codec']:
+            meta['codec'] = ''.join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip().lower() or None
+        if fps > 0:
+            meta['fps'] = meta['fps'] or round(fps, 3)
+        if fps > 0 and frame_count > 0:
+            meta['duration'] = frame_count / fps
+            logger.info(f"OpenCV ile video süresi alındı: {meta['duration']}s (FPS: {fps}, Frames: {frame_count})")
+        else:
+            logger.error(f"OpenCV ile geçerli FPS veya frame sayısı alınamadı")
+    except Exception as e:
+        logger.error(f"OpenCV ile video süresi alınırken hata: {e}")
+
+    return meta
+
+
+class MediaMetadataCache:
+    """Diskte kalıcı, dosya kimliğine göre anahtarlanmış medya metadata önbelleği"""
+
+    def __init__(self, cache_file, prober=probe_media_file):
+        self.cache_file = cache_file
+        self.prober = prober
+        self.lock = threading.Lock()
+        # Yazımlar sıralanır; birden fazla thread aynı geçici dosyaya yazamaz
+        self.save_lock = threading.Lock()
+        self.entries = {}
+        self.load()
+
+    @staticmethod
+    def file_identity(path):
+        """Dosya kimliği: (boyut, mtime_ns, inode). Dosya yoksa None."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+    def load(self):
+        """Önbelleği diskten yükle"""
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            logger.info(f"Medya metadata önbelleği yüklendi: {len(self.entries)} kayıt")
+        except Exception as e:
+            logger.error(f"Medya metadata önbelleği yükleme hatası: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Önbelleği geçici dosyaya yazıp atomik olarak yerine taşı"""
+        with self.save_lock:
+            # Anlık görüntü yazım sırasını tutan kilit altında alınır; eski görüntü yenisinin üzerine yazılmaz
+            with self.lock:
+                snapshot = dict(self.entries)
+            tmp_file = f"{self.cache_file}.tmp"
+            try:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(snapshot, f, ensure_ascii=False)
+                os.replace(tmp_file, self.cache_file)
+            except Exception as e:
+                logger.error(f"Medya metadata önbelleği kaydetme hatası: {e}")
+
+    def get(self, path):
+        """Dosya değişmemişse önbellekteki metadata'yı döndür, aksi halde None"""
+        key = os.path.abspath(path)
+        identity = self.file_identity(key)
+        if identity is None:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and entry.get('identity') == identity:
+            return entry['meta']
+        return None
+
+    def probe(self, path):
+        """Önbellekte varsa döndür, yoksa ölç, kaydet ve döndür"""
+        meta = self.get(path)
+        if meta is not None:
+            return meta
+
+        key = os.path.abspath(path)
+        identity = self.file_identity(key)
+        if identity is None:
+            return None
+        # Ölçüm kilit dışında yapılır; aynı dosyanın iki kez ölçülmesi zararsızdır
+        meta = self.prober(key)
+        if not meta or not meta.get('duration'):
+            # Geçici ffprobe/OpenCV hatası kalıcı olarak önbelleğe alınmaz; sonraki istek yeniden ölçer
+            return meta
+        with self.lock:
+            self.entries[key] = {'identity': identity, 'meta': meta}
+        self.save()
+        return meta
+
+    def discard(self, path):
+        """Silinen dosyanın kaydını önbellekten çıkar"""
+        key = os.path.abspath(path)
+        with self.lock:
+            removed = self.entries.pop(key, None)
+        if removed is not None:
+            self.save()
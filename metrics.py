@@ -0,0 +1,235 @@
+"""
+LED Panel Ölçüm Sayaçları
+Prometheus metin biçiminde (text/plain; version=0.0.4) sayaç, gösterge ve
+histogramlar. Ek bağımlılık yoktur; her gözlem bir bisect ve küçük bir
+kilit altında birkaç toplamadır (Pi dışında ~1 µs), üretimde açık bırakılabilir.
+
+Uygulama ölçümleri /metrics ile sunulur. Ayrı süreçte çalışan
+senkronizasyon (sync_system.py) kendi ölçümlerini write_textfile ile bir
+dosyaya yazar; /metrics bu dosyayı da ekler (node_exporter textfile
+collector ile de okunabilir).
+"""
+
+import os
+import bisect
+import threading
+from time import perf_counter
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Saniye cinsinden varsayılan kova sınırları
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOCK_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+SYNC_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name}: etiketler {self.labelnames} bekleniyor')
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_labels(self.labelnames, key)} {_number(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        self._observe(self._series(self._key(labels)), value)
+
+    def labels(self, **labels):
+        """Etiketleri bir kez çözülmüş seri; sık çağrılan yerlerde observe maliyetini düşürür"""
+        return _BoundHistogram(self, self._series(self._key(labels)))
+
+    def _series(self, key):
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                # Kova başına (kümülatif olmayan) sayılar, son kova +Inf; ardından toplam
+                series = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            return series
+
+    def _observe(self, series, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            items = sorted((k, list(v)) for k, v in self.values.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}')
+            labels = _labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_number(series[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class _BoundHistogram:
+    __slots__ = ('histogram', 'series')
+
+    def __init__(self, histogram, series):
+        self.histogram = histogram
+        self.series = series
+
+    def observe(self, value):
+        self.histogram._observe(self.series, value)
+
+
+class _Timer:
+    """with histogram.time(**etiketler): bloğun süresini gözlemler"""
+
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f'{name} farklı türde kayıtlı')
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Ölçümleri dosyaya atomik olarak yaz (başka süreç veya node_exporter okur)"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+class TimedLock:
+    """threading.Lock yerine geçer; bekleme ve tutma sürelerini histogramlara yazar"""
+
+    def __init__(self, wait_histogram, hold_histogram, **labels):
+        self._lock = threading.Lock()
+        self.wait = wait_histogram.labels(**labels)
+        self.hold = hold_histogram.labels(**labels)
+        self._acquired_at = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        started = perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            # Kilit tek sahiplidir; alınma anı sahibi bırakana kadar değişmez
+            self._acquired_at = now = perf_counter()
+            self.wait.observe(now - started)
+        return acquired
+
+    def release(self):
+        held = perf_counter() - self._acquired_at
+        self._lock.release()
+        self.hold.observe(held)
+
+    def locked(self):
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+REGISTRY = Registry()
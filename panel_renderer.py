@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+LED Panel Yerel Görüntüleyici (rgbmatrix)
+Chromium kiosk yerine panel doğrudan sürülür: resim ve videolar OpenCV ile
+çözülür, LEDPanelConfig'teki geometri ve enterpolasyonla panel boyutuna
+ölçeklenir ve önceden ayrılmış tamponlar üzerinden matrise gönderilir.
+Kare başına bellek ayrılmaz; ölçekleme doğrudan panel tamponunun ilgili
+bölgesine (ROI) yazılır.
+
+Pi üzerinde yerel uygulamanın display_status zaman çizelgesini izler
+(aynı cihazda çalıştığı için saat farkı yoktur).
+
+Kullanım:
+    python3 panel_renderer.py <lokasyon> [--server http://127.0.0.1:5000]
+    python3 panel_renderer.py --benchmark [video.mp4]
+"""
+
+import os
+import sys
+import time
+import threading
+
+import cv2
+import numpy as np
+
+from config import LEDPanelConfig, DisplayConfig
+from color_pipeline import ColorPipeline
+from transitions import TransitionRenderer
+
+try:
+    import socketio
+except ImportError:
+    socketio = None
+
+INTERPOLATIONS = {
+    'nearest': cv2.INTER_NEAREST,
+    'bilinear': cv2.INTER_LINEAR,
+    'bicubic': cv2.INTER_CUBIC,
+    'lanczos': cv2.INTER_LANCZOS4,
+}
+
+
+def panel_geometry(cfg=LEDPanelConfig):
+    """Zincir ve paralel paneller dahil toplam (genişlik, yükseklik)"""
+    return cfg.PANEL_COLS * cfg.CHAIN_LENGTH, cfg.PANEL_ROWS * cfg.PARALLEL
+
+
+class RendererError(Exception):
+    """Medya açılamadı veya çözülemedi"""
+
+
+class FakeMatrixSink:
+    """Cihaz dışı test ve ölçüm için bellek içi panel"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self.frames = 0
+        self.last_shown = None
+
+    def show(self, frame):
+        np.copyto(self.frame, frame)
+        self.frames += 1
+        self.last_shown = time.monotonic()
+
+    def close(self):
+        pass
+
+
+class RGBMatrixSink:
+    """hzeller/rpi-rgb-led-matrix sürücüsü; kareler VSync ile çift tamponlu gösterilir"""
+
+    def __init__(self, cfg=LEDPanelConfig):
+        from rgbmatrix import RGBMatrix, RGBMatrixOptions
+        from PIL import Image
+
+        options = RGBMatrixOptions()
+        options.rows = cfg.PANEL_ROWS
+        options.cols = cfg.PANEL_COLS
+        options.chain_length = cfg.CHAIN_LENGTH
+        options.parallel = cfg.PARALLEL
+        options.hardware_mapping = cfg.HARDWARE_MAPPING
+        # Parlaklık ve RGB_SEQUENCE yazılımda (ColorPipeline) uygulanır
+        options.brightness = 100
+        options.pwm_bits = cfg.PWM_BITS
+        options.pwm_lsb_nanoseconds = cfg.PWM_LSB_NANOS
+        options.gpio_slowdown = cfg.GPIO_SLOWDOWN
+        options.disable_hardware_pulsing = cfg.DISABLE_HARDWARE_PULSING
+        options.led_rgb_sequence = 'RGB'
+        options.drop_privileges = False
+        self.matrix = RGBMatrix(options=options)
+        self.canvas = self.matrix.CreateFrameCanvas()
+        self.width = self.matrix.width
+        self.height = self.matrix.height
+        # Sürücü PIL görüntüsü ister; tek görüntü nesnesi her karede yeniden doldurulur
+        self.image = Image.new('RGB', (self.width, self.height))
+
+    def show(self, frame):
+        self.image.frombytes(memoryview(frame))
+        self.canvas.SetImage(self.image, 0, 0, unsafe=True)
+        self.canvas = self.matrix.SwapOnVSync(self.canvas)
+
+    def close(self):
+        self.matrix.Clear()
+
+
+class FrameScaler:
+    """Kaynak kareleri önceden ayrılmış tek bir panel tamponuna ölçekler"""
+
+    def __init__(self, width, height, cfg=LEDPanelConfig):
+        self.width, self.height = width, height
+        self.interpolation = INTERPOLATIONS.get(cfg.IMAGE_INTERPOLATION, cv2.INTER_LINEAR)
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self._layout_key = None
+        self._roi = None
+
+    def _fit(self, src_w, src_h):
+        """Kaynağı en-boy oranını koruyarak ortala; ROI değişince kenarlar temizlenir"""
+        if self._layout_key != (src_w, src_h):
+            scale = min(self.width / src_w, self.height / src_h)
+            w = max(1, min(self.width, round(src_w * scale)))
+            h = max(1, min(self.height, round(src_h * scale)))
+            x, y = (self.width - w) // 2, (self.height - h) // 2
+            self.frame[:] = 0
+            self._roi = self.frame[y:y + h, x:x + w]
+            self._layout_key = (src_w, src_h)
+        return self._roi
+
+    def load_frame(self, bgr):
+        """BGR kareyi panel tamponuna ölçekle ve RGB'ye çevir (yerinde)"""
+        roi = self._fit(bgr.shape[1], bgr.shape[0])
+        if roi.shape[:2] == bgr.shape[:2]:
+            np.copyto(roi, bgr)
+        else:
+            cv2.resize(bgr, (roi.shape[1], roi.shape[0]), dst=roi, interpolation=self.interpolation)
+        cv2.cvtColor(roi, cv2.COLOR_BGR2RGB, dst=roi)
+        return self.frame
+
+    def clear(self):
+        self.frame[:] = 0
+        self._layout_key = None
+
+
+def read_image(path):
+    """Resmi BGR olarak oku; GIF gibi imread'in açamadığı biçimlerde ilk kare"""
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        cap = cv2.VideoCapture(path)
+        ok, image = cap.read()
+        cap.release()
+        if not ok:
+            raise RendererError(f'Resim açılamadı: {path}')
+    return image
+
+
+def video_fps(cap, fallback):
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    return fps if 1 <= fps <= 240 else fallback
+
+
+class PanelRenderer:
+    """Medyayı panel tamponuna çözüp sink'e gönderir.
+
+    should_stop: gösterimin bitip bitmediğini döndüren çağrılabilir;
+    resimde ~10 ms, videoda her karede kontrol edilir. frame_rate=None
+    videoyu zamanlamasız (ölçüm için olabildiğince hızlı) oynatır.
+    cache verilirse (FrameCache) panel çözünürlüğünde önceden işlenmiş
+    kareler mmap ile okunur; olmayanlar canlı çözülür ve arka planda hazırlanır.
+    """
+
+    def __init__(self, sink, cfg=LEDPanelConfig, frame_rate=DisplayConfig.FRAME_RATE, cache=None):
+        self.sink = sink
+        self.width, self.height = sink.width, sink.height
+        self.frame_rate = frame_rate
+        self.cache = cache
+        # Panel tamponu ve çözücü tamponu bir kez ayrılır, kareler arasında yeniden kullanılır
+        self.scaler = FrameScaler(self.width, self.height, cfg)
+        self.frame = self.scaler.frame
+        # Parlaklık/gamma/kanal sırası; parlaklık değişince sabit kare yeniden gönderilir
+        self.color = ColorPipeline(self.width, self.height, cfg)
+        self._last = None
+        self._shown_version = None
+        # Sunucunun zaman çizelgesindeki geçiş (crossfade/wipe/slide) yerinde karıştırılır
+        self.transition = TransitionRenderer(self.width, self.height)
+        self._decode_buf = None
+        self.stats = {'frames': 0, 'dropped': 0, 'decode_ms': 0.0, 'cached_items': 0}
+
+    def load_frame(self, bgr):
+        return self.scaler.load_frame(bgr)
+
+    def present(self, frame=None):
+        self._last = self.frame if frame is None else frame
+        self._shown_version = self.color.version
+        composite = self.transition.blend(self._last) if self.transition.spec is not None else self._last
+        self.sink.show(self.color.apply(composite))
+        self.stats['frames'] += 1
+
+    def refresh(self):
+        """Parlaklık değiştiyse ekrandaki kareyi yeni LUT ile tekrar gönder (yeniden çözme yok)"""
+        if self._last is not None and self._shown_version != self.color.version:
+            self.present(self._last)
+
+    def clear(self):
+        self.transition.spec = None
+        self.scaler.clear()
+        self.present()
+
+    def _hold(self, should_stop):
+        """Sabit kareyi göster; geçiş sürerken FRAME_RATE hızında karıştırılmış kare gönder"""
+        interval = 1.0 / (self.frame_rate or DisplayConfig.FRAME_RATE)
+        while not should_stop():
+            if self.transition.spec is not None:
+                self.present(self._last)
+                time.sleep(interval)
+            else:
+                time.sleep(0.01)
+                self.refresh()
+
+    def play(self, path, kind, should_stop, sha256=None, transition=None):
+        # Ekrandaki kare, yeni öğe tampona yazılmadan önce geçişin giden karesi olarak saklanır
+        self.transition.begin(self._last, transition)
+        if self.cache is not None and sha256:
+            cached = self.cache.open(sha256)
+            if cached is not None:
+                self.stats['cached_items'] += 1
+                self._play_frames(cached.frames, cached.fps, should_stop)
+                return
+            self.cache.build_async(path, sha256, kind)
+        if kind == 'video':
+            self._play_video(path, should_stop)
+        else:
+            self._play_image(path, should_stop)
+
+    def _play_frames(self, frames, fps, should_stop):
+        """mmap'lenmiş panel karelerini kopyalamadan sink'e gönder"""
+        count = len(frames)
+        start = time.monotonic()
+        shown = -1
+        while not should_stop():
+            index = int((time.monotonic() - start) * fps) % count if count > 1 else 0
+            if index != shown:
+                self.present(frames[index])
+                shown = index
+            if count == 1:
+                self._hold(should_stop)
+                return
+            time.sleep(max(0.0, min(0.01, start + (index + 1) / fps - time.monotonic())))
+
+    def _play_image(self, path, should_stop):
+        self.load_frame(read_image(path))
+        self.present()
+        self._hold(should_stop)
+
+    def _play_video(self, path, should_stop):
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise RendererError(f'Video açılamadı: {path}')
+        try:
+            src_fps = video_fps(cap, self.frame_rate)
+            paced = self.frame_rate is not None
+            interval = 1.0 / min(src_fps, self.frame_rate) if paced else 0.0
+            start = time.monotonic()
+            pos = 0
+            shown_in_pass = 0
+            while not should_stop():
+                # Kaynak zamanına göre geride kalınan kareler renk dönüşümü yapılmadan atlanır
+                target = int((time.monotonic() - start) * src_fps) if paced else 0
+                while pos < target and cap.grab():
+                    pos += 1
+                    self.stats['dropped'] += 1
+                if not cap.grab():
+                    if shown_in_pass == 0:
+                        raise RendererError(f'Video çözülemedi: {path}')
+                    # Tarayıcıdaki gibi döngü: başa sar
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    start, pos, shown_in_pass = time.monotonic(), 0, 0
+                    continue
+                pos += 1
+                t = time.perf_counter()
+                ok, self._decode_buf = cap.retrieve(self._decode_buf)
+                if not ok:
+                    continue
+                self.load_frame(self._decode_buf)
+                self.stats['decode_ms'] += (time.perf_counter() - t) * 1000
+                self.present()
+                shown_in_pass += 1
+                # Bir sonraki kare zamanına kadar bekle (FRAME_RATE üst sınırı)
+                delay = start + shown_in_pass * interval - time.monotonic()
+                if paced and delay > 0:
+                    time.sleep(min(delay, interval))
+        finally:
+            cap.release()
+
+
+class TimelineFollower:
+    """Yerel uygulamanın display_status zaman çizelgesini izleyip paneli sürer"""
+
+    def __init__(self, location, server_url, renderer, upload_dir=None):
+        self.location = location
+        self.server_url = server_url
+        self.renderer = renderer
+        self.upload_dir = upload_dir or os.path.join('uploads', location)
+        self.cond = threading.Condition()
+        self.status = None  # son display_status olayı
+
+    def _on_brightness(self, data):
+        if data and data.get('location') == self.location and data.get('brightness') is not None:
+            self.renderer.color.set_brightness(data['brightness'])
+
+    def _on_status(self, data):
+        if not data or data.get('location') != self.location:
+            return
+        self._on_brightness(data)
+        with self.cond:
+            self.status = data
+            self.cond.notify_all()
+
+    def _superseded(self, timeline):
+        """Yeni çizelgenin başlangıç anı geldiyse veya gösterim durduysa mevcut öğe biter"""
+        status = self.status
+        if not status or status.get('status') != 'playing':
+            return True
+        latest = status.get('timeline')
+        if not latest or latest['seq'] == timeline['seq'] and latest['started_at'] == timeline['started_at']:
+            return False
+        return time.time() * 1000 >= latest['started_at']
+
+    def run(self):
+        if socketio is None:
+            print("[ERROR] python-socketio kurulu değil; zaman çizelgesi izlenemiyor")
+            return
+        client = socketio.Client(reconnection=True, reconnection_delay=1, reconnection_delay_max=10)
+        client.on('display_status', self._on_status)
+        client.on('panel_brightness', self._on_brightness)
+
+        @client.event
+        def connect():
+            client.emit('join_location', {'location': self.location})
+            print(f"[OK] {self.server_url} zaman çizelgesi izleniyor ({self.renderer.width}x{self.renderer.height})")
+
+        def connect_loop():
+            delay = 1
+            while True:
+                try:
+                    client.connect(self.server_url, wait_timeout=10)
+                    delay = 1
+                    client.wait()
+                except Exception as e:
+                    print(f"[INFO] Yerel sunucuya bağlanılamadı: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+        threading.Thread(target=connect_loop, name='renderer-socket', daemon=True).start()
+
+        shown = None
+        while True:
+            with self.cond:
+                while True:
+                    status = self.status
+                    timeline = status.get('timeline') if status else None
+                    if status and status.get('status') != 'playing' and shown != 'stopped':
+                        break
+                    if timeline and (shown is None or shown == 'stopped' or
+                                     (timeline.get('seq'), timeline.get('started_at')) != shown):
+                        break
+                    self.cond.wait(1.0)
+            if status.get('status') != 'playing':
+                self.renderer.clear()
+                shown = 'stopped'
+                continue
+
+            # Hatalı öğe bir kez denenir; sonraki zaman çizelgesi öğesine kadar tekrar oynatılmaz
+            shown = (timeline.get('seq'), timeline.get('started_at'))
+            item = status.get('current_item') or {}
+            try:
+                # Başlangıç anına kadar önceki öğe ekranda kalır
+                wait = timeline['started_at'] / 1000 - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+                path = os.path.join(self.upload_dir, item.get('filename', ''))
+                self.renderer.play(path, item.get('type'), lambda: self._superseded(timeline),
+                                   item.get('sha256'), timeline.get('transition'))
+            except RendererError as e:
+                print(f"[ERROR] {e}")
+                self.renderer.clear()
+            except Exception as e:
+                # Çözme/dosya/zaman çizelgesi hatası thread'i sonlandırmamalı; panel son karede donar
+                print(f"[ERROR] Öğe oynatılamadı: {item!r} - {e}")
+                try:
+                    self.renderer.clear()
+                except Exception as clear_error:
+                    print(f"[ERROR] Panel temizlenemedi: {clear_error}")
+
+
+def _benchmark(sample=None, seconds=5.0):
+    """Sahte matris üzerinde çözme + ölçekleme + gönderim hızını (fps) ölç"""
+    import shutil
+    import hashlib
+    import tempfile
+
+    work = tempfile.mkdtemp(prefix='render-bench-')
+    try:
+        if not sample:
+            # 1080p sentetik test videosu (hareketli gradyan)
+            sample = os.path.join(work, 'sample.avi')
+            writer = cv2.VideoWriter(sample, cv2.VideoWriter_fourcc(*'MJPG'), 30, (1920, 1080))
+            frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+            columns = np.arange(1920, dtype=np.uint8)
+            frame[..., 2] = np.arange(1080, dtype=np.uint8)[:, None]
+            for i in range(90):
+                frame[..., 0] = np.roll(columns, i * 8)
+                frame[..., 1] = i * 2
+                writer.write(frame)
+            writer.release()
+
+        from frame_cache import FrameCache
+
+        width, height = panel_geometry()
+        cache = FrameCache(os.path.join(work, 'frames'))
+        sha256 = hashlib.sha256(sample.encode('utf-8')).hexdigest()
+        t = time.perf_counter()
+        cache.build(sample, sha256, 'video')
+        build_seconds = time.perf_counter() - t
+        results = []
+        print(f"Kaynak: {sample}, panel: {width}x{height}, enterpolasyon: {LEDPanelConfig.IMAGE_INTERPOLATION}")
+        print(f"Kare önbelleği {build_seconds:.2f} s'de hazırlandı ({os.path.getsize(cache.path(sha256)) / 1048576:.1f} MB)")
+        modes = [
+            ('canlı, sınırsız', None, None),
+            (f'canlı, {DisplayConfig.FRAME_RATE} fps', DisplayConfig.FRAME_RATE, None),
+            (f'önbellek, {DisplayConfig.FRAME_RATE} fps', DisplayConfig.FRAME_RATE, cache),
+        ]
+        for label, frame_rate, mode_cache in modes:
+            sink = FakeMatrixSink(width, height)
+            renderer = PanelRenderer(sink, frame_rate=frame_rate, cache=mode_cache)
+            deadline = time.monotonic() + seconds
+            start = time.perf_counter()
+            cpu = time.process_time()
+            renderer.play(sample, 'video', lambda: time.monotonic() >= deadline, sha256)
+            elapsed = time.perf_counter() - start
+            cpu_percent = (time.process_time() - cpu) / elapsed * 100
+            fps = sink.frames / elapsed
+            shown = max(1, renderer.stats['frames'])
+            result = {
+                'mode': label,
+                'panel': f'{width}x{height}',
+                'fps': round(fps, 1),
+                'cpu_percent': round(cpu_percent, 1),
+                'frames': sink.frames,
+                'dropped': renderer.stats['dropped'],
+                'decode_ms_per_frame': round(renderer.stats['decode_ms'] / shown, 3)
+            }
+            results.append(result)
+            print(f"{label:<22} {fps:>8.1f} fps  CPU %{cpu_percent:>6.1f}  kare başına {result['decode_ms_per_frame']:.2f} ms  atlanan {result['dropped']}")
+        return results
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == '--benchmark':
+        _benchmark(sys.argv[2] if len(sys.argv) > 2 else None)
+        return
+    if len(sys.argv) < 2:
+        print("Kullanım: python3 panel_renderer.py <lokasyon> [--server http://127.0.0.1:5000]")
+        print("          python3 panel_renderer.py --benchmark [video.mp4]")
+        sys.exit(1)
+
+    location = sys.argv[1]
+    server_url = 'http://127.0.0.1:5000'
+    if '--server' in sys.argv:
+        server_url = sys.argv[sys.argv.index('--server') + 1]
+    try:
+        sink = RGBMatrixSink()
+    except ImportError as e:
+        print(f"[ERROR] rgbmatrix sürücüsü yüklenemedi: {e}")
+        sys.exit(1)
+    # Senkronizasyonun önceden hazırladığı panel kareleri (uploads/.frames)
+    from frame_cache import FrameCache
+    renderer = PanelRenderer(sink, cache=FrameCache(os.path.join('uploads', '.frames')))
+    try:
+        TimelineFollower(location, server_url, renderer).run()
+    except KeyboardInterrupt:
+        print("\n[INFO] Görüntüleyici durduruldu")
+    finally:
+        sink.close()
+
+
+if __name__ == '__main__':
+    main()
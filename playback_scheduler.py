@@ -0,0 +1,141 @@
+"""
+LED Panel Oynatma Zamanlayıcısı
+Tüm lokasyonlar için tek thread; monotonik son tarihlerden oluşan bir heap
+üzerinde çalışır. Oynatma listesi değiştiğinde, durdurma veya atlama
+komutlarında Condition ile erken uyanır ve zamanlama sapmasını (jitter) ölçer.
+"""
+
+import time
+import heapq
+import logging
+import threading
+import itertools
+
+logger = logging.getLogger(__name__)
+
+
+class PlaybackScheduler:
+    """Lokasyon başına bir sonraki geçiş zamanını tutan olay tabanlı zamanlayıcı.
+
+    on_tick(location) kilit dışında çağrılır ve bir sonraki geçişe kadar
+    beklenecek süreyi (saniye) döndürür; None dönerse lokasyon yeniden
+    planlanana kadar beklemeye alınır. on_lateness(location, saniye) verilirse
+    her geçişin son tarihe göre gecikmesiyle çağrılır.
+    """
+
+    def __init__(self, on_tick, clock=time.monotonic, on_lateness=None):
+        self.on_tick = on_tick
+        self.clock = clock
+        self.on_lateness = on_lateness
+        self.cond = threading.Condition()
+        self.heap = []        # (deadline, token, location)
+        self.pending = {}     # location -> geçerli token (eski kayıtlar tembel silinir)
+        self.counter = itertools.count()
+        self.jitter = {}      # location -> gecikme istatistikleri
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        """Zamanlayıcı thread'ini (bir kez) başlat"""
+        with self.cond:
+            if self.thread is not None:
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name='playback-scheduler', daemon=True)
+            self.thread.start()
+        logger.info("Oynatma zamanlayıcısı başlatıldı")
+
+    def shutdown(self):
+        """Thread'i durdur"""
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def schedule(self, location, delay=0.0, deadline=None):
+        """Lokasyonun bir sonraki geçişini planla; önceki planı geçersiz kılar"""
+        with self.cond:
+            if deadline is None:
+                deadline = self.clock() + max(0.0, delay)
+            self._push(location, deadline)
+
+    def _push(self, location, deadline):
+        token = next(self.counter)
+        self.pending[location] = token
+        heapq.heappush(self.heap, (deadline, token, location))
+        self.cond.notify()
+
+    def cancel(self, location):
+        """Lokasyonun bekleyen geçişini iptal et"""
+        with self.cond:
+            self.pending.pop(location, None)
+            self.cond.notify()
+
+    def is_scheduled(self, location):
+        with self.cond:
+            return location in self.pending
+
+    def stats(self, location):
+        """Lokasyonun zamanlama sapması istatistikleri (ms)"""
+        with self.cond:
+            j = self.jitter.get(location)
+            if not j:
+                return {'ticks': 0, 'last_ms': None, 'avg_ms': None, 'max_ms': None}
+            return {
+                'ticks': j['ticks'],
+                'last_ms': round(j['last'] * 1000, 3),
+                'avg_ms': round(j['total'] / j['ticks'] * 1000, 3),
+                'max_ms': round(j['max'] * 1000, 3)
+            }
+
+    def _record(self, location, lateness):
+        j = self.jitter.setdefault(location, {'ticks': 0, 'last': 0.0, 'total': 0.0, 'max': 0.0})
+        j['ticks'] += 1
+        j['last'] = lateness
+        j['total'] += lateness
+        j['max'] = max(j['max'], lateness)
+        if self.on_lateness:
+            self.on_lateness(location, lateness)
+
+    def _next_due(self):
+        """Zamanı gelen (deadline, location) çiftini bekle; kapatılırsa None"""
+        with self.cond:
+            while self.running:
+                # İptal edilmiş/yenisiyle değiştirilmiş kayıtları at
+                while self.heap and self.pending.get(self.heap[0][2]) != self.heap[0][1]:
+                    heapq.heappop(self.heap)
+                if not self.heap:
+                    self.cond.wait()
+                    continue
+                deadline, _token, location = self.heap[0]
+                now = self.clock()
+                if deadline > now:
+                    self.cond.wait(deadline - now)
+                    continue
+                heapq.heappop(self.heap)
+                del self.pending[location]
+                self._record(location, now - deadline)
+                return deadline, location
+        return None
+
+    def _run(self):
+        while True:
+            due = self._next_due()
+            if due is None:
+                return
+            deadline, location = due
+            try:
+                delay = self.on_tick(location)
+            except Exception as e:
+                logger.error(f"{location} oynatma adımı hatası: {e}")
+                delay = 1
+            if delay is None:
+                continue
+            # Bir sonraki son tarihi öncekine göre hesapla (kayma birikmez);
+            # çok geride kalındıysa şimdiki zamandan yeniden başla
+            next_deadline = deadline + delay
+            if next_deadline < self.clock():
+                next_deadline = self.clock() + delay
+            with self.cond:
+                # on_tick sırasında yeni bir plan geldiyse ona dokunma
+                if location not in self.pending:
+                    self._push(location, next_deadline)
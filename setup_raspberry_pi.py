@@ -86,13 +86,22 @@ fi
 python3 sync_system.py {location} &
 SYNC_PID=$!
 
+# Yerel panel görüntüleyici (rgbmatrix): LED_NATIVE_RENDERER=1 ise Chromium kiosk yerine
+# panel doğrudan sürülür. GPIO erişimi için root gerekir.
+RENDERER_PID=""
+if [ "$LED_NATIVE_RENDERER" = "1" ]; then
+    sudo -E "$(which python3)" panel_renderer.py {location} &
+    RENDERER_PID=$!
+fi
+
 # Ana uygulamayı başlat
 export LED_LOCATION={location}
 export STANDALONE_MODE=true
 python3 app_final.py
 
-# Uygulama kapandığında senkronizasyonu da durdur
+# Uygulama kapandığında senkronizasyonu ve görüntüleyiciyi de durdur
 kill $SYNC_PID
+[ -n "$RENDERER_PID" ] && sudo kill $RENDERER_PID
 """
     
     script_path = os.path.join(current_dir, f"start_{location}.sh")
@@ -0,0 +1,154 @@
+// Devam ettirilebilir parçalı yükleme
+// POST /api/<location>/uploads ile oturum açılır, parçalar PUT ?offset= ile paralel
+// gönderilir (X-Chunk-CRC32), bağlantı koparsa alınan aralıklar sorgulanıp eksik
+// parçalardan devam edilir, sonunda /finalize çağrılır.
+(function(window) {
+    const CRC_TABLE = (function() {
+        const table = new Uint32Array(256);
+        for (let n = 0; n < 256; n++) {
+            let c = n;
+            for (let k = 0; k < 8; k++) {
+                c = (c & 1) ? (0xEDB88320 ^ (c >>> 1)) : (c >>> 1);
+            }
+            table[n] = c >>> 0;
+        }
+        return table;
+    })();
+
+    function crc32(buffer) {
+        const bytes = new Uint8Array(buffer);
+        let crc = 0xFFFFFFFF;
+        for (let i = 0; i < bytes.length; i++) {
+            crc = CRC_TABLE[(crc ^ bytes[i]) & 0xFF] ^ (crc >>> 8);
+        }
+        return ((crc ^ 0xFFFFFFFF) >>> 0).toString(16).padStart(8, '0');
+    }
+
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    // Sunucu hatası (4xx) tekrar denenmez; ağ hataları ve 5xx denenir
+    function requestJson(url, options) {
+        return fetch(url, Object.assign({ credentials: 'same-origin' }, options)).then(response => {
+            return response.json().catch(() => ({})).then(data => {
+                if (!response.ok) {
+                    const err = new Error(data.error || `HTTP ${response.status}`);
+                    err.status = response.status;
+                    throw err;
+                }
+                return data;
+            });
+        });
+    }
+
+    function isRetryable(err) {
+        return !err.status || err.status >= 500 || err.status === 408 || err.status === 429;
+    }
+
+    // Aynı dosya için açılmış oturum localStorage'da saklanır (sayfa yenilense de devam eder)
+    function sessionKey(location, file) {
+        return `chunked-upload:${location}:${file.name}:${file.size}:${file.lastModified}`;
+    }
+
+    function uploadFileResumable(location, file, options) {
+        options = options || {};
+        const parallel = options.parallel || 3;
+        const maxDelay = options.maxRetryDelay || 30000;
+        const onProgress = options.onProgress || function() {};
+        const base = `/api/${location}/uploads`;
+        const key = sessionKey(location, file);
+
+        // Ağ hatalarında üstel bekleme ile süresiz dene; kullanıcı iptal edene kadar devam
+        async function withRetry(fn) {
+            let delay = 1000;
+            for (;;) {
+                if (options.signal && options.signal.aborted) throw new Error('Yükleme iptal edildi');
+                try {
+                    return await fn();
+                } catch (err) {
+                    if (!isRetryable(err)) throw err;
+                    if (options.onRetry) options.onRetry(err, delay);
+                    await sleep(delay);
+                    delay = Math.min(delay * 2, maxDelay);
+                }
+            }
+        }
+
+        async function openSession() {
+            const saved = window.localStorage ? localStorage.getItem(key) : null;
+            if (saved) {
+                try {
+                    return await withRetry(() => requestJson(`${base}/${saved}`));
+                } catch (err) {
+                    if (err.status !== 404) throw err;  // süresi dolmuş; yeni oturum aç
+                }
+            }
+            const session = await withRetry(() => requestJson(base, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ filename: file.name, size: file.size, duration: options.duration || null })
+            }));
+            if (window.localStorage) localStorage.setItem(key, session.upload_id);
+            return session;
+        }
+
+        function missingChunks(session) {
+            const have = new Set();
+            session.received.forEach(([start, end]) => {
+                for (let off = start; off < end; off += session.chunk_size) have.add(off);
+            });
+            const missing = [];
+            for (let off = 0; off < session.size; off += session.chunk_size) {
+                if (!have.has(off)) missing.push(off);
+            }
+            return missing;
+        }
+
+        async function sendChunk(session, offset) {
+            const buffer = await file.slice(offset, Math.min(offset + session.chunk_size, file.size)).arrayBuffer();
+            const checksum = crc32(buffer);
+            return withRetry(() => requestJson(`${base}/${session.upload_id}?offset=${offset}`, {
+                method: 'PUT',
+                headers: { 'Content-Type': 'application/octet-stream', 'X-Chunk-CRC32': checksum },
+                body: buffer
+            }));
+        }
+
+        return (async function() {
+            let session = await openSession();
+            for (;;) {
+                const queue = missingChunks(session);
+                let done = session.received_bytes || 0;
+                onProgress(done, file.size);
+                const workers = [];
+                for (let i = 0; i < Math.min(parallel, queue.length); i++) {
+                    workers.push((async () => {
+                        while (queue.length) {
+                            const offset = queue.shift();
+                            await sendChunk(session, offset);
+                            done += Math.min(session.chunk_size, file.size - offset);
+                            onProgress(done, file.size);
+                        }
+                    })());
+                }
+                await Promise.all(workers);
+                try {
+                    const result = await withRetry(() => requestJson(`${base}/${session.upload_id}/finalize`, { method: 'POST' }));
+                    if (window.localStorage) localStorage.removeItem(key);
+                    return result;
+                } catch (err) {
+                    // Bozuk/eksik parça bildirildiyse alınan aralıkları yeniden sorgula ve tamamla
+                    if (err.status !== 409) {
+                        if (err.status === 404 && window.localStorage) localStorage.removeItem(key);
+                        throw err;
+                    }
+                    session = await withRetry(() => requestJson(`${base}/${session.upload_id}`));
+                }
+            }
+        })();
+    }
+
+    window.crc32 = crc32;
+    window.uploadFileResumable = uploadFileResumable;
+})(window);
@@ -0,0 +1,78 @@
+// content_updated delta protokolü
+// Sunucu her değişiklikte sürümlü işlemler gönderir:
+//   {op: 'add', item, index} | {op: 'remove', id} | {op: 'patch', id, fields} | {op: 'move', id, index}
+// Tam liste gerektiğinde (ilk bağlantı, temizleme, yeniden senkronizasyon) content_list gelir.
+(function(window) {
+    function indexOfId(list, id) {
+        for (let i = 0; i < list.length; i++) {
+            if (list[i].id === id) return i;
+        }
+        return -1;
+    }
+
+    // İşlemleri listeye yerinde uygula; 'order' alanlarını sıraya göre yenile
+    function applyContentOps(list, ops) {
+        ops.forEach(function(op) {
+            if (op.op === 'add') {
+                if (indexOfId(list, op.item.id) === -1) {
+                    const at = typeof op.index === 'number' ? Math.min(op.index, list.length) : list.length;
+                    list.splice(at, 0, Object.assign({}, op.item));
+                }
+            } else if (op.op === 'remove') {
+                const idx = indexOfId(list, op.id);
+                if (idx !== -1) list.splice(idx, 1);
+            } else if (op.op === 'patch') {
+                const idx = indexOfId(list, op.id);
+                if (idx !== -1) Object.assign(list[idx], op.fields);
+            } else if (op.op === 'move') {
+                const idx = indexOfId(list, op.id);
+                if (idx !== -1) {
+                    const moved = list.splice(idx, 1)[0];
+                    list.splice(Math.min(op.index, list.length), 0, moved);
+                }
+            }
+        });
+        list.forEach(function(item, i) { item.order = i; });
+        return list;
+    }
+
+    // Sürüm kontrolü yapan küçük yardımcı: tam liste veya sıradaki delta uygulanır,
+    // arada sürüm atlanmışsa onResync(version) çağrılır
+    function ContentState(onResync) {
+        this.list = [];
+        this.version = null;
+        this.onResync = onResync;
+    }
+
+    ContentState.prototype.reset = function(list, version) {
+        this.list = list.slice();
+        this.version = typeof version === 'number' ? version : null;
+    };
+
+    // Uygulandıysa true döner
+    ContentState.prototype.handle = function(data) {
+        if (Array.isArray(data.content_list)) {
+            this.reset(data.content_list, data.version);
+            return true;
+        }
+        if (!Array.isArray(data.ops)) return false;
+        if (this.version !== null && data.version <= this.version) return false;  // eski/tekrar
+        if (this.version === null || data.base_version !== this.version) {
+            this.onResync(this.version);
+            return false;
+        }
+        applyContentOps(this.list, data.ops);
+        this.version = data.version;
+        return true;
+    };
+
+    // Sürümlü medya URL'si: sha256 değişmedikçe tarayıcı önbelleğinden (0 bayt) gelir
+    function mediaUrl(location, item) {
+        const base = `/uploads/${location}/${encodeURIComponent(item.filename)}`;
+        return item.sha256 ? `${base}?v=${item.sha256.slice(0, 16)}` : base;
+    }
+
+    window.applyContentOps = applyContentOps;
+    window.mediaUrl = mediaUrl;
+    window.ContentState = ContentState;
+})(window);
@@ -671,10 +671,10 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     function updateSystemInfo(data) {
-        if (!data || data.error) return;
-        cpuUsageEl.textContent = `${data.cpu_percent.toFixed(1)}%`;
-        ramUsageEl.textContent = `${data.memory_percent.toFixed(1)}%`;
-        diskUsageEl.textContent = `${data.disk_usage.toFixed(1)}%`;
+        if (!data || data.error || data.ready === false) return;
+        cpuUsageEl.textContent = `${data.cpu.toFixed(1)}%`;
+        ramUsageEl.textContent = `${data.memory.percent.toFixed(1)}%`;
+        diskUsageEl.textContent = `${data.disk.percent.toFixed(1)}%`;
     }
 
     function showToast(message, type = 'info') {
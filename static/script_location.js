@@ -54,6 +54,10 @@ document.addEventListener('DOMContentLoaded', function() {
     let currentDisplayItem = null;
     let isDisplayRunning = false;
     let contentList = [];
+    // Sürümlü içerik durumu (content_updated delta protokolü)
+    const contentState = new ContentState(function(version) {
+        socket.emit('content_resync', { location: currentLocation, version: version });
+    });
     
     // Sortable.js başlat
     let sortable = new Sortable(contentListEl, {
@@ -124,6 +128,20 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    socket.on('system_info', renderSystemInfo);
+
+    // Yüklenen dosyaların sunucudaki işlenme aşamaları (received/probing/done/error)
+    socket.on('upload_progress', function(data) {
+        if (!data || data.location !== currentLocation) return;
+        if (data.stage === 'probing') {
+            showToast(`${data.filename} işleniyor...`, 'info');
+        } else if (data.stage === 'done') {
+            showToast(`${data.filename} yayına eklendi`, 'success');
+        } else if (data.stage === 'error') {
+            showToast(`${data.filename} işlenemedi: ${data.error || 'bilinmeyen hata'}`, 'error');
+        }
+    });
+
     // Ana fonksiyonlar
     function startDisplay() {
         fetch(`/api/${currentLocation}/display/start`, {
@@ -235,19 +253,10 @@ document.addEventListener('DOMContentLoaded', function() {
         const files = Array.from(fileInput.files);
         if (files.length === 0) return;
 
-        const formData = new FormData();
-        
-        // Dosya türüne göre süre bilgisini ekle
-        files.forEach(file => {
-            formData.append('file', file);
-        });
-        
-        // Sadece resim dosyaları için süre bilgisini ekle
-        const hasImageFile = files.some(file => !file.type.startsWith('video/'));
-        if (hasImageFile) {
-            const duration = parseInt(durationInput.value) || 7;
-            formData.append('duration', duration);
-        }
+        // Süre bilgisi sadece resim dosyaları için gönderilir
+        const imageDuration = parseInt(durationInput.value) || 7;
+        const totalBytes = files.reduce((sum, file) => sum + file.size, 0);
+        let finishedBytes = 0;
 
         // Progress bar'ı hazırla
         uploadProgress.style.display = 'block';
@@ -257,77 +266,68 @@ document.addEventListener('DOMContentLoaded', function() {
         progressText.textContent = 'Yükleniyor... 0%';
         uploadBtn.disabled = true;
 
-        // XMLHttpRequest ile gerçek zamanlı progress
-        const xhr = new XMLHttpRequest();
-        
-        xhr.upload.addEventListener('progress', function(e) {
-            if (e.lengthComputable) {
-                const percentComplete = (e.loaded / e.total) * 100;
-                progressFill.style.width = percentComplete + '%';
-                progressText.textContent = `Yükleniyor... ${Math.round(percentComplete)}%`;
-            }
-        });
+        function setProgress(loaded) {
+            const percentComplete = totalBytes > 0 ? (loaded / totalBytes) * 100 : 100;
+            progressFill.style.width = percentComplete + '%';
+            progressText.textContent = `Yükleniyor... ${Math.round(percentComplete)}%`;
+        }
 
-        xhr.addEventListener('load', function() {
-            if (xhr.status === 200) {
+        // Dosyalar sırayla, her dosyanın parçaları paralel gönderilir; kopan bağlantıda
+        // kaldığı yerden otomatik devam edilir
+        (async function() {
+            const accepted = [];
+            const failed = [];
+            for (const file of files) {
                 try {
-                    const data = JSON.parse(xhr.responseText);
-                    if (data.success) {
-                        progressFill.style.width = '100%';
-                        progressText.textContent = 'Yükleme tamamlandı!';
-                        progressText.classList.add('completed');
-                        
-                        setTimeout(() => {
-                            uploadProgress.style.display = 'none';
-                            uploadBtn.disabled = false;
-                            progressText.classList.remove('completed');
-                            
-                            // Çoklu dosya yükleme mesajı
-                            if (data.content && Array.isArray(data.content) && data.content.length > 1) {
-                                showToast(`${data.content.length} dosya başarıyla yüklendi`, 'success');
-                            } else {
-                                showToast(data.message || 'Dosya(lar) başarıyla yüklendi', 'success');
-                            }
-                            
-                            fileInput.value = '';
-                            uploadBtn.textContent = 'Yükle';
-                            uploadBtn.disabled = true;
-                            durationSettings.style.display = 'none';
-                            
-                            // İçerik listesini güncelle
-                            fetchContentList();
-                        }, 1000);
-                    } else {
-                        uploadProgress.style.display = 'none';
-                        uploadBtn.disabled = false;
-                        showToast(data.error || 'Yükleme hatası', 'error');
-                    }
-                } catch (e) {
-                    uploadProgress.style.display = 'none';
-                    uploadBtn.disabled = false;
-                    showToast('Yanıt işlenirken hata oluştu', 'error');
+                    const result = await uploadFileResumable(currentLocation, file, {
+                        parallel: 3,
+                        duration: file.type.startsWith('video/') ? null : imageDuration,
+                        onProgress: (loaded) => setProgress(finishedBytes + loaded),
+                        onRetry: () => {
+                            progressText.textContent = 'Bağlantı bekleniyor, yükleme devam edecek...';
+                        }
+                    });
+                    accepted.push(...(result.uploads || []));
+                } catch (err) {
+                    failed.push(file.name);
+                    showToast(`${file.name}: ${err.message || 'Yükleme hatası'}`, 'error');
                 }
-            } else {
+                finishedBytes += file.size;
+                setProgress(finishedBytes);
+            }
+
+            if (accepted.length === 0) {
                 uploadProgress.style.display = 'none';
                 uploadBtn.disabled = false;
-                showToast('Yükleme başarısız', 'error');
+                return;
             }
-        });
 
-        xhr.addEventListener('error', function() {
-            uploadProgress.style.display = 'none';
-            uploadBtn.disabled = false;
-            showToast('Bağlantı hatası', 'error');
-        });
+            progressFill.style.width = '100%';
+            progressText.textContent = 'Yükleme tamamlandı!';
+            progressText.classList.add('completed');
 
-        xhr.addEventListener('abort', function() {
-            uploadProgress.style.display = 'none';
-            uploadBtn.disabled = false;
-            showToast('Yükleme iptal edildi', 'error');
-        });
+            setTimeout(() => {
+                uploadProgress.style.display = 'none';
+                progressText.classList.remove('completed');
+
+                if (accepted.length > 1) {
+                    showToast(`${accepted.length} dosya alındı, işleniyor`, 'success');
+                } else {
+                    showToast(`${accepted[0].filename} alındı, işleniyor`, 'success');
+                }
 
-        xhr.open('POST', `/api/${currentLocation}/content/upload`);
-        xhr.send(formData);
+                // Başarısız dosya varsa seçim korunur; tekrar "Yükle" kaldığı yerden devam eder
+                if (failed.length === 0) {
+                    fileInput.value = '';
+                    uploadBtn.textContent = 'Yükle';
+                    uploadBtn.disabled = true;
+                    durationSettings.style.display = 'none';
+                } else {
+                    uploadBtn.disabled = false;
+                }
+                // Dosyalar işlendikçe içerik listesi content_updated deltası ile güncellenir
+            }, 1000);
+        })();
     }
 
     function fetchContentList() {
@@ -335,7 +335,8 @@ document.addEventListener('DOMContentLoaded', function() {
             .then(response => response.json())
             .then(data => {
                 if (data.success) {
-                    contentList = data.content;
+                    contentState.reset(data.content, data.version);
+                    contentList = contentState.list;
                     renderContentList();
                 }
             })
@@ -430,8 +431,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     showToast(data.error || 'Silme hatası', 'error');
                 }
                 closeDeleteDialog();
-                // İçerik listesini güncelle
-                fetchContentList();
+                // İçerik listesi content_updated deltası ile güncellenir
             })
             .catch(error => {
                 console.error('Silme hatası:', error);
@@ -567,60 +567,98 @@ document.addEventListener('DOMContentLoaded', function() {
         contentCount.textContent = `${contentList.length} içerik`;
 
         contentList.forEach((item, index) => {
-            const li = document.createElement('li');
-            li.className = 'content-item';
-            li.dataset.id = item.id;
-            if (item.is_active === false) {
-                li.classList.add('inactive');
-            }
-            
-            const iconClass = item.type === 'image' ? 'fa-file-image' : 'fa-file-video';
-            const duration = item.duration || (item.type === 'image' ? 7 : 15);
-            const typeText = item.type === 'image' ? `Resim (${duration}s)` : `Video (${duration}s)`;
-            const durationText = item.type === 'image' ? `${duration}s` : `${duration}s`;
-            
-                        // Tüm dosya türleri için süre düzenleme butonu göster
-            const durationButton = `<button class=\"action-btn duration-btn\" onclick=\"editDuration(${item.id}, ${duration}, '${item.filename}')\">
-                      <i class=\"fas fa-clock\"></i>
-                    </button>`;
-            
-            // Aktif/pasif toggle
-            const activeToggle = `<label class="switch"><input type="checkbox" class="active-toggle" data-id="${item.id}" ${item.is_active !== false ? 'checked' : ''}><span class="slider"></span></label>`;
-            
-            li.innerHTML = `
-                <div class=\"item-info\">
-                    <div class=\"item-icon\">
-                        <i class=\"fas ${iconClass}\"></i>
-                    </div>
-                    <div class=\"item-details\">
-                        <span class=\"item-title\">${item.filename}</span>
-                        <span class=\"item-type\">${typeText}</span>
-                    </div>
+            contentListEl.appendChild(createContentItemElement(item, index));
+        });
+        highlightCurrentItem();
+    }
+
+    function createContentItemElement(item, index) {
+        const li = document.createElement('li');
+        li.className = 'content-item';
+        li.dataset.id = item.id;
+        if (item.is_active === false) {
+            li.classList.add('inactive');
+        }
+        
+        const iconClass = item.type === 'image' ? 'fa-file-image' : 'fa-file-video';
+        const duration = item.duration || (item.type === 'image' ? 7 : 15);
+        const typeText = item.type === 'image' ? `Resim (${duration}s)` : `Video (${duration}s)`;
+        const durationText = item.type === 'image' ? `${duration}s` : `${duration}s`;
+        
+                    // Tüm dosya türleri için süre düzenleme butonu göster
+        const durationButton = `<button class=\"action-btn duration-btn\" onclick=\"editDuration(${item.id}, ${duration}, '${item.filename}')\">
+                  <i class=\"fas fa-clock\"></i>
+                </button>`;
+        
+        // Aktif/pasif toggle
+        const activeToggle = `<label class="switch"><input type="checkbox" class="active-toggle" data-id="${item.id}" ${item.is_active !== false ? 'checked' : ''}><span class="slider"></span></label>`;
+        
+        li.innerHTML = `
+            <div class=\"item-info\">
+                <div class=\"item-icon\">
+                    <i class=\"fas ${iconClass}\"></i>
                 </div>
-                <div class=\"item-duration\">${durationText}</div>
-                <div class=\"item-order\">${index + 1}</div>
-                <div class=\"item-actions\">
-                    ${activeToggle}
-                    ${durationButton}
-                    <button class=\"action-btn preview-btn\" onclick=\"previewContent('${item.filename}', '${item.type}')\">
-                        <i class=\"fas fa-eye\"></i>
-                    </button>
-                    <button class=\"action-btn delete-btn\" onclick=\"deleteContent(${item.id})\">
-                        <i class=\"fas fa-trash\"></i>
-                    </button>
+                <div class=\"item-details\">
+                    <span class=\"item-title\">${item.filename}</span>
+                    <span class=\"item-type\">${typeText}</span>
                 </div>
-            `;
-            
-            contentListEl.appendChild(li);
+            </div>
+            <div class=\"item-duration\">${durationText}</div>
+            <div class=\"item-order\">${index + 1}</div>
+            <div class=\"item-actions\">
+                ${activeToggle}
+                ${durationButton}
+                <button class=\"action-btn preview-btn\" onclick=\"previewContent('${item.filename}', '${item.type}')\">
+                    <i class=\"fas fa-eye\"></i>
+                </button>
+                <button class=\"action-btn delete-btn\" onclick=\"deleteContent(${item.id})\">
+                    <i class=\"fas fa-trash\"></i>
+                </button>
+            </div>
+        `;
+        
+        // Aktif/pasif toggle eventi
+        li.querySelector('.active-toggle').addEventListener('change', function() {
+            updateContentActive(this.dataset.id, this.checked);
         });
-        // Aktif/pasif toggle eventleri
-        document.querySelectorAll('.active-toggle').forEach(toggle => {
-            toggle.addEventListener('change', function() {
-                const id = this.dataset.id;
-                const isActive = this.checked;
-                updateContentActive(id, isActive);
-            });
+        return li;
+    }
+
+    // Delta işlemlerini DOM'a yerinde uygula (tüm listeyi yeniden çizmeden)
+    function patchContentListDom(ops) {
+        if (contentList.length === 0 || contentListEl.querySelector('.no-content')) {
+            renderContentList();
+            return;
+        }
+        const findEl = id => contentListEl.querySelector(`[data-id="${id}"]`);
+        const findItem = id => contentList.find(x => x.id === id);
+        ops.forEach(op => {
+            if (op.op === 'add') {
+                const item = findItem(op.item.id);
+                if (item && !findEl(item.id)) {
+                    contentListEl.insertBefore(createContentItemElement(item, op.index), contentListEl.children[op.index] || null);
+                }
+            } else if (op.op === 'remove') {
+                const el = findEl(op.id);
+                if (el) el.remove();
+            } else if (op.op === 'patch') {
+                const el = findEl(op.id);
+                const item = findItem(op.id);
+                if (el && item) el.replaceWith(createContentItemElement(item, item.order));
+            } else if (op.op === 'move') {
+                const el = findEl(op.id);
+                if (el) {
+                    el.remove();
+                    contentListEl.insertBefore(el, contentListEl.children[op.index] || null);
+                }
+            }
         });
+        // Sıra numaralarını ve sayacı yenile
+        Array.from(contentListEl.children).forEach((el, i) => {
+            const orderEl = el.querySelector('.item-order');
+            if (orderEl) orderEl.textContent = i + 1;
+        });
+        contentCount.textContent = `${contentList.length} içerik`;
         highlightCurrentItem();
     }
 
@@ -652,13 +690,12 @@ document.addEventListener('DOMContentLoaded', function() {
     function handleContentUpdate(data) {
         console.log(`${currentLocation} handleContentUpdate:`, data);
         
-        if (data.action === 'sync' || data.action === 'upload' || data.action === 'delete' || data.action === 'reorder' || data.action === 'duration_update') {
-            if (data.content_list) {
-                contentList = data.content_list;
-                renderContentList();
-            } else {
-                fetchContentList();
-            }
+        if (!contentState.handle(data)) return;
+        contentList = contentState.list;
+        if (Array.isArray(data.content_list)) {
+            renderContentList();
+        } else {
+            patchContentListDom(data.ops);
         }
     }
 
@@ -682,10 +719,10 @@ document.addEventListener('DOMContentLoaded', function() {
             
             let mediaElement;
             if (currentItem.type === 'image') {
-                mediaElement = `<img src=\"/uploads/${currentLocation}/${currentItem.filename}\" alt=\"${currentItem.filename}\" 
+                mediaElement = `<img src=\"${mediaUrl(currentLocation, currentItem)}\" alt=\"${currentItem.filename}\" 
                                     onerror=\"this.style.display='none'; this.nextElementSibling.style.display='block';\">`;
             } else if (currentItem.type === 'video') {
-                mediaElement = `<video src=\"/uploads/${currentLocation}/${currentItem.filename}\" autoplay loop muted controls></video>`;
+                mediaElement = `<video src=\"${mediaUrl(currentLocation, currentItem)}\" autoplay loop muted controls></video>`;
             } else {
                 mediaElement = `<i class=\"fas ${iconClass}\"></i><span>Önizleme yok</span>`;
             }
@@ -743,54 +780,14 @@ document.addEventListener('DOMContentLoaded', function() {
         }, 3000);
     }
 
+    // Sunucu ölçümleri arka planda örnekler ve 'system_info' ile odaya gönderir;
+    // sayfa açılışında son ölçüm bir kez API'den alınır
     function updateSystemInfo() {
-        console.log('🔄 Sistem bilgisi güncelleniyor...');
-        fetch('/api/system/info')
+        fetch('/api/system/info?history=0')
             .then(response => response.json())
             .then(data => {
-                console.log('📊 API Yanıtı:', data);
                 if (data.success) {
-                    // CPU
-                    cpuUsageEl.textContent = data.cpu + '%';
-                    console.log('💻 CPU:', data.cpu + '%');
-                    
-                    // Memory (RAM)
-                    if (data.memory && typeof data.memory === 'object') {
-                        memoryUsageEl.textContent = data.memory.percent + '%';
-                        const memoryDetail = document.getElementById('memory-detail');
-                        if (memoryDetail) {
-                            memoryDetail.textContent = `${data.memory.used_gb} GB / ${data.memory.total_gb} GB`;
-                            console.log('🧠 RAM Detail:', memoryDetail.textContent);
-                        }
-                    } else {
-                        memoryUsageEl.textContent = data.memory + '%';
-                    }
-                    
-                    // Disk (SD Card)
-                    if (data.disk && typeof data.disk === 'object') {
-                        diskUsageEl.textContent = data.disk.percent + '%';
-                        const diskDetail = document.getElementById('disk-detail');
-                        const diskFree = document.getElementById('disk-free');
-                        const sdCardInfo = document.getElementById('sd-card-info');
-                        
-                        console.log('💾 Disk Data:', data.disk);
-                        console.log('🔍 Disk Elements:', { diskDetail, diskFree, sdCardInfo });
-                        
-                        if (diskDetail) {
-                            diskDetail.textContent = `${data.disk.used_gb} GB / ${data.disk.total_gb} GB`;
-                            console.log('💾 Disk Detail Updated:', diskDetail.textContent);
-                        }
-                        if (diskFree) {
-                            diskFree.textContent = `${data.disk.free_gb} GB`;
-                            console.log('💾 Disk Free Updated:', diskFree.textContent);
-                        }
-                        if (sdCardInfo) {
-                            sdCardInfo.textContent = data.disk.sd_card_size || `${data.disk.total_gb} GB SD Kart`;
-                            console.log('💾 SD Card Info Updated:', sdCardInfo.textContent);
-                        }
-                    } else {
-                        diskUsageEl.textContent = data.disk + '%';
-                    }
+                    renderSystemInfo(data);
                 } else {
                     console.error('❌ API Başarısız:', data.error);
                 }
@@ -798,6 +795,44 @@ document.addEventListener('DOMContentLoaded', function() {
             .catch(error => console.error('❌ Sistem bilgisi alınamadı:', error));
     }
 
+    function renderSystemInfo(data) {
+        // ready === false: sunucu ilk ölçümü henüz almadı; 'system_info' olayı birazdan gelir
+        if (!data || data.error || data.ready === false) return;
+        // CPU
+        cpuUsageEl.textContent = data.cpu + '%';
+        
+        // Memory (RAM)
+        if (data.memory && typeof data.memory === 'object') {
+            memoryUsageEl.textContent = data.memory.percent + '%';
+            const memoryDetail = document.getElementById('memory-detail');
+            if (memoryDetail) {
+                memoryDetail.textContent = `${data.memory.used_gb} GB / ${data.memory.total_gb} GB`;
+            }
+        } else {
+            memoryUsageEl.textContent = data.memory + '%';
+        }
+        
+        // Disk (SD Card)
+        if (data.disk && typeof data.disk === 'object') {
+            diskUsageEl.textContent = data.disk.percent + '%';
+            const diskDetail = document.getElementById('disk-detail');
+            const diskFree = document.getElementById('disk-free');
+            const sdCardInfo = document.getElementById('sd-card-info');
+            
+            if (diskDetail) {
+                diskDetail.textContent = `${data.disk.used_gb} GB / ${data.disk.total_gb} GB`;
+            }
+            if (diskFree) {
+                diskFree.textContent = `${data.disk.free_gb} GB`;
+            }
+            if (sdCardInfo) {
+                sdCardInfo.textContent = data.disk.sd_card_size || `${data.disk.total_gb} GB SD Kart`;
+            }
+        } else {
+            diskUsageEl.textContent = data.disk + '%';
+        }
+    }
+
     function updateTime() {
         const now = new Date();
         const timeString = now.toLocaleTimeString('tr-TR');
@@ -927,7 +962,6 @@ document.addEventListener('DOMContentLoaded', function() {
         .then(data => {
             if (data.success) {
                 showToast('Durum güncellendi', 'success');
-                fetchContentList();
             } else {
                 showToast(data.error || 'Durum güncellenemedi', 'error');
             }
@@ -947,7 +981,6 @@ document.addEventListener('DOMContentLoaded', function() {
     };
 
     // Zamanlayıcılar
-    setInterval(updateSystemInfo, 10000);
     setInterval(updateTime, 1000);
     
     // İlk güncellemeler
@@ -13,26 +13,80 @@ import threading
 from datetime import datetime
 from pathlib import Path
 
+try:
+    import socketio
+except ImportError:
+    socketio = None
+
+from blob_store import BlobStore
+from download_manager import DownloadManager, DownloadError
+from metrics import Registry, SYNC_BUCKETS
+
+# Bu süreç yalnızca kendi ölçümlerini dosyaya yazar (app_final /metrics ile birleştirir)
+SYNC_REGISTRY = Registry()
+
+sync_cycle_seconds = SYNC_REGISTRY.histogram(
+    'ledpanel_sync_cycle_duration_seconds', 'Senkronizasyon turu süresi', ('location',), SYNC_BUCKETS)
+sync_cycles_total = SYNC_REGISTRY.counter(
+    'ledpanel_sync_cycles_total', 'Senkronizasyon turu sayısı', ('location', 'result'))
+sync_bytes_total = SYNC_REGISTRY.counter(
+    'ledpanel_sync_bytes_total', 'Senkronizasyonda ağdan alınan bayt', ('location',))
+sync_last_cycle_bytes = SYNC_REGISTRY.gauge(
+    'ledpanel_sync_last_cycle_bytes', 'Son senkronizasyon turunda alınan bayt', ('location',))
+sync_last_cycle_seconds = SYNC_REGISTRY.gauge(
+    'ledpanel_sync_last_cycle_duration_seconds', 'Son senkronizasyon turunun süresi', ('location',))
+sync_last_success = SYNC_REGISTRY.gauge(
+    'ledpanel_sync_last_success_timestamp_seconds', 'Son başarılı senkronizasyonun zamanı (epoch)', ('location',))
+
+try:
+    from frame_cache import FrameCache
+except ImportError:  # OpenCV/numpy yoksa panel kareleri hazırlanmaz
+    FrameCache = None
+
 class ContentSync:
     def __init__(self, location, central_server_url="http://192.168.250.122:5000"):
         self.location = location
         self.central_server_url = central_server_url
         self.local_content_file = f"uploads/{location}/content_list.json"
+        # Aynı dosya birden fazla içerikte/lokasyonda geçse de bir kez indirilir
+        self.blob_store = BlobStore("uploads/.blobs")
+        # Yerel görüntüleyici (panel_renderer.py) kullanılıyorsa kareler senkronizasyonda hazırlanır
+        self.frame_cache = None
+        if FrameCache is not None and os.environ.get('LED_NATIVE_RENDERER') == '1':
+            self.frame_cache = FrameCache("uploads/.frames")
+        # Son uygulanan manifestonun ETag'i; değişmediyse sunucu 304 döner
+        self.manifest_etag = None
+        # Eşzamanlı indirme sayısı ve bant genişliği sınırı (KB/s, 0 = sınırsız)
+        try:
+            workers = int(os.environ.get('SYNC_DOWNLOAD_WORKERS', '3'))
+            bandwidth = int(os.environ.get('SYNC_BANDWIDTH_KBPS', '0'))
+        except Exception:
+            workers, bandwidth = 3, 0
+        self.downloader = DownloadManager(max_workers=workers, bandwidth_kbps=bandwidth)
+        # Merkezde SYNC_TOKEN tanımlıysa manifesto, blob ve fark istekleri bu token ile yapılır
+        sync_token = os.environ.get('SYNC_TOKEN', '')
+        self.auth_headers = {'Authorization': f'Bearer {sync_token}'} if sync_token else {}
+        self.downloader.session.headers.update(self.auth_headers)
+        # Bu boyuttan küçük dosyalar için blok farkı yerine doğrudan indirilir
+        self.delta_min_size = 1024 * 1024
         self.last_sync_time = 0
         # Senkronizasyon sıklığı: varsayılan 10 dakika (600 sn)
         try:
             self.sync_interval = int(os.environ.get('SYNC_INTERVAL_SECONDS', '600'))
         except Exception:
             self.sync_interval = 600
-        
-    def check_internet_connection(self):
-        """İnternet bağlantısını kontrol et"""
+        # Bağlantı yokken yoklama aralığı: SYNC_RETRY_SECONDS'tan başlayıp sync_interval'a kadar ikiye katlanır
         try:
-            requests.get(self.central_server_url, timeout=5)
-            return True
-        except:
-            return False
-    
+            self.retry_interval = int(os.environ.get('SYNC_RETRY_SECONDS', '15'))
+        except Exception:
+            self.retry_interval = 15
+        # Merkezden content_updated gelince senkronizasyonu tetikler
+        self.sync_requested = threading.Event()
+        self.push_connected = False
+        self.push_client = None
+        # Tur başına süre/bayt ölçümleri bu dosyaya yazılır; aynı cihazdaki app_final /metrics ile sunar
+        self.metrics_file = os.environ.get('SYNC_METRICS_FILE', 'logs/sync_metrics.prom')
+        
     def get_central_content(self):
         """Merkezi sunucudan içerik listesini al"""
         try:
@@ -44,39 +98,186 @@ class ContentSync:
             print(f"Merkezi sunucudan içerik alınamadı: {e}")
             return None
     
-    def download_file(self, filename):
-        """Merkezi sunucudan dosya indir"""
+    def get_manifest(self):
+        """Manifestoyu koşullu iste.
+
+        (manifest, değişti_mi) döner; 304'te (None, False), hata durumunda (None, None).
+        Manifesto desteklemeyen eski sunucularda içerik listesine düşülür.
+        """
+        headers = dict(self.auth_headers)
+        if self.manifest_etag:
+            headers['If-None-Match'] = f'"{self.manifest_etag}"'
         try:
-            url = f"{self.central_server_url}/uploads/{self.location}/{filename}"
-            response = requests.get(url, stream=True, timeout=30)
-            
+            response = requests.get(f"{self.central_server_url}/api/{self.location}/manifest", headers=headers, timeout=10)
+            if response.status_code == 304:
+                return None, False
             if response.status_code == 200:
-                local_path = f"uploads/{self.location}/{filename}"
-                os.makedirs(os.path.dirname(local_path), exist_ok=True)
-                
-                with open(local_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                
-                print(f"[OK] {filename} indirildi")
-                return True
+                return response.json(), True
+            if response.status_code == 404:
+                central_content = self.get_central_content()
+                if central_content is not None:
+                    return {'etag': None, 'files': central_content}, True
+            return None, None
+        except Exception as e:
+            print(f"Manifesto alınamadı: {e}")
+            return None, None
+    
+    def diff_manifest(self, local_content, files):
+        """Yerel liste ile manifesto arasındaki farkı çıkar.
+
+        download: dosyası yok, özeti veya boyutu değişmiş öğeler
+        update: dosyası aynı, yalnızca metadata'sı (süre, aktiflik, sıra...) değişmiş öğeler
+        remove: merkezde artık olmayan dosya adları
+        missing: merkezde listede olup dosyası olmayan öğeler (indirilemez, atlanır)
+
+        Öğeler id ile eşleştirilir (id'si tutmayan eski kayıtlar için dosya adına
+        düşülür). Aynı dosya adına birden fazla öğe düşerse hedef dosya bir kez
+        indirilir; paralel indirmeler aynı .part dosyasına yazmaz.
+        """
+        local_by_id = {item['id']: item for item in local_content if 'id' in item}
+        local_by_name = {}
+        for item in local_content:
+            local_by_name.setdefault(item['filename'], item)
+        plan = {'download': [], 'update': [], 'remove': [], 'missing': [], 'unchanged': 0}
+        queued = set()
+        for info in files:
+            if 'size' in info and info['size'] is None:
+                plan['missing'].append(info)
+                continue
+            if info['filename'] in queued:
+                # Aynı hedef dosya zaten indirilecek; bu öğe onun sonucunu paylaşır
+                continue
+            local = local_by_id.get(info.get('id')) or local_by_name.get(info['filename'])
+            if local is not None and local['filename'] != info['filename']:
+                local = local_by_name.get(info['filename'])
+            local_path = f"uploads/{self.location}/{info['filename']}"
+            if local is None or not os.path.exists(local_path):
+                queued.add(info['filename'])
+                plan['download'].append(info)
+            elif info.get('sha256') and local.get('sha256') != info['sha256'] and \
+                    (local.get('sha256') or self.blob_store.ingest(local_path) != info['sha256']):
+                # Özeti bilinmeyen eski yerel dosyalar bir kez hash'lenir ve depoya alınır
+                queued.add(info['filename'])
+                plan['download'].append(info)
+            elif info.get('size') is not None and os.path.getsize(local_path) != info['size']:
+                queued.add(info['filename'])
+                plan['download'].append(info)
+            elif any(local.get(k) != info.get(k) for k in ('id', 'type', 'order', 'duration', 'is_active')):
+                plan['update'].append(info)
+            else:
+                plan['unchanged'] += 1
+        central_names = {info['filename'] for info in files}
+        plan['remove'] = [name for name in local_by_name if name not in central_names]
+        return plan
+    
+    def write_local_content(self, content):
+        """İçerik listesini geçici dosyaya yazıp atomik olarak değiştir"""
+        tmp_file = f"{self.local_content_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(content, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.local_content_file)
+    
+    def download_file(self, filename, size=None, sha256=None):
+        """Merkezi sunucudan dosya indir (.part + Range ile devam, doğrulama, atomik taşıma)"""
+        try:
+            if sha256:
+                url = f"{self.central_server_url}/blobs/{sha256}"
+            else:
+                url = f"{self.central_server_url}/uploads/{self.location}/{filename}"
+            local_path = f"uploads/{self.location}/{filename}"
+            self.downloader.download(url, local_path, size=size, sha256=sha256)
+            print(f"[OK] {filename} indirildi")
+            return True
+        except DownloadError as e:
+            print(f"[ERROR] {e}")
             return False
         except Exception as e:
             print(f"[ERROR] {filename} indirilemedi: {e}")
             return False
     
-    def sync_content(self):
-        """İçerik senkronizasyonu yap"""
-        if not self.check_internet_connection():
-            print("[INFO] İnternet bağlantısı yok, local modda çalışıyor...")
+    def delta_download_file(self, content_info):
+        """Aynı isimle değişmiş dosyayı eski kopyadan blok farkıyla güncelle (rsync tarzı)"""
+        filename = content_info['filename']
+        local_path = f"uploads/{self.location}/{filename}"
+        if not content_info.get('sha256') or not os.path.exists(local_path) or \
+                os.path.getsize(local_path) < self.delta_min_size:
             return False
+        try:
+            url = f"{self.central_server_url}/uploads/{self.location}/{filename}/delta"
+            received = self.downloader.download_delta(
+                url, local_path, local_path,
+                size=content_info.get('size'), sha256=content_info['sha256']
+            )
+            total = content_info.get('size') or os.path.getsize(local_path)
+            print(f"[OK] {filename} fark ile güncellendi: {received} / {total} bayt aktarıldı")
+            return True
+        except Exception as e:
+            print(f"[WARN] {filename} fark aktarımı başarısız ({e}), tam indirme yapılacak")
+            return False
+    
+    def fetch_content_file(self, content_info):
+        """İçerik dosyasını yerel blob deposundan bağla, yoksa indirip depoya al"""
+        filename = content_info['filename']
+        local_path = f"uploads/{self.location}/{filename}"
+        sha256 = content_info.get('sha256')
+        if sha256 and self.blob_store.exists(sha256):
+            try:
+                self.blob_store.link_into(sha256, local_path)
+                print(f"[OK] {filename} yerel depodan bağlandı (indirme yok)")
+                return True
+            except Exception as e:
+                print(f"[WARN] {filename} depodan bağlanamadı: {e}")
         
+        # Yeni dosya doğrulanana kadar eski sürüm yerinde kalır (oynatıcı yarım dosya görmez)
+        if not self.delta_download_file(content_info) and \
+                not self.download_file(filename, content_info.get('size'), sha256):
+            return False
+        if sha256:
+            try:
+                self.blob_store.ingest(local_path, sha256)
+            except Exception as e:
+                print(f"[WARN] {filename} blob deposuna alınamadı: {e}")
+        return True
+    
+    def sync_content(self):
+        """İçerik senkronizasyonu yap; tur süresi ve alınan bayt ölçümlere yazılır"""
+        started = time.monotonic()
+        received = self.downloader.bytes_received
+        ok = False
+        try:
+            ok = self._sync_content()
+            return ok
+        finally:
+            self.record_cycle(time.monotonic() - started, self.downloader.bytes_received - received, ok)
+    
+    def record_cycle(self, duration, received, ok):
+        """Tur ölçümlerini güncelle ve ölçüm dosyasını yeniden yaz"""
+        sync_cycle_seconds.observe(duration, location=self.location)
+        sync_cycles_total.inc(location=self.location, result='success' if ok else 'failure')
+        sync_bytes_total.inc(received, location=self.location)
+        sync_last_cycle_bytes.set(received, location=self.location)
+        sync_last_cycle_seconds.set(round(duration, 3), location=self.location)
+        if ok:
+            sync_last_success.set(int(time.time()), location=self.location)
+        try:
+            SYNC_REGISTRY.write_textfile(self.metrics_file)
+        except Exception as e:
+            print(f"[WARN] Senkronizasyon ölçümleri yazılamadı: {e}")
+    
+    def _sync_content(self):
+        """Manifesto farkına göre yalnızca değişen dosyaları indir ve listeyi güncelle"""
         print("[INFO] Merkezi sunucudan senkronizasyon yapılıyor...")
         
-        # Merkezi sunucudan içerik listesini al
-        central_content = self.get_central_content()
-        if not central_content:
+        # Merkezi sunucudan manifestoyu al (değişmediyse 304)
+        manifest, changed = self.get_manifest()
+        if changed is False:
+            print("[OK] İçerik değişmemiş, senkronizasyon atlandı")
+            return True
+        if manifest is None:
+            # Ayrı bir bağlantı kontrolü isteği yok; manifesto alınamadıysa bağlantı yok sayılır
+            print("[INFO] Merkezi sunucuya ulaşılamadı, local modda çalışıyor...")
             return False
+        files = sorted(manifest['files'], key=lambda x: x.get('order', 0))
         
         # Local içerik listesini oku
         local_content = []
@@ -87,44 +288,156 @@ class ContentSync:
             except:
                 local_content = []
         
-        # İçerikleri karşılaştır
-        central_files = {item['filename']: item for item in central_content}
-        local_files = {item['filename']: item for item in local_content}
+        plan = self.diff_manifest(local_content, files)
+        print(f"[INFO] İndirilecek: {len(plan['download'])}, güncellenecek: {len(plan['update'])}, "
+              f"silinecek: {len(plan['remove'])}, değişmeyen: {plan['unchanged']}")
         
-        # Yeni dosyaları indir
-        for filename, content_info in central_files.items():
-            if filename not in local_files:
-                print(f"[NEW] Yeni dosya: {filename}")
-                if self.download_file(filename):
-                    local_content.append(content_info)
+        # Yalnızca özeti değişen/yeni dosyaları sınırlı sayıda paralel aktarımla indir
+        for info in plan['download']:
+            print(f"[NEW] Yeni/değişen dosya: {info['filename']}")
+        results = self.downloader.map(self.fetch_content_file, plan['download'])
+        failed = {info['filename'] for info, ok in zip(plan['download'], results) if not ok}
         
-        # Silinen dosyaları kaldır
-        local_content = [item for item in local_content if item['filename'] in central_files]
+        # Merkezde olmayan dosyaları diskten kaldır
+        local_by_id = {item['id']: item for item in local_content if 'id' in item}
+        local_by_name = {}
+        for item in local_content:
+            local_by_name.setdefault(item['filename'], item)
+        for filename in plan['remove']:
+            try:
+                local_path = f"uploads/{self.location}/{filename}"
+                if os.path.exists(local_path):
+                    os.remove(local_path)
+                print(f"[DEL] {filename} kaldırıldı")
+            except Exception as e:
+                print(f"[ERROR] {filename} silinemedi: {e}")
+        
+        # Yeni liste manifestodaki sırayla kurulur; indirilemeyenler bir sonraki turda tekrar denenir
+        missing = {info['filename'] for info in plan['missing']}
+        new_content = []
+        for info in files:
+            if info['filename'] in missing:
+                continue
+            if info['filename'] in failed:
+                # Yeni sürüm indirilemediyse diskteki eski kopya gösterilmeye devam eder
+                old = local_by_id.get(info.get('id')) or local_by_name.get(info['filename'])
+                if old is not None and old['filename'] == info['filename'] and \
+                        os.path.exists(f"uploads/{self.location}/{info['filename']}"):
+                    new_content.append(dict(old, id=info.get('id', old.get('id')), order=info.get('order', len(new_content))))
+                    print(f"[WARN] {info['filename']} güncellenemedi, eski kopya korunuyor")
+                continue
+            new_content.append({
+                'id': info['id'],
+                'filename': info['filename'],
+                'type': info['type'],
+                'order': info.get('order', len(new_content)),
+                'duration': info.get('duration'),
+                'is_active': info.get('is_active', True),
+                'sha256': info.get('sha256')
+            })
+        
+        # Artık başvurulmayan blobları temizle
+        referenced = {item['sha256'] for item in new_content if item.get('sha256')}
+        self.blob_store.collect([item.get('sha256') for item in local_content], referenced)
         
         # İçerik listesini güncelle
         try:
-            with open(self.local_content_file, 'w', encoding='utf-8') as f:
-                json.dump(local_content, f, ensure_ascii=False, indent=2)
-            print(f"[OK] {len(local_content)} içerik senkronize edildi")
-            return True
+            self.write_local_content(new_content)
+            self.manifest_etag = None if failed else manifest.get('etag')
+            print(f"[OK] {len(new_content)} içerik senkronize edildi")
+            self.prepare_panel_frames(new_content, referenced)
+            return not failed
         except Exception as e:
             print(f"[ERROR] İçerik listesi güncellenemedi: {e}")
             return False
     
+    def prepare_panel_frames(self, content, referenced):
+        """Panel çözünürlüğündeki kare önbelleğini içerik listesiyle eşitle"""
+        if self.frame_cache is None:
+            return
+        for item in content:
+            sha256 = item.get('sha256')
+            if not sha256 or self.frame_cache.exists(sha256):
+                continue
+            try:
+                self.frame_cache.build(f"uploads/{self.location}/{item['filename']}", sha256, item['type'])
+                print(f"[OK] {item['filename']} panel kareleri hazırlandı")
+            except Exception as e:
+                print(f"[WARN] {item['filename']} panel kareleri hazırlanamadı: {e}")
+        self.frame_cache.collect(referenced)
+    
+    def start_push_subscription(self):
+        """Merkezi sunucunun content_updated akışına Socket.IO ile abone ol (arka plan thread'i)"""
+        if socketio is None:
+            print("[WARN] python-socketio bulunamadı, yalnızca periyodik senkronizasyon yapılacak")
+            return False
+        
+        client = socketio.Client(reconnection=True, reconnection_delay=1, reconnection_delay_max=30)
+        
+        @client.event
+        def connect():
+            self.push_connected = True
+            client.emit('join_location', {'location': self.location})
+            print(f"[INFO] {self.location} değişiklik bildirimlerine abone olundu")
+        
+        @client.event
+        def disconnect():
+            self.push_connected = False
+            print("[INFO] Bildirim bağlantısı koptu, periyodik senkronizasyona geçildi")
+        
+        @client.on('content_updated')
+        def on_content_updated(data):
+            # Bağlanınca gelen tam liste de tetikler: kopukluk sırasında kaçan değişiklikler alınır
+            if data and data.get('location') == self.location:
+                self.sync_requested.set()
+        
+        def run():
+            delay = 1
+            while True:
+                try:
+                    client.connect(self.central_server_url, wait_timeout=10)
+                    delay = 1
+                    client.wait()
+                except Exception as e:
+                    print(f"[INFO] Bildirim sunucusuna bağlanılamadı: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+        
+        self.push_client = client
+        threading.Thread(target=run, name='sync-push', daemon=True).start()
+        return True
+    
     def start_sync_loop(self):
-        """Sürekli senkronizasyon döngüsü"""
+        """Sürekli senkronizasyon döngüsü.
+
+        Bildirim bağlantısı açıkken değişiklik gelir gelmez (birkaç saniye içinde)
+        senkronize edilir; sync_interval yalnızca güvenlik amaçlı yoklamadır.
+        Bağlantı yokken yoklama artan aralıklarla tekrarlanır.
+        """
         print(f"[INFO] {self.location} için senkronizasyon başlatıldı")
+        self.start_push_subscription()
         
+        retry = self.retry_interval
+        ok = True
         while True:
             try:
-                self.sync_content()
-                time.sleep(self.sync_interval)
+                if ok:
+                    retry = self.retry_interval
+                    timeout = self.sync_interval
+                else:
+                    timeout = retry
+                    retry = min(retry * 2, self.sync_interval)
+                if self.sync_requested.wait(timeout):
+                    # Art arda gelen değişiklikleri tek senkronizasyonda topla
+                    time.sleep(2)
+                self.sync_requested.clear()
+                ok = self.sync_content()
             except KeyboardInterrupt:
                 print("[STOP] Senkronizasyon durduruldu")
                 break
             except Exception as e:
                 print(f"[ERROR] Senkronizasyon hatası: {e}")
-                time.sleep(self.sync_interval)
+                ok = False
 
 def main():
     import sys
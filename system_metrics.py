@@ -0,0 +1,139 @@
+"""
+LED Panel Sistem Ölçümleri
+Tek bir arka plan thread'i CPU, RAM, disk ve sıcaklığı sabit aralıkla
+örnekler ve sabit boyutlu bir halka tampona (deque) yazar. /api/system/info
+ve Socket.IO 'get_system_info' isteği tampondaki son örneği bekletmeden
+döndürür; CPU yüzdesi iki örnek arasındaki süre üzerinden ölçüldüğü için
+istek thread'i hiçbir zaman psutil.cpu_percent(interval=1) ile bloklanmaz.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+GB = 1024 ** 3
+THERMAL_ZONE = '/sys/class/thermal/thermal_zone0/temp'
+
+
+def read_temperature():
+    """SoC sıcaklığı (°C); okunamıyorsa None"""
+    try:
+        with open(THERMAL_ZONE) as f:
+            return round(int(f.read().strip()) / 1000.0, 1)
+    except (OSError, ValueError):
+        pass
+    try:
+        for entries in (psutil.sensors_temperatures() or {}).values():
+            if entries:
+                return round(entries[0].current, 1)
+    except (AttributeError, OSError):
+        pass
+    return None
+
+
+class MetricsSampler:
+    """Sistem ölçümlerini halka tamponda tutan arka plan örnekleyicisi.
+
+    on_sample(sample) her yeni örnekte örnekleyici thread'inden çağrılır.
+    """
+
+    def __init__(self, interval=5.0, history=120, disk_path='/', on_sample=None):
+        self.interval = interval
+        self.disk_path = disk_path
+        self.on_sample = on_sample
+        self.samples = deque(maxlen=history)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.first_sample = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Thread'i (bir kez) başlat; ilk örnek hemen alınır"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            # cpu_percent(None) bir önceki çağrıdan bu yana ölçer; ilk çağrı referans noktasıdır
+            psutil.cpu_percent(interval=None)
+            self.thread = threading.Thread(target=self._run, name='system-metrics', daemon=True)
+            self.thread.start()
+        logger.info(f"Sistem ölçüm örnekleyicisi başlatıldı ({self.interval} sn)")
+
+    def shutdown(self):
+        self.stop_event.set()
+
+    def sample(self):
+        """Anlık ölçüm al (bloklamaz)"""
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        total_gb = round(disk.total / GB, 2)
+        return {
+            'time': time.time(),
+            'cpu': round(psutil.cpu_percent(interval=None), 1),
+            'memory': {
+                'percent': round(memory.percent, 1),
+                'total_gb': round(memory.total / GB, 2),
+                'used_gb': round((memory.total - memory.available) / GB, 2),
+                'free_gb': round(memory.available / GB, 2)
+            },
+            'disk': {
+                'percent': round(disk.percent, 1),
+                'total_gb': total_gb,
+                'used_gb': round(disk.used / GB, 2),
+                'free_gb': round(disk.free / GB, 2),
+                'sd_card_size': f"{total_gb} GB SD Kart"
+            },
+            'temperature': read_temperature(),
+            'timestamp': datetime.now().strftime('%H:%M:%S')
+        }
+
+    def _run(self):
+        # İlk örnek için CPU ölçüm penceresi kısa tutulur; sonrakiler aralığın tamamını kapsar
+        wait = min(0.5, self.interval)
+        while not self.stop_event.wait(wait):
+            wait = self.interval
+            try:
+                sample = self.sample()
+            except Exception as e:
+                logger.error(f"Sistem ölçümü alınamadı: {e}")
+                continue
+            with self.lock:
+                self.samples.append(sample)
+            self.first_sample.set()
+            if self.on_sample:
+                try:
+                    self.on_sample(sample)
+                except Exception as e:
+                    logger.error(f"Sistem ölçümü yayınlanamadı: {e}")
+
+    def latest(self, timeout=1.0):
+        """Son örnek; ilk örnek henüz yoksa en çok timeout saniye beklenir.
+
+        İstek thread'inde ölçüm yapılmaz: cpu_percent(None) örnekleyicinin
+        referans noktasını sıfırlar. Örnek yine yoksa {'ready': False} döner.
+        """
+        if not self.first_sample.is_set():
+            self.first_sample.wait(timeout)
+        with self.lock:
+            if self.samples:
+                return self.samples[-1]
+        return {'ready': False}
+
+    def history(self, limit=None):
+        """Eskiden yeniye kısa geçmiş: [{time, cpu, memory, disk, temperature}]"""
+        with self.lock:
+            samples = list(self.samples)
+        if limit is not None:
+            samples = samples[-limit:] if limit > 0 else []
+        return [{
+            'time': s['time'],
+            'cpu': s['cpu'],
+            'memory': s['memory']['percent'],
+            'disk': s['disk']['percent'],
+            'temperature': s['temperature']
+        } for s in samples]
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+LED Panel Geçiş Efektleri
+Geçiş tanımı sunucunun zaman çizelgesine (timeline['transition']) eklenir;
+tarayıcı oynatıcısı (Web Animations) ve yerel panel görüntüleyicisi aynı
+efekti, süreyi ve yumuşatmayı started_at anından itibaren uygular.
+
+Efektler (p: 0 -> 1, smoothstep ile yumuşatılmış ilerleme):
+    crossfade  yeni * p + eski * (1 - p)
+    wipe       yeni kare soldan sağa açılır (ilk round(p*W) sütun yeni)
+    slide      yeni kare sağdan kayarak eskiyi sola iter
+
+smoothstep (3p² - 2p³) tarayıcıda birebir cubic-bezier(1/3, 0, 2/3, 1)'dir.
+Panel tarafında karıştırma önceden ayrılmış tamponlarda yerinde yapılır;
+geçiş karesi başına bellek ayrılmaz.
+
+Ölçüm: python3 transitions.py --benchmark
+"""
+
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from config import LEDPanelConfig, DisplayConfig
+
+EFFECTS = ('crossfade', 'wipe', 'slide')
+EASING_CSS = 'cubic-bezier(0.3333, 0, 0.6667, 1)'
+
+
+def transition_spec(cfg=DisplayConfig):
+    """Zaman çizelgesine eklenen geçiş tanımı; kapalıysa None"""
+    effect = getattr(cfg, 'TRANSITION_EFFECT', 'crossfade')
+    if not cfg.ENABLE_TRANSITIONS or effect not in EFFECTS or cfg.TRANSITION_DURATION <= 0:
+        return None
+    return {
+        'effect': effect,
+        'duration_ms': int(cfg.TRANSITION_DURATION * 1000),
+        'easing': EASING_CSS
+    }
+
+
+def smoothstep(p):
+    p = min(1.0, max(0.0, p))
+    return p * p * (3.0 - 2.0 * p)
+
+
+class TransitionRenderer:
+    """Eski ve yeni panel karesini tek bir çıkış tamponunda karıştırır"""
+
+    def __init__(self, width, height):
+        self.width = width
+        # Giden karenin kopyası ve karışım sonucu; bir kez ayrılır
+        self.outgoing = np.zeros((height, width, 3), dtype=np.uint8)
+        self.out = np.zeros((height, width, 3), dtype=np.uint8)
+        self.spec = None
+        self.started = None
+
+    def begin(self, last_frame, spec, started=None):
+        """Ekrandaki son kareyi sakla ve geçişi başlat (spec None ise geçiş yok)"""
+        if spec is None or last_frame is None or spec.get('effect') not in EFFECTS:
+            self.spec = None
+            return
+        np.copyto(self.outgoing, last_frame)
+        self.spec = spec
+        self.started = time.monotonic() if started is None else started
+
+    def progress(self, now=None):
+        if self.spec is None:
+            return 1.0
+        elapsed = (time.monotonic() if now is None else now) - self.started
+        return min(1.0, max(0.0, elapsed * 1000.0 / self.spec['duration_ms']))
+
+    def blend(self, incoming, p=None):
+        """Yeni kareyi geçişin o anki ilerlemesiyle karıştır; geçiş yoksa/bittiyse kareyi aynen döndür"""
+        if self.spec is None:
+            return incoming
+        if p is None:
+            p = self.progress()
+            if p >= 1.0:
+                self.spec = None
+                return incoming
+        effect = self.spec['effect']
+        eased = smoothstep(p)
+        out, old = self.out, self.outgoing
+        if effect == 'crossfade':
+            cv2.addWeighted(incoming, eased, old, 1.0 - eased, 0.0, dst=out)
+        elif effect == 'wipe':
+            x = int(round(eased * self.width))
+            out[:, :x] = incoming[:, :x]
+            out[:, x:] = old[:, x:]
+        else:  # slide
+            x = int(round(eased * self.width))
+            out[:, :self.width - x] = old[:, x:]
+            out[:, self.width - x:] = incoming[:, :x]
+        return out
+
+
+def _benchmark(frames=3000):
+    """Efekt başına geçiş karesi maliyeti ve kare başına ayrılan bellek"""
+    import tracemalloc
+
+    base_w, base_h = LEDPanelConfig.PANEL_COLS, LEDPanelConfig.PANEL_ROWS
+    sizes = []
+    for chain, parallel in ((LEDPanelConfig.CHAIN_LENGTH, LEDPanelConfig.PARALLEL), (2, 1), (4, 2), (8, 3)):
+        size = (base_w * chain, base_h * parallel)
+        if size not in sizes:
+            sizes.append(size)
+
+    budget_us = 1e6 / DisplayConfig.FRAME_RATE
+    results = []
+    print(f"Kare bütçesi: {budget_us:.0f} µs ({DisplayConfig.FRAME_RATE} fps)")
+    print(f"{'Panel':<12}{'Efekt':<11}{'µs/kare':>10}{'bayt/kare':>11}")
+    for width, height in sizes:
+        old = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+        new = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+        renderer = TransitionRenderer(width, height)
+        for effect in EFFECTS:
+            renderer.begin(old, {'effect': effect, 'duration_ms': 500})
+            renderer.blend(new, 0.5)
+            t = time.perf_counter()
+            for i in range(frames):
+                renderer.blend(new, i / frames)
+            per_frame = (time.perf_counter() - t) / frames * 1e6
+            # Dilim görünümleri küçük Python nesneleridir ve hemen serbest kalır; kalıcı artış ölçülür
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            for i in range(frames):
+                renderer.blend(new, i / frames)
+            retained = (tracemalloc.get_traced_memory()[0] - before) / frames
+            tracemalloc.stop()
+            results.append({'panel': f'{width}x{height}', 'effect': effect,
+                            'us_per_frame': round(per_frame, 2), 'bytes_per_frame': round(retained, 1)})
+            print(f"{f'{width}x{height}':<12}{effect:<11}{per_frame:>10.1f}{retained:>11.1f}")
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 2 and sys.argv[1] == '--benchmark':
+        _benchmark()
+    else:
+        print("Kullanım: python3 transitions.py --benchmark")
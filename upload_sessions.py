@@ -0,0 +1,202 @@
+"""
+LED Panel Devam Ettirilebilir Yükleme Oturumları
+Büyük dosyalar parça parça (chunk) yüklenir; her parça ofsetine yazılır ve
+CRC32 ile doğrulanır. Bağlantı koparsa istemci alınan aralıkları sorgulayıp
+eksik parçalardan devam eder. Oturum bilgisi diskte tutulduğu için sunucu
+yeniden başlasa da yükleme kaldığı yerden sürer.
+"""
+
+import os
+import json
+import time
+import uuid
+import zlib
+import shutil
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSessionError(Exception):
+    """İstemci hatası (geçersiz ofset, eksik parça, checksum uyuşmazlığı vb.)"""
+
+
+class UploadSessionStore:
+    """uploads/.incoming/sessions/<id>/ altında meta.json + data.part tutar"""
+
+    def __init__(self, base_dir, chunk_size=4 * 1024 * 1024, ttl=24 * 3600):
+        self.base_dir = base_dir
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.sessions = {}  # id -> meta (bellekte önbellek)
+
+    def _dir(self, upload_id):
+        return os.path.join(self.base_dir, upload_id)
+
+    def _data_file(self, upload_id):
+        return os.path.join(self._dir(upload_id), 'data.part')
+
+    def _save_meta(self, meta):
+        meta_file = os.path.join(self._dir(meta['upload_id']), 'meta.json')
+        tmp_file = f"{meta_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_file, meta_file)
+
+    def _load(self, upload_id):
+        """Oturumu bellekten veya diskten getir; yoksa KeyError"""
+        meta = self.sessions.get(upload_id)
+        if meta is not None:
+            return meta
+        # Sadece uuid hex kabul edilir (yol enjeksiyonu olmasın)
+        if not upload_id or any(c not in '0123456789abcdef' for c in upload_id):
+            raise KeyError(upload_id)
+        try:
+            with open(os.path.join(self._dir(upload_id), 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            raise KeyError(upload_id)
+        self.sessions[upload_id] = meta
+        return meta
+
+    @staticmethod
+    def received_ranges(meta):
+        """Alınan parçaları birleştirilmiş [başlangıç, bitiş) bayt aralıkları olarak döndür"""
+        ranges = []
+        for index in sorted(int(i) for i in meta['received']):
+            start = index * meta['chunk_size']
+            end = min(start + meta['chunk_size'], meta['size'])
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = end
+            else:
+                ranges.append([start, end])
+        return ranges
+
+    def status(self, upload_id):
+        with self.lock:
+            meta = self._load(upload_id)
+            return {
+                'upload_id': upload_id,
+                'location': meta['location'],
+                'filename': meta['filename'],
+                'size': meta['size'],
+                'chunk_size': meta['chunk_size'],
+                'chunks': meta['chunks'],
+                'received': self.received_ranges(meta),
+                'received_bytes': sum(e - s for s, e in self.received_ranges(meta))
+            }
+
+    def create(self, location, filename, file_type, size, sha256=None, duration=None):
+        """Yeni oturum aç; hedef dosya seyrek (sparse) olarak önceden ayrılır"""
+        self.cleanup()
+        upload_id = uuid.uuid4().hex
+        chunks = max(1, -(-size // self.chunk_size))
+        meta = {
+            'upload_id': upload_id,
+            'location': location,
+            'filename': filename,
+            'type': file_type,
+            'size': size,
+            'sha256': sha256.lower() if sha256 else None,
+            'duration': duration,
+            'chunk_size': self.chunk_size,
+            'chunks': chunks,
+            'received': {},  # parça no -> crc32
+            'created': time.time(),
+            'updated': time.time()
+        }
+        os.makedirs(self._dir(upload_id), exist_ok=True)
+        with open(self._data_file(upload_id), 'wb') as f:
+            f.truncate(size)
+        with self.lock:
+            self._save_meta(meta)
+            self.sessions[upload_id] = meta
+        logger.info(f"Yükleme oturumu açıldı: {upload_id} ({filename}, {size} bayt, {chunks} parça)")
+        return self.status(upload_id)
+
+    def write_chunk(self, upload_id, offset, stream, length, crc32=None):
+        """Parçayı ofsetine yaz; uzunluk ve (varsa) CRC32 tutarsa alındı olarak işaretle"""
+        with self.lock:
+            meta = self._load(upload_id)
+        if offset < 0 or offset % meta['chunk_size'] != 0 or offset >= max(meta['size'], 1):
+            raise UploadSessionError('Geçersiz ofset')
+        index = offset // meta['chunk_size']
+        expected = min(meta['chunk_size'], meta['size'] - offset)
+        if length is not None and length != expected:
+            raise UploadSessionError(f'Parça boyutu {expected} bayt olmalı')
+
+        # Her parça kendi dosya tanıtıcısıyla yazılır; paralel parçalar birbirini beklemez
+        crc = 0
+        written = 0
+        with open(self._data_file(upload_id), 'r+b') as f:
+            f.seek(offset)
+            while written < expected:
+                block = stream.read(min(1024 * 1024, expected - written))
+                if not block:
+                    break
+                f.write(block)
+                crc = zlib.crc32(block, crc)
+                written += len(block)
+        if written != expected:
+            raise UploadSessionError('Parça eksik alındı')
+        if crc32 is not None and crc != crc32:
+            raise UploadSessionError('Parça CRC32 uyuşmuyor')
+
+        with self.lock:
+            meta['received'][str(index)] = crc
+            meta['updated'] = time.time()
+            self._save_meta(meta)
+        return self.status(upload_id)
+
+    def finalize(self, upload_id):
+        """Tüm parçaları ve checksum'ı doğrula; birleşmiş dosyanın yolunu ve meta'yı döndür"""
+        with self.lock:
+            meta = self._load(upload_id)
+            missing = [i for i in range(meta['chunks']) if str(i) not in meta['received']]
+        if missing and meta['size'] > 0:
+            raise UploadSessionError(f'{len(missing)} parça eksik')
+
+        # Diske yazılanı yeniden okuyup parça CRC'lerini ve (varsa) SHA-256'yı kontrol et
+        data_file = self._data_file(upload_id)
+        sha = hashlib.sha256()
+        with open(data_file, 'rb') as f:
+            for index in range(meta['chunks'] if meta['size'] > 0 else 0):
+                block = f.read(meta['chunk_size'])
+                if zlib.crc32(block) != meta['received'][str(index)]:
+                    # Parçayı alınmamış say; istemci aralıkları sorgulayıp yeniden gönderir
+                    with self.lock:
+                        meta['received'].pop(str(index), None)
+                        self._save_meta(meta)
+                    raise UploadSessionError(f'{index}. parça bozuk, yeniden yükleyin')
+                sha.update(block)
+        digest = sha.hexdigest()
+        if meta['sha256'] and meta['sha256'] != digest:
+            # Hangi parçanın hatalı olduğu bilinemez; oturum baştan başlamalı
+            self.discard(upload_id)
+            raise UploadSessionError('SHA-256 uyuşmuyor, yükleme baştan başlatılmalı')
+        meta = dict(meta, sha256=digest)
+        return data_file, meta
+
+    def discard(self, upload_id):
+        """Oturumu ve geçici dosyalarını sil"""
+        with self.lock:
+            self.sessions.pop(upload_id, None)
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+
+    def cleanup(self):
+        """TTL süresince dokunulmamış oturumları sil"""
+        if not os.path.isdir(self.base_dir):
+            return
+        now = time.time()
+        for upload_id in os.listdir(self.base_dir):
+            try:
+                with self.lock:
+                    updated = self._load(upload_id)['updated']
+            except KeyError:
+                updated = os.path.getmtime(self._dir(upload_id))
+            if now - updated > self.ttl:
+                logger.info(f"Süresi dolan yükleme oturumu silindi: {upload_id}")
+                self.discard(upload_id)